@@ -0,0 +1,89 @@
+"""
+快取版本號工具
+
+資料本身存放在各 worker 的行程內快取（default），版本號則存放在共用快取（shared）。
+資料異動時更換版本號，其他 worker 最晚在 VERSION_CHECK_INTERVAL 秒內就會改用新版本的快取鍵。
+
+版本號是產生當下的時間（奈秒），而不是從 1 開始遞增的計數器：共用快取清除或淘汰版本號後
+重新建立的版本號一定與先前用過的不同，不會讓行程內快取中舊版本的資料重新被使用。
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+SHARED_CACHE_ALIAS = getattr(settings, 'SHARED_CACHE_ALIAS', 'shared')
+
+# 重新讀取共用版本號的間隔（秒），間隔內直接使用行程內記住的版本號
+VERSION_CHECK_INTERVAL = getattr(settings, 'CACHE_VERSION_CHECK_INTERVAL', 5)
+
+_local_versions = {}
+_lock = threading.Lock()
+
+
+def _shared_cache():
+    try:
+        return caches[SHARED_CACHE_ALIAS]
+    except Exception:
+        return caches['default']
+
+
+def _version_key(name: str) -> str:
+    return f"cache-version:{name}"
+
+
+def _new_version() -> int:
+    return time.time_ns()
+
+
+def get_version(name: str) -> int:
+    """
+    取得快取版本號
+    """
+    now = time.monotonic()
+    with _lock:
+        entry = _local_versions.get(name)
+        if entry and now - entry[1] < VERSION_CHECK_INTERVAL:
+            return entry[0]
+
+    try:
+        # 版本號不存在（尚未建立、被清除或淘汰）時建立新的版本號，多個 worker 同時建立時以先寫入者為準
+        version = _shared_cache().get_or_set(_version_key(name), _new_version, timeout=None)
+    except Exception as e:
+        logger.warning(f"讀取快取版本號失敗: {e}")
+        version = entry[0] if entry else _new_version()
+
+    with _lock:
+        _local_versions[name] = (version, now)
+    return version
+
+
+def bump_version(name: str) -> int:
+    """
+    更換快取版本號，使所有 worker 的舊快取失效
+    """
+    version = _new_version()
+    try:
+        _shared_cache().set(_version_key(name), version, timeout=None)
+    except Exception as e:
+        logger.warning(f"更新快取版本號失敗: {e}")
+        with _lock:
+            _local_versions.pop(name, None)
+        return 0
+
+    with _lock:
+        _local_versions[name] = (version, time.monotonic())
+    return version
+
+
+def versioned_key(name: str, *parts) -> str:
+    """
+    產生包含目前版本號的快取鍵
+    """
+    suffix = ':'.join(str(part) for part in parts)
+    key = f"{name}:v{get_version(name)}"
+    return f"{key}:{suffix}" if suffix else key
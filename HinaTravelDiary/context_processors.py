@@ -1,10 +1,30 @@
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
 from journeys.models import Country
+from .cache_versions import versioned_key
+
+HIGHLIGHTED_COUNTRIES_CACHE = 'highlighted-countries'
+HIGHLIGHTED_COUNTRIES_TIMEOUT = 60 * 60
+
+
+def get_highlighted_countries():
+    """
+    取得精選國家列表（有快取，國家異動時由 signal 使版本失效）
+    """
+    key = versioned_key(HIGHLIGHTED_COUNTRIES_CACHE)
+    countries = cache.get(key)
+    if countries is None:
+        countries = list(Country.objects.filter(is_highlighted=True).order_by('name'))
+        cache.set(key, countries, HIGHLIGHTED_COUNTRIES_TIMEOUT)
+    return countries
 
 
 def global_context(request):
     """
     全域 context processor，為所有頁面提供常用資料
+    使用 lazy 物件，沒有用到精選國家的頁面不會讀取快取或資料庫
     """
     return {
-        'highlighted_countries': Country.objects.filter(is_highlighted=True).order_by('name'),
-    }
\ No newline at end of file
+        'highlighted_countries': SimpleLazyObject(get_highlighted_countries),
+    }
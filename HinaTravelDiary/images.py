@@ -0,0 +1,193 @@
+"""
+照片衍生圖工具
+
+上傳的照片會在背景執行緒池中產生數種寬度的 AVIF / WebP / JPEG 縮圖，結果記錄在照片的 variants 欄位：
+    {'source': 原圖路徑, 'width': 原圖寬, 'height': 原圖高, 'formats': {'webp': [[320, 路徑], ...], ...}}
+模板以 srcset 挑選合適的縮圖，卡片列表不必再下載相機原始解析度的圖片。
+"""
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+from typing import Dict, List, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps, features
+
+from .storage import PHOTO_MODELS
+
+logger = logging.getLogger(__name__)
+
+# 產生的縮圖寬度，原圖較窄時以原圖寬度為上限，不會放大
+PHOTO_VARIANT_WIDTHS = tuple(getattr(settings, 'PHOTO_VARIANT_WIDTHS', (320, 640, 1280)))
+# 背景產生縮圖的執行緒數量
+PHOTO_VARIANT_MAX_WORKERS = getattr(settings, 'PHOTO_VARIANT_MAX_WORKERS', 2)
+
+# 格式：(Pillow 格式名稱, 副檔名, MIME 類型, 儲存參數)，依瀏覽器優先順序排列
+VARIANT_FORMATS = {
+    'avif': ('AVIF', 'avif', 'image/avif', {'quality': 55}),
+    'webp': ('WEBP', 'webp', 'image/webp', {'quality': 75, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg', {'quality': 80, 'optimize': True, 'progressive': True}),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def supported_formats() -> List[str]:
+    """
+    目前 Pillow 可以編碼的格式（AVIF 需要 Pillow 以 libavif 編譯）
+    """
+    return [fmt for fmt in VARIANT_FORMATS if fmt == 'jpeg' or features.check(fmt)]
+
+
+def variant_name(name: str, width: int, fmt: str) -> str:
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, 'variants', f"{stem}_w{width}.{VARIANT_FORMATS[fmt][1]}")
+
+
+def _prepare_for_format(image: Image.Image, fmt: str) -> Image.Image:
+    if fmt == 'jpeg':
+        if image.mode in ('RGBA', 'LA', 'P'):
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            rgba = image.convert('RGBA')
+            background.paste(rgba, mask=rgba.getchannel('A'))
+            return background
+        return image.convert('RGB') if image.mode != 'RGB' else image
+    if image.mode not in ('RGB', 'RGBA'):
+        return image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+    return image
+
+
+def generate_variants(image_field) -> Dict:
+    """
+    產生照片的所有縮圖並寫入同一個 storage，回傳 variants 欄位內容
+    """
+    storage = image_field.storage
+    formats = supported_formats()
+    max_width = max(PHOTO_VARIANT_WIDTHS)
+
+    with image_field.open('rb') as f, Image.open(f) as image:
+        # JPEG 可直接以較低解析度解碼，大幅降低大張照片的記憶體與解碼時間
+        image.draft(None, (max_width, max_width))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+        source_width, source_height = image.size
+
+        widths = sorted({min(width, source_width) for width in PHOTO_VARIANT_WIDTHS}, reverse=True)
+        variants = {fmt: [] for fmt in formats}
+        # 由大到小逐步縮小，每次縮放的來源都比原圖小
+        current = image
+        for width in widths:
+            height = max(1, round(source_height * width / source_width))
+            if current.width != width:
+                current = current.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+            for fmt in formats:
+                pil_format, _, _, options = VARIANT_FORMATS[fmt]
+                buffer = BytesIO()
+                _prepare_for_format(current, fmt).save(buffer, pil_format, **options)
+                name = storage.save(variant_name(image_field.name, width, fmt), ContentFile(buffer.getvalue()))
+                variants[fmt].append([width, name])
+
+    for entries in variants.values():
+        entries.sort()
+    return {
+        'source': image_field.name,
+        'width': source_width,
+        'height': source_height,
+        'formats': variants,
+    }
+
+
+def _shared_variants(photo) -> Optional[Dict]:
+    for label in PHOTO_MODELS:
+        model = apps.get_model(label)
+        for variants in model.objects.filter(image=photo.image.name).exclude(variants={}).values_list('variants', flat=True):
+            if variants.get('source') == photo.image.name:
+                return variants
+    return None
+
+
+def update_photo_variants(photo, force: bool = False) -> bool:
+    """
+    為照片產生縮圖並更新 variants 欄位，原圖未變更時略過
+    以 update() 寫入，不會再次觸發 post_save
+    """
+    if not photo.image:
+        return False
+    if not force and (photo.variants or {}).get('source') == photo.image.name:
+        return False
+
+    # 內容定址儲存下相同內容的照片共用同一個檔案，可直接沿用其他照片已產生的縮圖
+    variants = None if force else _shared_variants(photo)
+    if variants is None:
+        variants = generate_variants(photo.image)
+    # 產生期間原圖若已被替換則不覆寫
+    updated = type(photo).objects.filter(pk=photo.pk, image=photo.image.name).update(variants=variants)
+    if updated:
+        photo.variants = variants
+    return bool(updated)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=PHOTO_VARIANT_MAX_WORKERS, thread_name_prefix='photo-variants'
+            )
+        return _executor
+
+
+def _run_variant_job(model, pk, on_complete):
+    close_old_connections()
+    try:
+        photo = model.objects.filter(pk=pk).first()
+        if photo is not None and update_photo_variants(photo) and on_complete is not None:
+            on_complete(photo)
+    except Exception:
+        logger.exception("產生照片縮圖失敗：%s #%s", model._meta.label, pk)
+    finally:
+        close_old_connections()
+
+
+def schedule_photo_variants(photo, on_complete=None):
+    """
+    於交易完成後交由背景執行緒池產生縮圖，不佔用請求時間
+    on_complete(photo) 會在縮圖寫入後於背景執行緒中呼叫，可用於使快取失效
+    """
+    model, pk = type(photo), photo.pk
+    transaction.on_commit(lambda: _get_executor().submit(_run_variant_job, model, pk, on_complete))
+
+
+def _variant_entries(photo, fmt: str) -> List:
+    variants = getattr(photo, 'variants', None) or {}
+    if not photo.image or variants.get('source') != photo.image.name:
+        return []
+    return variants.get('formats', {}).get(fmt, [])
+
+
+def variant_srcset(photo, fmt: str) -> str:
+    storage = photo.image.storage if photo.image else None
+    return ', '.join(f"{storage.url(name)} {width}w" for width, name in _variant_entries(photo, fmt))
+
+
+def variant_url(photo, min_width: int, fmt: Optional[str] = None) -> str:
+    """
+    取得寬度至少為 min_width 的最小縮圖網址（預設優先使用 WebP），尚無縮圖時回傳原圖網址
+    """
+    if not photo or not photo.image:
+        return ''
+    for candidate in ([fmt] if fmt else ['webp', 'jpeg']):
+        entries = _variant_entries(photo, candidate)
+        if entries:
+            width, name = next((entry for entry in entries if entry[0] >= min_width), entries[-1])
+            return photo.image.storage.url(name)
+    return photo.image.url
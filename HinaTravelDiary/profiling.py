@@ -0,0 +1,181 @@
+"""
+請求效能量測
+
+RequestProfilingMiddleware 依 REQUEST_PROFILING_SAMPLE_RATE 抽樣請求，記錄每個請求的：
+    - 資料庫查詢次數與時間（重複執行相同 SQL 達門檻時標記為疑似 N+1）
+    - 外部服務（Google Maps API）呼叫次數與時間
+    - 模板渲染時間
+結果以 Server-Timing 標頭回傳，並以 JSON 格式寫入 HinaTravelDiary.profiling logger。
+抽樣率為 0 時中介軟體不會被載入，沒有任何額外負擔。
+"""
+import contextvars
+import functools
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# 抽樣比例（0 ~ 1），0 表示停用
+REQUEST_PROFILING_SAMPLE_RATE = float(getattr(settings, 'REQUEST_PROFILING_SAMPLE_RATE', 0))
+# 同一個 SQL 在單一請求中執行達此次數時視為疑似 N+1
+REQUEST_PROFILING_N_PLUS_ONE_THRESHOLD = getattr(settings, 'REQUEST_PROFILING_N_PLUS_ONE_THRESHOLD', 5)
+
+_current_profile = contextvars.ContextVar('request_profile', default=None)
+_template_timer_lock = threading.Lock()
+_template_timer_installed = False
+
+
+class RequestProfile:
+    """
+    單一請求的量測結果，背景執行緒（例如 BatchImporter）也可能寫入，因此以 lock 保護
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.query_count = 0
+        self.query_ms = 0.0
+        self.statements = Counter()
+        self.template_ms = 0.0
+        self.external = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        # 作為 connection.execute_wrapper 使用
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.query_count += 1
+                self.query_ms += elapsed
+                self.statements[sql] += 1
+
+    def record_template(self, elapsed_ms: float):
+        with self._lock:
+            self.template_ms += elapsed_ms
+
+    def record_external(self, service: str, elapsed_ms: float):
+        with self._lock:
+            calls, total_ms = self.external.get(service, (0, 0.0))
+            self.external[service] = (calls + 1, total_ms + elapsed_ms)
+
+    def repeated_statements(self, threshold: int):
+        return [(sql, count) for sql, count in self.statements.most_common() if count >= threshold]
+
+
+@contextmanager
+def track_external_call(service: str):
+    """
+    記錄一次外部服務呼叫的時間，目前請求未被抽樣時不做任何事
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.record_external(service, (time.perf_counter() - started) * 1000)
+
+
+def _install_template_timer():
+    """
+    包裝 Django 模板引擎的 render，只計算最外層的渲染（include 等不經過這一層，不會重複計算）
+    Django 只在測試環境發送 template_rendered 信號，因此改以包裝的方式量測
+    """
+    global _template_timer_installed
+    from django.template.backends.django import Template
+
+    with _template_timer_lock:
+        if _template_timer_installed:
+            return
+        original_render = Template.render
+
+        @functools.wraps(original_render)
+        def render(self, context=None, request=None):
+            profile = _current_profile.get()
+            if profile is None:
+                return original_render(self, context, request)
+            started = time.perf_counter()
+            try:
+                return original_render(self, context, request)
+            finally:
+                profile.record_template((time.perf_counter() - started) * 1000)
+
+        Template.render = render
+        _template_timer_installed = True
+
+
+def _server_timing(profile: RequestProfile, total_ms: float) -> str:
+    metrics = [
+        f'db;dur={profile.query_ms:.1f};desc="{profile.query_count} queries"',
+        f'tpl;dur={profile.template_ms:.1f}',
+    ]
+    for service, (calls, elapsed_ms) in sorted(profile.external.items()):
+        metrics.append(f'{service};dur={elapsed_ms:.1f};desc="{calls} calls"')
+    metrics.append(f'total;dur={total_ms:.1f}')
+    return ', '.join(metrics)
+
+
+class RequestProfilingMiddleware:
+    """
+    抽樣量測請求的資料庫、外部服務與模板渲染時間
+    """
+
+    def __init__(self, get_response):
+        if REQUEST_PROFILING_SAMPLE_RATE <= 0:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        _install_template_timer()
+
+    def __call__(self, request):
+        if random.random() >= REQUEST_PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+        total_ms = (time.perf_counter() - started) * 1000
+
+        response['Server-Timing'] = _server_timing(profile, total_ms)
+        self._log(request, response, profile, total_ms)
+        return response
+
+    def _log(self, request, response, profile: RequestProfile, total_ms: float):
+        repeated = profile.repeated_statements(REQUEST_PROFILING_N_PLUS_ONE_THRESHOLD)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 1),
+            'db_queries': profile.query_count,
+            'db_ms': round(profile.query_ms, 1),
+            'template_ms': round(profile.template_ms, 1),
+            'external': {
+                service: {'calls': calls, 'ms': round(elapsed_ms, 1)}
+                for service, (calls, elapsed_ms) in profile.external.items()
+            },
+            'n_plus_one': [{'sql': sql[:300], 'count': count} for sql, count in repeated],
+        }
+        line = json.dumps(record, ensure_ascii=False)
+        if repeated:
+            logger.warning(line)
+        else:
+            logger.info(line)
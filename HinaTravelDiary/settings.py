@@ -51,9 +51,12 @@ INSTALLED_APPS = [
     'homepage',
     'journeys',
     'itineraries',
+    'search',
 ]
 
 MIDDLEWARE = [
+    # 放在最外層以涵蓋其他中介軟體的查詢；抽樣率為 0 時不會載入
+    'HinaTravelDiary.profiling.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -101,6 +104,67 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    # 各 worker 的行程內快取，存放頁面與查詢結果
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+    # 多個 worker 共用的快取，存放快取版本號（需先執行 createcachetable）
+    # 每個旅程與國家都有各自的版本號，預設的 300 筆上限很快就會觸發淘汰
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'shared_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000000,
+        },
+    },
+    # Google Maps API 回應快取，使用資料庫讓多個 worker 共用（需先執行 createcachetable）
+    'google_maps': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'google_maps_cache',
+        'TIMEOUT': 60 * 60 * 24 * 30,
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
+}
+
+GOOGLE_MAPS_CACHE_ALIAS = 'google_maps'
+SHARED_CACHE_ALIAS = 'shared'
+
+# 請求效能量測（Server-Timing 標頭與 JSON 日誌），抽樣率 0 表示停用
+REQUEST_PROFILING_SAMPLE_RATE = float(os.getenv("REQUEST_PROFILING_SAMPLE_RATE", "0"))
+REQUEST_PROFILING_N_PLUS_ONE_THRESHOLD = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'HinaTravelDiary.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# 語意搜尋向量化工具（需提供 dimensions 屬性與 embed(text) 方法）
+# 預設的 HashingEmbedder 為詞彙層級的特徵雜湊，不理解同義詞；正式的語意搜尋請替換為語言模型實作
+SEMANTIC_SEARCH_EMBEDDER = 'search.embeddings.HashingEmbedder'
+SEMANTIC_SEARCH_DIMENSIONS = 256
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -145,6 +209,12 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR.parent / 'media'
 
+# 照片上傳的 view 以 HinaTravelDiary.uploads.photo_upload_view 設定上傳處理器：
+# 一律寫入暫存檔而非記憶體，並在超過照片大小上限時立即停止接收；後台等其他上傳維持 Django 預設
+FILE_UPLOAD_TEMP_DIR = os.getenv("FILE_UPLOAD_TEMP_DIR") or None
+PHOTO_UPLOAD_MAX_SIZE = 20 * 1024 * 1024
+PHOTO_UPLOAD_MAX_PIXELS = 60_000_000
+
 # WhiteNoise configuration
 WHITENOISE_USE_FINDERS = True
 WHITENOISE_AUTOREFRESH = True
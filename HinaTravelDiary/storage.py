@@ -0,0 +1,82 @@
+"""
+照片的內容定址儲存
+
+檔案一律依內容的 SHA-256 存放於 photos/ab/cd/<sha256>.<副檔名>，相同內容只會寫入一次，
+旅程、行程與地點照片（含縮圖）可共用同一個檔案。檔案不會在刪除照片時立即移除，
+而是由 gc_media_blobs 指令統計三種照片的參照數後，清除超過保留期限且沒有任何參照的檔案。
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+from collections import Counter
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+
+BLOB_PREFIX = 'photos'
+PHOTO_MODELS = ('journeys.JourneyPhoto', 'itineraries.ItineraryPhoto', 'itineraries.LocationPhoto')
+
+
+def blob_name(content_hash: str, extension: str) -> str:
+    return posixpath.join(BLOB_PREFIX, content_hash[:2], content_hash[2:4], f"{content_hash}.{extension}")
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    以內容雜湊命名檔案的 FileSystemStorage，傳入的檔名只用來決定副檔名
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # 最終檔名由內容決定，相同檔名即代表相同內容，不需要另找可用名稱
+        return name
+
+    def _save(self, name, content):
+        # 一邊寫入暫存檔一邊計算雜湊，檔案只需讀取一次
+        incoming_dir = self.path(posixpath.join(BLOB_PREFIX, '.incoming'))
+        os.makedirs(incoming_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=incoming_dir)
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    f.write(chunk)
+
+            extension = posixpath.splitext(name)[1].lstrip('.').lower() or 'bin'
+            name = blob_name(digest.hexdigest(), extension)
+            full_path = self.path(name)
+            if os.path.exists(full_path):
+                # 重新被參照的檔案更新修改時間，避免在保留期限內被清除
+                os.utime(full_path)
+                return name
+
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            os.chmod(temp_path, self.file_permissions_mode or 0o644)
+            # 同一個檔案系統內的 rename 是原子操作，同時寫入相同內容也不會讀到寫一半的檔案
+            os.replace(temp_path, full_path)
+            return name
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+photo_storage = ContentAddressedStorage()
+
+
+def get_photo_storage() -> ContentAddressedStorage:
+    return photo_storage
+
+
+def photo_reference_counts() -> Counter:
+    """
+    統計三種照片（原圖與縮圖）對每個檔案的參照數
+    """
+    counts = Counter()
+    for label in PHOTO_MODELS:
+        model = apps.get_model(label)
+        for image, variants in model.objects.exclude(image='').values_list('image', 'variants').iterator():
+            counts[image] += 1
+            for entries in (variants or {}).get('formats', {}).values():
+                counts.update({name for _, name in entries})
+    return counts
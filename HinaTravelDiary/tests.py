@@ -0,0 +1,126 @@
+import io
+import json
+import re
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from journeys.models import Country
+from . import profiling
+from .uploads import PhotoUploadError, prepare_photo_upload
+
+SECRET = b'SECRET-DESCRIPTION'
+
+
+def gps_exif() -> Image.Exif:
+    exif = Image.Exif()
+    exif[0x010E] = SECRET.decode()
+    gps = exif.get_ifd(0x8825)
+    gps[1], gps[2] = 'N', (25.0, 2.0, 7.5)
+    return exif
+
+
+def encode(image_format: str, **params) -> bytes:
+    buffer = io.BytesIO()
+    Image.new('RGB', (32, 24), 'red').save(buffer, image_format, **params)
+    return buffer.getvalue()
+
+
+class PhotoUploadSanitizeTests(SimpleTestCase):
+    """
+    每種接受的格式都會移除 GPS 等中繼資料
+    """
+
+    def _prepare(self, data: bytes, name: str = 'photo'):
+        photo, content_hash = prepare_photo_upload(SimpleUploadedFile(name, data))
+        self.addCleanup(photo.close)
+        return photo.read(), content_hash
+
+    def _assert_sanitized(self, data: bytes, image_format: str):
+        self.assertNotIn(SECRET, data)
+        with Image.open(io.BytesIO(data)) as image:
+            self.assertEqual(image.format, image_format)
+            self.assertEqual(dict(image.getexif().get_ifd(0x8825)), {})
+            image.load()
+
+    def test_jpeg(self):
+        data, _ = self._prepare(encode('JPEG', exif=gps_exif(), progressive=True))
+        self._assert_sanitized(data, 'JPEG')
+
+    def test_webp(self):
+        source = encode('WEBP', exif=gps_exif(), icc_profile=b'')
+        self.assertIn(SECRET, source)
+        data, _ = self._prepare(source)
+        self._assert_sanitized(data, 'WEBP')
+
+    def test_mpo_is_flattened_to_first_frame(self):
+        buffer = io.BytesIO()
+        first, second = Image.new('RGB', (32, 24), 'red'), Image.new('RGB', (32, 24), 'blue')
+        first.save(buffer, 'MPO', save_all=True, append_images=[second], exif=gps_exif())
+        self.assertEqual(buffer.getvalue().count(SECRET), 2)
+
+        data, _ = self._prepare(buffer.getvalue())
+        self.assertNotIn(b'MPF\x00', data)
+        self._assert_sanitized(data, 'JPEG')
+        with Image.open(io.BytesIO(data)) as image:
+            self.assertGreater(image.getpixel((0, 0))[0], 200)  # 第一張（紅色）影像
+
+    def test_gif_comment_is_removed(self):
+        data, _ = self._prepare(encode('GIF', comment=SECRET))
+        self._assert_sanitized(data, 'GIF')
+
+    def test_heic_is_rejected_with_explicit_message(self):
+        with self.assertRaisesMessage(PhotoUploadError, 'HEIC'):
+            self._prepare(b'\x00\x00\x00\x18ftypheic\x00\x00\x00\x00mif1heic', 'IMG_0001.HEIC')
+
+
+@mock.patch.object(profiling, 'REQUEST_PROFILING_SAMPLE_RATE', 1)
+class RequestProfilingTests(TestCase):
+    """
+    抽樣率為 1 時每個請求都回傳 Server-Timing 並寫入量測紀錄
+    """
+
+    def _db_queries(self, response):
+        return int(re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', response['Server-Timing']).group(1))
+
+    def test_server_timing_matches_executed_queries(self):
+        country = Country.objects.create(name='日本', english_name='Japan', country_code='JP')
+        client = Client()  # 新的 client 會以修改後的抽樣率載入中介軟體
+        url = reverse('journeys:journey_list', args=[country.id])
+
+        with self.assertLogs('HinaTravelDiary.profiling', 'INFO') as logs:
+            client.get(url)  # 暖身，讓共用快取的版本號與精選國家快取就緒
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+        query_count = len(queries.captured_queries)
+
+        self.assertEqual(self._db_queries(response), query_count)
+        self.assertRegex(response['Server-Timing'], r'tpl;dur=[\d.]+, total;dur=[\d.]+$')
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(logs.records[-1].levelname, 'INFO')
+        self.assertEqual((record['path'], record['db_queries'], record['n_plus_one']), (url, query_count, []))
+
+    def test_repeated_statement_is_logged_as_n_plus_one(self):
+        threshold = profiling.REQUEST_PROFILING_N_PLUS_ONE_THRESHOLD
+
+        def view(request):
+            for user_id in range(threshold):
+                User.objects.filter(id=user_id).exists()
+            return HttpResponse()
+
+        middleware = profiling.RequestProfilingMiddleware(view)
+        with self.assertLogs('HinaTravelDiary.profiling', 'WARNING') as logs:
+            response = middleware(RequestFactory().get('/n-plus-one/'))
+
+        self.assertEqual(self._db_queries(response), threshold)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(logs.records[0].levelname, 'WARNING')
+        self.assertEqual([entry['count'] for entry in record['n_plus_one']], [threshold])
+        self.assertIn('auth_user', record['n_plus_one'][0]['sql'])
@@ -0,0 +1,372 @@
+"""
+照片上傳處理
+
+照片上傳的 view 以 photo_upload_view 裝飾，上傳檔案以暫存檔接收並限制大小，之後以串流方式逐段改寫檔案：
+- JPEG / MPO：移除 EXIF / XMP / IPTC 等中繼資料（只保留方向資訊與色彩描述檔），
+  MPO（多圖 JPEG）只保留第一張影像，其餘影像與各自的 GPS 資訊一併移除
+- PNG：移除文字與 EXIF 區塊
+- WebP：移除 EXIF 與 XMP 區塊
+- GIF：移除註解與動畫循環以外的應用程式擴充區塊（例如 XMP）
+整個過程不需要解碼圖片，記憶體用量與照片大小無關；同時計算改寫後內容的 SHA-256，供重複檔案判斷使用。
+
+無法移除中繼資料的格式一律拒絕，包含 iPhone 預設的 HEIC / HEIF（過去會原樣儲存，現在需先轉為 JPEG）。
+"""
+import hashlib
+import os
+import struct
+from functools import wraps
+from typing import Callable, Optional, Tuple
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.temp import NamedTemporaryFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, TemporaryFileUploadHandler
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from PIL import Image
+
+# 單張照片上傳大小上限（位元組）
+PHOTO_UPLOAD_MAX_SIZE = getattr(settings, 'PHOTO_UPLOAD_MAX_SIZE', 20 * 1024 * 1024)
+# 單張照片像素上限，避免解壓縮炸彈
+PHOTO_UPLOAD_MAX_PIXELS = getattr(settings, 'PHOTO_UPLOAD_MAX_PIXELS', 60_000_000)
+PHOTO_UPLOAD_FORMATS = {'JPEG': 'jpg', 'MPO': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif'}
+
+COPY_CHUNK_SIZE = 64 * 1024
+
+# JPEG 中需要保留的 APPn 區段：APP0（JFIF）、APP2（ICC 色彩描述檔）、APP14（Adobe 色彩轉換）
+# APP2 同時用於 MPO 的 MPF 索引，只保留 ICC 色彩描述檔
+_JPEG_KEEP_APP_MARKERS = {0xE0, 0xE2, 0xEE}
+_JPEG_ICC_PROFILE = b'ICC_PROFILE\x00'
+# PNG 中會被移除的中繼資料區塊
+_PNG_DROP_CHUNKS = {b'eXIf', b'tEXt', b'zTXt', b'iTXt', b'tIME'}
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# WebP 中會被移除的中繼資料區塊，以及 VP8X 標頭中對應的旗標（EXIF、XMP）
+_WEBP_DROP_CHUNKS = {b'EXIF', b'XMP '}
+_WEBP_METADATA_FLAGS = 0x08 | 0x04
+# GIF 中保留的應用程式擴充區塊（動畫循環次數），其餘（例如 XMP）一律移除
+_GIF_KEEP_APPLICATIONS = {b'NETSCAPE2.0', b'ANIMEXTS1.0'}
+# HEIC / HEIF 檔案的 ftyp 品牌
+_HEIF_BRANDS = {b'heic', b'heix', b'hevc', b'hevx', b'heim', b'heis', b'mif1', b'msf1'}
+
+
+class PhotoUploadError(ValueError):
+    """照片不符合上傳限制"""
+
+
+class PhotoSizeLimitUploadHandler(FileUploadHandler):
+    """
+    上傳中的檔案超過 PHOTO_UPLOAD_MAX_SIZE 時立即略過，不再寫入暫存檔
+    由 photo_upload_view 設為第一個上傳處理器，被略過的欄位名稱記錄在 request.rejected_uploads
+    """
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > PHOTO_UPLOAD_MAX_SIZE:
+            rejected = getattr(self.request, 'rejected_uploads', set())
+            rejected.add(self.field_name)
+            self.request.rejected_uploads = rejected
+            raise SkipFile()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def photo_upload_view(view):
+    """
+    照片上傳 view 的裝飾器：超過大小上限時立即停止接收，其餘一律寫入暫存檔
+    只套用在照片上傳的 view，後台等其他上傳維持 Django 預設的上傳處理器
+    上傳處理器必須在讀取 request.POST 之前設定，因此略過 CSRF 中介軟體，設定後再以 csrf_protect 檢查
+    """
+    protected_view = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapped_view(request, *args, **kwargs):
+        request.upload_handlers = [PhotoSizeLimitUploadHandler(request), TemporaryFileUploadHandler(request)]
+        return protected_view(request, *args, **kwargs)
+
+    return wrapped_view
+
+
+def _read_exact(src, size: int) -> bytes:
+    data = src.read(size)
+    if len(data) != size:
+        raise PhotoUploadError('照片檔案不完整')
+    return data
+
+
+def _exif_orientation(tiff: bytes) -> Optional[int]:
+    """
+    從 EXIF 的 TIFF 資料讀取 IFD0 的方向（0x0112）
+    """
+    try:
+        endian = {b'II': '<', b'MM': '>'}[tiff[:2]]
+        ifd_offset = struct.unpack(endian + 'I', tiff[4:8])[0]
+        entry_count = struct.unpack(endian + 'H', tiff[ifd_offset:ifd_offset + 2])[0]
+        for i in range(entry_count):
+            entry = ifd_offset + 2 + i * 12
+            tag, field_type = struct.unpack(endian + 'HH', tiff[entry:entry + 4])
+            if tag == 0x0112 and field_type == 3:
+                return struct.unpack(endian + 'H', tiff[entry + 8:entry + 10])[0]
+    except (KeyError, struct.error):
+        return None
+    return None
+
+
+def _orientation_segment(orientation: int) -> bytes:
+    """
+    只包含方向資訊的最小 EXIF APP1 區段
+    """
+    tiff = b'MM\x00\x2a' + struct.pack('>I', 8)
+    tiff += struct.pack('>H', 1) + struct.pack('>HHIHH', 0x0112, 3, 1, orientation, 0) + struct.pack('>I', 0)
+    payload = b'Exif\x00\x00' + tiff
+    return b'\xff\xe1' + struct.pack('>H', len(payload) + 2) + payload
+
+
+def _rewrite_jpeg(src, write: Callable[[bytes], None]):
+    if src.read(2) != b'\xff\xd8':
+        raise PhotoUploadError('照片檔案格式錯誤')
+    write(b'\xff\xd8')
+
+    while True:
+        byte = _read_exact(src, 1)
+        if byte != b'\xff':
+            raise PhotoUploadError('照片檔案格式錯誤')
+        marker = _read_exact(src, 1)[0]
+        while marker == 0xFF:  # 填充位元組
+            marker = _read_exact(src, 1)[0]
+
+        if marker == 0xD9:
+            # 第一張影像結束，之後的內容（MPO 的其他影像、相機廠商附加資料）一律捨棄
+            write(b'\xff\xd9')
+            break
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            write(bytes((0xFF, marker)))
+            continue
+
+        # 區段長度最多 64KB，逐段讀取不會佔用大量記憶體
+        length = struct.unpack('>H', _read_exact(src, 2))[0]
+        payload = _read_exact(src, length - 2)
+
+        if marker == 0xE1:
+            if payload.startswith(b'Exif\x00\x00'):
+                orientation = _exif_orientation(payload[6:])
+                if orientation and orientation != 1:
+                    write(_orientation_segment(orientation))
+            continue
+        if 0xE0 <= marker <= 0xEF and marker not in _JPEG_KEEP_APP_MARKERS:
+            continue
+        if marker == 0xE2 and not payload.startswith(_JPEG_ICC_PROFILE):
+            continue
+        if marker == 0xFE:  # 註解
+            continue
+
+        write(bytes((0xFF, marker)) + struct.pack('>H', length) + payload)
+
+        if marker == 0xDA:
+            # 影像資料開始，原樣複製到下一個標記（漸進式 JPEG 會有多段掃描）
+            _copy_entropy_coded(src, write)
+
+
+def _copy_entropy_coded(src, write: Callable[[bytes], None]):
+    """
+    複製 JPEG 掃描資料，停在下一個標記之前
+    掃描資料中的 0xFF 後面只會是 0x00（填充）或 RSTn，其他值即為下一個標記
+    """
+    pending = b''
+    while True:
+        chunk = src.read(COPY_CHUNK_SIZE)
+        if not chunk:
+            raise PhotoUploadError('照片檔案不完整')
+        data = pending + chunk
+        position = 0
+        while True:
+            index = data.find(b'\xff', position)
+            if index == -1 or index == len(data) - 1:
+                break
+            following = data[index + 1]
+            if following == 0x00 or 0xD0 <= following <= 0xD7:
+                position = index + 2
+                continue
+            # 遇到標記：寫出之前的資料，並將讀取位置退回標記開頭
+            write(data[:index])
+            src.seek(index - len(data), os.SEEK_CUR)
+            return
+        if index == -1:
+            write(data)
+            pending = b''
+        else:
+            # 最後一個位元組是 0xFF，需與下一段一起判斷
+            write(data[:-1])
+            pending = data[-1:]
+
+
+def _rewrite_png(src, write: Callable[[bytes], None]):
+    if src.read(8) != _PNG_SIGNATURE:
+        raise PhotoUploadError('照片檔案格式錯誤')
+    write(_PNG_SIGNATURE)
+
+    while True:
+        header = src.read(8)
+        if not header:
+            break
+        if len(header) != 8:
+            raise PhotoUploadError('照片檔案不完整')
+        length, chunk_type = struct.unpack('>I4s', header)
+        keep = chunk_type not in _PNG_DROP_CHUNKS
+        if keep:
+            write(header)
+        remaining = length + 4  # 資料與 CRC
+        while remaining:
+            chunk = _read_exact(src, min(remaining, COPY_CHUNK_SIZE))
+            if keep:
+                write(chunk)
+            remaining -= len(chunk)
+        if chunk_type == b'IEND':
+            break
+
+
+def _copy_exact(src, write: Callable[[bytes], None], size: int):
+    while size:
+        chunk = _read_exact(src, min(size, COPY_CHUNK_SIZE))
+        write(chunk)
+        size -= len(chunk)
+
+
+def _rewrite_webp(src, write: Callable[[bytes], None]):
+    header = src.read(12)
+    if len(header) != 12 or header[:4] != b'RIFF' or header[8:] != b'WEBP':
+        raise PhotoUploadError('照片檔案格式錯誤')
+
+    # 先讀取各區塊的標頭，計算移除中繼資料後的 RIFF 大小
+    file_size = src.seek(0, os.SEEK_END)
+    src.seek(12)
+    chunks = []
+    while src.tell() < file_size:
+        chunk_type, length = struct.unpack('<4sI', _read_exact(src, 8))
+        padded_length = length + (length & 1)
+        if src.tell() + padded_length > file_size:
+            raise PhotoUploadError('照片檔案不完整')
+        if chunk_type not in _WEBP_DROP_CHUNKS:
+            chunks.append((chunk_type, length, padded_length, src.tell()))
+        src.seek(padded_length, os.SEEK_CUR)
+
+    write(b'RIFF' + struct.pack('<I', 4 + sum(8 + padded for _, _, padded, _ in chunks)) + b'WEBP')
+    for chunk_type, length, padded_length, offset in chunks:
+        src.seek(offset)
+        write(struct.pack('<4sI', chunk_type, length))
+        if chunk_type == b'VP8X':
+            payload = bytearray(_read_exact(src, padded_length))
+            payload[0] &= ~_WEBP_METADATA_FLAGS & 0xFF
+            write(bytes(payload))
+        else:
+            _copy_exact(src, write, padded_length)
+
+
+def _copy_gif_sub_blocks(src, write: Optional[Callable[[bytes], None]]):
+    """
+    複製（write 為 None 時略過）GIF 的資料子區塊，直到長度為 0 的結尾
+    """
+    while True:
+        length = _read_exact(src, 1)
+        data = _read_exact(src, length[0]) if length[0] else b''
+        if write:
+            write(length + data)
+        if not length[0]:
+            break
+
+
+def _rewrite_gif(src, write: Callable[[bytes], None]):
+    header = src.read(13)  # 檔頭與邏輯畫面描述
+    if len(header) != 13 or header[:6] not in (b'GIF87a', b'GIF89a'):
+        raise PhotoUploadError('照片檔案格式錯誤')
+    write(header)
+    if header[10] & 0x80:  # 全域色盤
+        write(_read_exact(src, 3 * (2 << (header[10] & 0x07))))
+
+    while True:
+        introducer = _read_exact(src, 1)
+        if introducer == b'\x3b':  # 檔案結尾
+            write(introducer)
+            break
+        if introducer == b'\x2c':  # 影像
+            descriptor = _read_exact(src, 9)
+            write(introducer + descriptor)
+            if descriptor[8] & 0x80:  # 區域色盤
+                write(_read_exact(src, 3 * (2 << (descriptor[8] & 0x07))))
+            write(_read_exact(src, 1))  # LZW 最小編碼長度
+            _copy_gif_sub_blocks(src, write)
+            continue
+        if introducer != b'\x21':
+            raise PhotoUploadError('照片檔案格式錯誤')
+
+        # 擴充區塊：保留畫面控制與純文字，移除註解與其他應用程式擴充
+        label = _read_exact(src, 1)
+        length = _read_exact(src, 1)
+        first_block = _read_exact(src, length[0])
+        keep = label != b'\xfe' and (label != b'\xff' or first_block[:11] in _GIF_KEEP_APPLICATIONS)
+        if keep:
+            write(introducer + label + length + first_block)
+        if length[0]:
+            _copy_gif_sub_blocks(src, write if keep else None)
+
+
+def _is_heif(header: bytes) -> bool:
+    return header[4:8] == b'ftyp' and header[8:12] in _HEIF_BRANDS
+
+
+def prepare_photo_upload(uploaded_file) -> Tuple[File, str]:
+    """
+    檢查上傳的照片並移除中繼資料，回傳 (暫存檔, 內容 SHA-256)
+    暫存檔在關閉時自動刪除，呼叫端儲存完畢後應呼叫 close()
+    """
+    if uploaded_file.size > PHOTO_UPLOAD_MAX_SIZE:
+        raise PhotoUploadError(f'照片大小不可超過 {PHOTO_UPLOAD_MAX_SIZE // (1024 * 1024)} MB')
+
+    uploaded_file.seek(0)
+    if _is_heif(uploaded_file.read(12)):
+        raise PhotoUploadError('不支援 HEIC / HEIF 格式，請先轉換為 JPEG 後再上傳')
+
+    # 只讀取檔頭判斷格式與尺寸，不會解碼整張圖片
+    uploaded_file.seek(0)
+    try:
+        with Image.open(uploaded_file) as image:
+            image_format = image.format
+            width, height = image.size
+    except (OSError, Image.DecompressionBombError):
+        raise PhotoUploadError('無法辨識的圖片格式')
+    if image_format not in PHOTO_UPLOAD_FORMATS:
+        raise PhotoUploadError(f'不支援的圖片格式：{image_format}')
+    if width * height > PHOTO_UPLOAD_MAX_PIXELS:
+        raise PhotoUploadError('照片解析度過高')
+
+    extension = PHOTO_UPLOAD_FORMATS[image_format]
+    digest = hashlib.sha256()
+    output = NamedTemporaryFile(suffix=f'.{extension}', dir=settings.FILE_UPLOAD_TEMP_DIR)
+
+    def write(data: bytes):
+        digest.update(data)
+        output.write(data)
+
+    uploaded_file.seek(0)
+    try:
+        if image_format in ('JPEG', 'MPO'):
+            _rewrite_jpeg(uploaded_file, write)
+        elif image_format == 'PNG':
+            _rewrite_png(uploaded_file, write)
+        elif image_format == 'WEBP':
+            _rewrite_webp(uploaded_file, write)
+        else:
+            _rewrite_gif(uploaded_file, write)
+    except Exception:
+        output.close()
+        raise
+
+    output.flush()
+    output.seek(0)
+    name = f"{os.path.splitext(os.path.basename(uploaded_file.name or 'photo'))[0]}.{extension}"
+    return File(output, name=name), digest.hexdigest()
@@ -29,6 +29,7 @@ urlpatterns = [
     path('', include('homepage.urls')),
     path('', include('journeys.urls')),
     path('', include('itineraries.urls')),
+    path('', include('search.urls')),
 ]
 
 # Serve media files in development
@@ -1,3 +1,50 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
 from django.test import TestCase
+from django.urls import reverse
+
+from HinaTravelDiary import cache_versions
+from journeys.models import Country, Journey
+
+
+class HomepageCacheVersionTests(TestCase):
+    """
+    首頁整頁快取的版本號
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username='tester')
+        self.country = Country.objects.create(name='日本', english_name='Japan', country_code='JP')
+        for alias in ('default', 'shared'):
+            caches[alias].clear()
+        cache_versions._local_versions.clear()
+
+    def _forget_local_versions(self):
+        # 模擬其他 worker 或超過 VERSION_CHECK_INTERVAL 後重新讀取共用版本號
+        cache_versions._local_versions.clear()
+
+    def test_clearing_shared_cache_does_not_serve_stale_pages(self):
+        url = reverse('homepage:home')
+        self.assertNotContains(self.client.get(url), '東京之旅')
+
+        Journey.objects.create(
+            country=self.country, title='東京之旅', description='測試', author=self.user,
+            start_date=date(2025, 1, 1), end_date=date(2025, 1, 3),
+        )
+        self._forget_local_versions()
+        self.assertContains(self.client.get(url), '東京之旅')
+
+        # 共用快取被清除（或版本號被淘汰）後，不應回到第一次請求時快取的頁面
+        caches['shared'].clear()
+        self._forget_local_versions()
+        self.assertContains(self.client.get(url), '東京之旅')
 
-# Create your tests here.
+    def test_recreated_version_differs_from_every_previous_version(self):
+        first = cache_versions.get_version('test-scope')
+        bumped = cache_versions.bump_version('test-scope')
+        caches['shared'].clear()
+        self._forget_local_versions()
+        recreated = cache_versions.get_version('test-scope')
+        self.assertEqual(len({first, bumped, recreated}), 3)
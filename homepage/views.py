@@ -1,16 +1,59 @@
+import hashlib
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django.views.generic import TemplateView
 from journeys.models import Journey, Country, City
 from itineraries.models import Itinerary, Location, LocationPhoto, ItineraryPhoto
+from HinaTravelDiary.cache_versions import get_version, versioned_key
 
+# 整頁快取與旅程卡片片段快取的版本名稱，由 journeys.signals 在資料異動時更換版本號
+HOMEPAGE_CACHE = 'homepage'
+HOMEPAGE_CARDS_CACHE = 'homepage-cards'
+HOMEPAGE_CACHE_TIMEOUT = 60 * 60
 
 
 class HomeView(TemplateView):
     template_name = 'home.html'
     
+    def get(self, request, *args, **kwargs):
+        """
+        首頁整頁快取，命中時不查詢資料庫，並支援 ETag / Last-Modified 條件式請求
+        """
+        key = versioned_key(HOMEPAGE_CACHE)
+        cached = cache.get(key)
+        if cached is None:
+            response = super().get(request, *args, **kwargs)
+            response.render()
+            cached = {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'etag': f'"{hashlib.md5(response.content).hexdigest()}"',
+                'last_modified': int(timezone.now().timestamp()),
+            }
+            cache.set(key, cached, HOMEPAGE_CACHE_TIMEOUT)
+        
+        response = HttpResponse(cached['content'], content_type=cached['content_type'])
+        response['ETag'] = cached['etag']
+        response['Last-Modified'] = http_date(cached['last_modified'])
+        patch_cache_control(response, max_age=0, must_revalidate=True)
+        
+        return get_conditional_response(
+            request,
+            etag=cached['etag'],
+            last_modified=cached['last_modified'],
+            response=response,
+        )
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['page_title'] = 'Hina 的旅行日記'
-        context['highlighted_journeys'] = Journey.objects.filter(
+        journeys = Journey.objects.select_related('country', 'city', 'journeyphoto')
+        context['highlighted_journeys'] = journeys.filter(
             is_highlighted=True).order_by('-updated_at')[:3]
-        context['recent_journeys'] = Journey.objects.order_by('-updated_at')[:6]
+        context['recent_journeys'] = journeys.order_by('-updated_at')[:6]
+        context['card_cache_version'] = get_version(HOMEPAGE_CARDS_CACHE)
         return context
@@ -1,9 +1,14 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.contrib import messages
+from HinaTravelDiary.images import variant_url
+from django.utils import timezone
 from django import forms
 from django.core.exceptions import ValidationError
-from .models import Itinerary, ItineraryPhoto, Location, LocationPhoto
+from django.db import connection, transaction
+from django.db.models import Count, Exists, OuterRef
+from journeys.models import Journey
+from .models import Itinerary, ItineraryPhoto, Location, LocationPhoto, LocationEnrichmentJob
 
 
 class ItineraryForm(forms.ModelForm):
@@ -53,7 +58,7 @@ class ItineraryPhotoInline(admin.StackedInline):
         if obj.image:
             return format_html(
                 '<img src="{}" style="width: 200px; height: 200px; object-fit: cover; border-radius: 8px;" />',
-                obj.image.url)
+                variant_url(obj, 200))
         return '尚未上傳圖片'
 
     image_preview.short_description = '圖片預覽'
@@ -69,7 +74,7 @@ class LocationPhotoInline(admin.TabularInline):
         if obj.image:
             return format_html(
                 '<img src="{}" style="width: 100px; height: 100px; object-fit: cover; border-radius: 4px;" />',
-                obj.image.url)
+                variant_url(obj, 200))
         return '尚未上傳圖片'
 
     image_preview.short_description = '圖片預覽'
@@ -102,16 +107,71 @@ class ItineraryAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        # 地點數量與是否有照片以 annotate 計算，旅程與國家一併 JOIN（列表顯示旅程名稱需要國家）
+        return super().get_queryset(request).select_related('journey__country').annotate(
+            location_total=Count('location'),
+            photo_exists=Exists(ItineraryPhoto.objects.filter(itinerary=OuterRef('pk'))),
+        )
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'journey':
+            kwargs['queryset'] = Journey.objects.select_related('country')
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
     def location_count(self, obj):
-        return obj.location_set.count()
+        return obj.location_total
 
     location_count.short_description = '地點數量'
+    location_count.admin_order_field = 'location_total'
 
     def has_photo(self, obj):
-        return hasattr(obj, 'itineraryphoto') and obj.itineraryphoto is not None
+        return obj.photo_exists
 
     has_photo.boolean = True
     has_photo.short_description = '有照片'
+    has_photo.admin_order_field = 'photo_exists'
+
+
+def renumber_locations_by_created_at(queryset, dry_run=False):
+    """
+    將所選地點所屬的每個行程內的地點依 created_at 重新編號（從 1 開始）
+    以單一 ROW_NUMBER() 視窗函數 UPDATE 完成，只寫入順序有變動的地點
+    dry_run 時只計算會變動的數量，回傳 (變動地點數, 行程數)
+    """
+    table = connection.ops.quote_name(Location._meta.db_table)
+    # 所選地點的行程以子查詢帶入，不需先把 id 取回 Python
+    itineraries_sql, itineraries_params = (
+        queryset.order_by().values('itinerary_id').distinct().query.sql_with_params()
+    )
+    cte = f"""
+        WITH ranked AS (
+            SELECT id, "order", ROW_NUMBER() OVER (PARTITION BY itinerary_id ORDER BY created_at, id) AS new_order
+            FROM {table}
+            WHERE itinerary_id IN ({itineraries_sql})
+        )
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM ({itineraries_sql}) AS selected", itineraries_params)
+        itinerary_count = cursor.fetchone()[0]
+
+        if dry_run:
+            cursor.execute(
+                cte + 'SELECT COUNT(*) FROM ranked WHERE "order" <> new_order',
+                itineraries_params,
+            )
+            return cursor.fetchone()[0], itinerary_count
+
+        cursor.execute(
+            cte + f"""
+            UPDATE {table} AS l SET "order" = ranked.new_order, updated_at = %s
+            FROM ranked
+            WHERE l.id = ranked.id AND ranked."order" <> ranked.new_order
+            """,
+            [*itineraries_params, timezone.now()],
+        )
+        return cursor.rowcount, itinerary_count
 
 
 def update_locations_order_by_created_at(modeladmin, request, queryset):
@@ -119,31 +179,14 @@ def update_locations_order_by_created_at(modeladmin, request, queryset):
     依照 created_at 欄位做 ASC 排序，並更新 order 欄位，從 1 開始
     按照行程分組，每個行程內的地點重新排序
     """
-    updated_count = 0
-    itineraries_processed = set()
-    
-    # 取得所有受影響的行程
-    affected_itineraries = set(queryset.values_list('itinerary', flat=True))
-    
-    for itinerary_id in affected_itineraries:
-        # 取得該行程的所有地點，按建立時間排序
-        locations = Location.objects.filter(
-            itinerary_id=itinerary_id
-        ).order_by('created_at')
-        
-        # 重新分配順序號
-        for index, location in enumerate(locations, 1):
-            if location.order != index:
-                Location.objects.filter(pk=location.pk).update(order=index)
-                updated_count += 1
-        
-        itineraries_processed.add(itinerary_id)
+    with transaction.atomic():
+        updated_count, itinerary_count = renumber_locations_by_created_at(queryset)
     
     # 顯示結果訊息
     if updated_count > 0:
         messages.success(
             request,
-            f"✅ 成功更新 {updated_count} 個地點的順序，共處理 {len(itineraries_processed)} 個行程"
+            f"✅ 成功更新 {updated_count} 個地點的順序，共處理 {itinerary_count} 個行程"
         )
     else:
         messages.info(
@@ -154,6 +197,19 @@ def update_locations_order_by_created_at(modeladmin, request, queryset):
 update_locations_order_by_created_at.short_description = "依建立時間重新排序地點"
 
 
+def preview_locations_order_by_created_at(modeladmin, request, queryset):
+    """
+    試算依建立時間重新排序會變動的地點數量，不寫入資料庫
+    """
+    changed_count, itinerary_count = renumber_locations_by_created_at(queryset, dry_run=True)
+    messages.info(
+        request,
+        f"ℹ️ 試算結果：共 {itinerary_count} 個行程，{changed_count} 個地點的順序會被更新（未寫入）"
+    )
+
+preview_locations_order_by_created_at.short_description = "試算依建立時間重新排序地點（不寫入）"
+
+
 @admin.register(Location)
 class LocationAdmin(admin.ModelAdmin):
     list_display = ['itinerary', 'name', 'address', 'order', 'created_at', 'arrived_hour', 'arrived_minute']
@@ -163,9 +219,16 @@ class LocationAdmin(admin.ModelAdmin):
     inlines = [LocationPhotoInline]
     list_per_page = 20
     list_editable = ['order', 'arrived_hour', 'arrived_minute']
-    actions = [update_locations_order_by_created_at,]
+    actions = [update_locations_order_by_created_at, preview_locations_order_by_created_at]
 
     search_help_text = "請輸入行程名稱並搭配右側的旅程名稱來進行過濾。"
+    # 列表顯示行程名稱（含旅程標題），一併 JOIN 避免逐筆查詢
+    list_select_related = ['itinerary__journey']
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'itinerary':
+            kwargs['queryset'] = Itinerary.objects.select_related('journey')
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
     fieldsets = (
         ('基本資訊', {
@@ -182,3 +245,12 @@ class LocationAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(LocationEnrichmentJob)
+class LocationEnrichmentJobAdmin(admin.ModelAdmin):
+    list_display = ['location', 'status', 'attempts', 'next_run_at', 'updated_at']
+    list_filter = ['status']
+    list_select_related = ['location__itinerary']
+    readonly_fields = ['location', 'google_maps_url', 'attempts', 'last_error', 'updated_at', 'created_at']
+    list_per_page = 20
@@ -0,0 +1,151 @@
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+
+from HinaTravelDiary.cache_versions import bump_version, versioned_key
+from journeys.models import Journey
+from .models import Itinerary, Location
+
+# 每個 256px 地圖圖塊切成 GRID_CELLS_PER_TILE x GRID_CELLS_PER_TILE 個格子
+GRID_CELLS_PER_TILE = 8
+MIN_ZOOM = 0
+MAX_ZOOM = 21
+CLUSTER_CACHE_TIMEOUT = 60 * 60 * 24
+
+# 目前交易中待失效的範圍，交易完成時一次解析並失效
+_pending = threading.local()
+
+
+def cluster_scope_name(scope: str, scope_id: int) -> str:
+    return f"map-clusters:{scope}:{scope_id}"
+
+
+def invalidate_cluster_scopes(journey_id: Optional[int], country_id: Optional[int]):
+    """
+    使旅程與國家的叢集快取失效
+    """
+    if journey_id:
+        bump_version(cluster_scope_name('journey', journey_id))
+    if country_id:
+        bump_version(cluster_scope_name('country', country_id))
+
+
+def schedule_cluster_invalidation(itinerary_ids: Iterable[int] = (), journey_ids: Iterable[int] = (),
+                                  country_ids: Iterable[int] = ()):
+    """
+    記錄需要失效的叢集範圍，於交易完成後一次解析所屬旅程與國家並各失效一次
+    連鎖刪除大量地點時不會逐筆查詢與寫入版本號
+    """
+    pending = getattr(_pending, 'scopes', None)
+    if pending is None:
+        pending = _pending.scopes = {'itineraries': set(), 'journeys': set(), 'countries': set()}
+    pending['itineraries'].update(filter(None, itinerary_ids))
+    pending['journeys'].update(filter(None, journey_ids))
+    pending['countries'].update(filter(None, country_ids))
+    # 每次都登記，交易回滾後殘留的範圍會在下一次交易完成時一併處理（多失效一次不影響正確性）；
+    # 第一個執行的回呼會處理全部範圍，其餘的不做任何事
+    transaction.on_commit(flush_cluster_invalidations)
+
+
+def flush_cluster_invalidations():
+    """
+    失效目前記錄的所有叢集範圍，最多兩次查詢
+    """
+    pending = getattr(_pending, 'scopes', None)
+    if pending is None:
+        return
+    del _pending.scopes
+
+    journey_ids = set(pending['journeys'])
+    country_ids = set(pending['countries'])
+    # 行程已刪除時由 Itinerary 的 post_delete 記錄旅程，旅程也已刪除時由 Journey 的 post_delete 記錄國家
+    if journey_ids:
+        country_ids.update(Journey.objects.filter(id__in=journey_ids).values_list('country_id', flat=True))
+    if pending['itineraries']:
+        for journey_id, country_id in Itinerary.objects.filter(id__in=pending['itineraries']).values_list(
+            'journey_id', 'journey__country_id'
+        ):
+            journey_ids.add(journey_id)
+            country_ids.add(country_id)
+
+    for journey_id in journey_ids:
+        invalidate_cluster_scopes(journey_id, None)
+    for country_id in country_ids:
+        invalidate_cluster_scopes(None, country_id)
+
+
+def _cell_size(zoom: int) -> float:
+    return 360.0 / (2 ** zoom) / GRID_CELLS_PER_TILE
+
+
+def build_clusters(points: List[Tuple[float, float, str]], zoom: int) -> List[Dict]:
+    """
+    以網格將座標分群，回傳每個格子的中心點與數量
+    """
+    size = _cell_size(zoom)
+    cells = {}
+    for lat, lng, name in points:
+        key = (math.floor((lat + 90) / size), math.floor((lng + 180) / size))
+        cell = cells.get(key)
+        if cell is None:
+            cells[key] = [lat, lng, 1, name]
+        else:
+            cell[0] += lat
+            cell[1] += lng
+            cell[2] += 1
+
+    clusters = []
+    for lat_sum, lng_sum, count, name in cells.values():
+        cluster = {
+            'lat': round(lat_sum / count, 6),
+            'lng': round(lng_sum / count, 6),
+            'count': count,
+        }
+        if count == 1:
+            cluster['name'] = name
+        clusters.append(cluster)
+    return clusters
+
+
+def get_clusters(scope: str, scope_id: int, zoom: int) -> List[Dict]:
+    """
+    取得指定範圍（journey / country）在某個縮放層級的叢集
+    各縮放層級在第一次被請求時才計算並快取（不會預先計算），地點異動時由 signal 使版本失效
+    """
+    zoom = max(MIN_ZOOM, min(MAX_ZOOM, zoom))
+    key = versioned_key(cluster_scope_name(scope, scope_id), zoom)
+    clusters = cache.get(key)
+    if clusters is not None:
+        return clusters
+
+    locations = Location.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    if scope == 'journey':
+        locations = locations.filter(itinerary__journey_id=scope_id)
+    else:
+        locations = locations.filter(itinerary__journey__country_id=scope_id)
+
+    points = locations.values_list('latitude', 'longitude', 'name')
+    clusters = build_clusters(points, zoom)
+    cache.set(key, clusters, CLUSTER_CACHE_TIMEOUT)
+    return clusters
+
+
+def filter_by_bbox(clusters: List[Dict], bbox: Tuple[float, float, float, float]) -> List[Dict]:
+    """
+    只保留位於 bbox (south, west, north, east) 內的叢集，支援跨越國際換日線的範圍
+    """
+    south, west, north, east = bbox
+    result = []
+    for cluster in clusters:
+        if not south <= cluster['lat'] <= north:
+            continue
+        if west <= east:
+            in_lng = west <= cluster['lng'] <= east
+        else:
+            in_lng = cluster['lng'] >= west or cluster['lng'] <= east
+        if in_lng:
+            result.append(cluster)
+    return result
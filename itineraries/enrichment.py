@@ -0,0 +1,136 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from typing import List, Optional
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import LocationEnrichmentJob, EnrichmentStatusChoices
+from .utils import LocationHandler, apply_google_maps_data
+
+# 設定日誌
+logger = logging.getLogger(__name__)
+
+# 重試設定
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = timedelta(seconds=30)
+RETRY_MAX_DELAY = timedelta(hours=1)
+
+# 處理中超過此時間的工作視為 worker 已中斷，可重新領取
+STALE_AFTER = timedelta(minutes=10)
+
+
+def enqueue_location_enrichment(location, url: str) -> Optional[LocationEnrichmentJob]:
+    """
+    建立地點資訊補齊工作
+    同一地點與網址已有未完成的工作時不重複建立
+    """
+    if not url:
+        return None
+
+    existing_job = LocationEnrichmentJob.objects.filter(
+        location=location,
+        google_maps_url=url,
+        status__in=[EnrichmentStatusChoices.PENDING, EnrichmentStatusChoices.RUNNING],
+    ).first()
+    if existing_job:
+        return existing_job
+
+    return LocationEnrichmentJob.objects.create(location=location, google_maps_url=url)
+
+
+def claim_jobs(batch_size: int = 20) -> List[LocationEnrichmentJob]:
+    """
+    領取可執行的工作並標記為處理中，每次領取都計入嘗試次數
+    使用 SKIP LOCKED，多個 worker 同時執行時不會領到相同的工作
+    """
+    now = timezone.now()
+    stale = Q(status=EnrichmentStatusChoices.RUNNING, updated_at__lt=now - STALE_AFTER)
+    with transaction.atomic():
+        # 處理中途 worker 中斷（OOM、被終止等）的工作不會經過 _mark_failed，
+        # 嘗試次數用完後直接標記為失敗，避免無限次重新領取
+        exhausted = LocationEnrichmentJob.objects.filter(stale, attempts__gte=MAX_ATTEMPTS).update(
+            status=EnrichmentStatusChoices.FAILED,
+            last_error='處理中斷次數已達重試上限',
+            updated_at=now,
+        )
+        if exhausted:
+            logger.error(f"{exhausted} 個地點資訊補齊工作處理中斷次數已達重試上限，標記為失敗")
+
+        jobs = list(
+            LocationEnrichmentJob.objects.select_for_update(skip_locked=True, of=('self',))
+            .select_related('location')
+            .filter(Q(status=EnrichmentStatusChoices.PENDING, next_run_at__lte=now) | stale)
+            .order_by('next_run_at')[:batch_size]
+        )
+        if jobs:
+            LocationEnrichmentJob.objects.filter(id__in=[job.id for job in jobs]).update(
+                status=EnrichmentStatusChoices.RUNNING,
+                attempts=F('attempts') + 1,
+                updated_at=now,
+            )
+            for job in jobs:
+                job.status = EnrichmentStatusChoices.RUNNING
+                job.attempts += 1
+    return jobs
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return min(RETRY_BASE_DELAY * (2 ** (attempts - 1)), RETRY_MAX_DELAY)
+
+
+def _mark_failed(job: LocationEnrichmentJob, error: str):
+    # 嘗試次數已在領取時計入
+    job.last_error = error
+    if job.attempts >= MAX_ATTEMPTS:
+        job.status = EnrichmentStatusChoices.FAILED
+        logger.error(f"地點資訊補齊失敗（已達重試上限）: {job.location.name} - {error}")
+    else:
+        job.status = EnrichmentStatusChoices.PENDING
+        job.next_run_at = timezone.now() + _retry_delay(job.attempts)
+        logger.warning(f"地點資訊補齊失敗，第 {job.attempts} 次，稍後重試: {job.location.name} - {error}")
+    job.save(update_fields=['last_error', 'status', 'next_run_at', 'updated_at'])
+
+
+def process_jobs(jobs: List[LocationEnrichmentJob], handler: Optional[LocationHandler] = None) -> int:
+    """
+    執行工作，相同網址只解析一次
+    回傳成功的工作數量
+    """
+    handler = handler or LocationHandler()
+
+    jobs_by_url = defaultdict(list)
+    for job in jobs:
+        jobs_by_url[job.google_maps_url].append(job)
+
+    succeeded = 0
+    for url, url_jobs in jobs_by_url.items():
+        error = ''
+        try:
+            locations = handler.parse_google_maps_url(url)
+            if not locations:
+                error = '無法解析 Google Maps 連結'
+        except Exception as e:
+            locations = []
+            error = str(e)
+
+        for job in url_jobs:
+            if not locations:
+                _mark_failed(job, error)
+                continue
+
+            try:
+                apply_google_maps_data(job.location, locations[0], url)
+            except Exception as e:
+                _mark_failed(job, str(e))
+                continue
+
+            job.status = EnrichmentStatusChoices.DONE
+            job.last_error = ''
+            job.save(update_fields=['status', 'last_error', 'updated_at'])
+            succeeded += 1
+            logger.info(f"成功更新地點資訊: {job.location.name}")
+
+    return succeeded
@@ -0,0 +1,184 @@
+"""
+Geohash 編碼與以 geohash 前綴進行的空間查詢（鄰近地點、範圍查詢）
+"""
+import math
+from typing import Dict, List, Optional, Set, Tuple
+
+from django.db.models import Q
+
+from .models import Location
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 12
+EARTH_RADIUS_M = 6371008.8
+
+# 範圍查詢時最多使用的 geohash 前綴數量
+MAX_BBOX_CELLS = 32
+
+NEARBY_FIELDS = ('id', 'name', 'latitude', 'longitude', 'itinerary_id')
+
+
+def encode(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+    """
+    將經緯度編碼為 geohash
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if lng >= mid:
+                bits = (bits << 1) | 1
+                lng_range[0] = mid
+            else:
+                bits <<= 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if lat >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(chars)
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """
+    回傳該精度下單一 geohash 格子的 (緯度高度, 經度寬度)，單位為度
+    """
+    total_bits = precision * 5
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """
+    兩點間的大圓距離（公尺）
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def _wrap_lng(lng: float) -> float:
+    return ((lng + 180.0) % 360.0) - 180.0
+
+
+def neighborhood(lat: float, lng: float, precision: int) -> Set[str]:
+    """
+    包含該點所在格子與周圍 8 個格子的 geohash
+    """
+    height, width = cell_size(precision)
+    cells = set()
+    for d_lat in (-height, 0.0, height):
+        for d_lng in (-width, 0.0, width):
+            cell_lat = lat + d_lat
+            if -90.0 <= cell_lat <= 90.0:
+                cells.add(encode(cell_lat, _wrap_lng(lng + d_lng), precision))
+    return cells
+
+
+def _prefix_filter(prefixes) -> Q:
+    condition = Q()
+    for prefix in prefixes:
+        condition |= Q(geohash__startswith=prefix)
+    return condition
+
+
+def nearest_locations(lat: float, lng: float, k: int = 10, queryset=None) -> List[Dict]:
+    """
+    取得距離最近的 k 個地點
+    從高精度的 3x3 格子開始查詢，候選不足或無法保證結果正確時改用較粗的精度
+    """
+    queryset = queryset if queryset is not None else Location.objects.all()
+    candidates = []
+
+    for precision in range(8, 0, -1):
+        rows = queryset.filter(_prefix_filter(neighborhood(lat, lng, precision))).values(*NEARBY_FIELDS)
+        candidates = []
+        for row in rows:
+            row['distance_m'] = round(haversine_m(lat, lng, row['latitude'], row['longitude']), 1)
+            candidates.append(row)
+        candidates.sort(key=lambda row: row['distance_m'])
+
+        if len(candidates) < k:
+            continue
+
+        # 3x3 格子保證涵蓋「一個格子寬度」以內的所有地點
+        height, width = cell_size(precision)
+        guaranteed_m = min(
+            height * 111320.0,
+            width * 111320.0 * max(math.cos(math.radians(lat)), 1e-6),
+        )
+        if candidates[k - 1]['distance_m'] <= guaranteed_m:
+            break
+
+    return candidates[:k]
+
+
+def bbox_prefixes(south: float, west: float, north: float, east: float) -> List[str]:
+    """
+    以最多 MAX_BBOX_CELLS 個 geohash 前綴涵蓋 bbox（west 不得大於 east）
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = math.floor((north + 90) / height) - math.floor((south + 90) / height) + 1
+        cols = math.floor((east + 180) / width) - math.floor((west + 180) / width) + 1
+        if rows * cols <= MAX_BBOX_CELLS:
+            break
+
+    prefixes = set()
+    lat_start = (math.floor((south + 90) / height) + 0.5) * height - 90
+    lng_start = (math.floor((west + 180) / width) + 0.5) * width - 180
+    cell_lat = lat_start
+    while cell_lat <= north + height / 2:
+        cell_lng = lng_start
+        while cell_lng <= east + width / 2:
+            prefixes.add(encode(min(cell_lat, 90.0), _wrap_lng(cell_lng), precision))
+            cell_lng += width
+        cell_lat += height
+    return sorted(prefixes)
+
+
+def locations_in_bbox(south: float, west: float, north: float, east: float,
+                      limit: int = 500, queryset=None) -> List[Dict]:
+    """
+    取得 bbox (south, west, north, east) 內的地點，支援跨越國際換日線的範圍
+    """
+    queryset = queryset if queryset is not None else Location.objects.all()
+
+    boxes = [(west, east)] if west <= east else [(west, 180.0), (-180.0, east)]
+    condition = Q()
+    for box_west, box_east in boxes:
+        condition |= (
+            _prefix_filter(bbox_prefixes(south, box_west, north, box_east))
+            & Q(longitude__gte=box_west, longitude__lte=box_east)
+        )
+
+    return list(
+        queryset.filter(condition, latitude__gte=south, latitude__lte=north)
+        .values(*NEARBY_FIELDS)[:limit]
+    )
+
+
+def location_geohash(latitude: Optional[float], longitude: Optional[float]) -> Optional[str]:
+    if latitude is None or longitude is None:
+        return None
+    return encode(latitude, longitude)
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from itineraries.geo import location_geohash
+from itineraries.models import Location
+
+
+class Command(BaseCommand):
+    help = '為既有地點補上座標 geohash'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='每批更新的地點數量')
+        parser.add_argument('--all', action='store_true', help='重新計算所有地點（預設只處理尚未設定的地點）')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        locations = Location.objects.filter(latitude__isnull=False, longitude__isnull=False)
+        if not options['all']:
+            locations = locations.filter(geohash__isnull=True)
+
+        updated_count = 0
+        last_id = 0
+        while True:
+            batch = list(
+                locations.filter(id__gt=last_id).order_by('id').only('id', 'latitude', 'longitude')[:batch_size]
+            )
+            if not batch:
+                break
+
+            for location in batch:
+                location.geohash = location_geohash(location.latitude, location.longitude)
+            Location.objects.bulk_update(batch, ['geohash'])
+
+            updated_count += len(batch)
+            last_id = batch[-1].id
+            self.stdout.write(f"已更新 {updated_count} 個地點")
+
+        self.stdout.write(self.style.SUCCESS(f"完成，共更新 {updated_count} 個地點的 geohash"))
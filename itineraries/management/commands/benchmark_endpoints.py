@@ -0,0 +1,219 @@
+import json
+import statistics
+import time
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from itineraries.models import Location
+from itineraries.synthetic import SEARCH_QUERY, analyze_tables, generate_dataset, sample_ids
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _send(request, client):
+    """
+    送出請求並立即執行其 on_commit 工作
+    所有寫入都在外層交易中，交易回滾時 on_commit 的工作（快取失效等）不會執行；
+    正式環境中請求結束前交易即已提交，因此在請求後立即執行並計入延遲與查詢次數
+    """
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        return request(client)
+
+
+def _percentile(values, ratio):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * ratio))]
+
+
+class Command(BaseCommand):
+    help = (
+        '以測試用 client 對首頁、旅程列表、行程列表、地點列表、地圖資料、新增 / 排序地點與搜尋 API 進行效能測試，'
+        '記錄延遲百分位數與查詢次數並與基準值比較（所有寫入會在結束後回滾）'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--label', help='使用 generate_synthetic_data 產生的既有批次；未指定時在交易中產生暫時資料')
+        parser.add_argument('--countries', type=int, default=5, help='暫時資料的國家數量')
+        parser.add_argument('--journeys-per-country', type=int, default=50, help='暫時資料每個國家的旅程數量')
+        parser.add_argument('--days', type=int, default=7, help='暫時資料每個旅程的天數')
+        parser.add_argument('--locations-per-day', type=int, default=30, help='暫時資料每個行程的地點數量')
+        parser.add_argument('--with-search-index', action='store_true', help='暫時資料一併建立搜尋索引，量測搜尋查詢時需要')
+        parser.add_argument('--requests', type=int, default=50, help='每個 endpoint 的請求次數')
+        parser.add_argument('--warmup', type=int, default=3, help='每個 endpoint 正式量測前的暖身請求次數')
+        parser.add_argument('--cold-cache', action='store_true', help='每次請求前清除行程內快取，量測未命中快取的情況')
+        parser.add_argument('--output', help='將本次結果寫入 JSON 檔案（可作為之後的基準值）')
+        parser.add_argument('--baseline', help='與此基準值 JSON 檔案比較')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='p95 延遲允許超出基準值的比例')
+        parser.add_argument('--fail-on-regression', action='store_true', help='有任何 endpoint 退化時以錯誤結束')
+
+    def handle(self, *args, **options):
+        results = None
+        try:
+            with transaction.atomic():
+                results = self._run(options)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        self._report(results)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"結果已寫入 {options['output']}")
+
+        if options['baseline']:
+            regressions = self._compare(results, options['baseline'], options['tolerance'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f"{len(regressions)} 個 endpoint 效能退化：{', '.join(regressions)}")
+
+    def _run(self, options):
+        label = options['label']
+        if label:
+            dataset = {'label': label}
+        else:
+            label = f'endpoints{time.time_ns() % 100000}'
+            user = User.objects.create(username=f'benchmark-{time.time_ns()}')
+            dataset = generate_dataset(
+                user,
+                countries=options['countries'],
+                journeys_per_country=options['journeys_per_country'],
+                days_per_journey=options['days'],
+                locations_per_day=options['locations_per_day'],
+                photo_ratio=0.5,
+                label=label,
+                search_index=options['with_search_index'],
+                stdout=self.stdout,
+            )
+            analyze_tables()
+
+        ids = sample_ids(label)
+        if ids is None:
+            raise CommandError(f"找不到批次「{label}」的資料，請先執行 generate_synthetic_data")
+
+        client = Client()
+        endpoints = self._endpoints(ids)
+        results = {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'dataset': dataset,
+            'requests': options['requests'],
+            'cold_cache': options['cold_cache'],
+            'endpoints': {},
+        }
+        for name, request in endpoints:
+            for _ in range(options['warmup']):
+                _send(request, client)
+
+            durations = []
+            query_counts = []
+            for _ in range(options['requests']):
+                if options['cold_cache']:
+                    cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    response = _send(request, client)
+                    durations.append((time.perf_counter() - started) * 1000)
+                if response.status_code >= 400:
+                    raise CommandError(f"{name} 回應 {response.status_code}")
+                query_counts.append(len(queries.captured_queries))
+
+            results['endpoints'][name] = {
+                'p50_ms': round(_percentile(durations, 0.5), 2),
+                'p95_ms': round(_percentile(durations, 0.95), 2),
+                'p99_ms': round(_percentile(durations, 0.99), 2),
+                'mean_ms': round(statistics.mean(durations), 2),
+                'queries': max(query_counts),
+            }
+        return results
+
+    def _endpoints(self, ids):
+        itinerary_id = ids['itinerary']
+        location_ids = list(Location.objects.filter(itinerary_id=itinerary_id).order_by('order').values_list('id', flat=True))
+        reorder_url = reverse('itineraries:reorder_locations', args=[itinerary_id])
+        create_url = reverse('itineraries:create_location', args=[itinerary_id])
+
+        def reorder(client):
+            # 每次反轉順序，確保每次請求都有實際寫入
+            location_ids.reverse()
+            payload = {'locations': [
+                {'id': location_id, 'order': index, 'time_slot': 'morning'}
+                for index, location_id in enumerate(location_ids, 1)
+            ]}
+            return client.post(reorder_url, json.dumps(payload), content_type='application/json')
+
+        def create(client):
+            return client.post(create_url, {
+                'name': '效能測試地點',
+                'address': '測試路 1 號',
+                'google_maps_url': 'https://www.google.com/maps/place/@25.0330,121.5654,17z',
+                'time_slot': 'afternoon',
+            })
+
+        def get(url):
+            return lambda client: client.get(url)
+
+        def search(name, **params):
+            return get(f"{reverse(name)}?{urlencode({'q': SEARCH_QUERY, **params})}")
+
+        return [
+            ('home', get(reverse('homepage:home'))),
+            ('journey_list', get(reverse('journeys:journey_list', args=[ids['country']]))),
+            ('itinerary_list', get(reverse('itineraries:itinerary_list', args=[ids['journey']]))),
+            ('location_list', get(reverse('itineraries:location_list', args=[itinerary_id]))),
+            ('location_map_data', get(reverse('itineraries:location_map_data', args=[itinerary_id]))),
+            ('create_location', create),
+            ('reorder_locations', reorder),
+            ('semantic_search', search('search:semantic_search')),
+            ('semantic_search_type', search('search:semantic_search', type='location')),
+            ('fulltext_search_author', search('search:fulltext_search', author=ids['author'])),
+        ]
+
+    def _report(self, results):
+        self.stdout.write(f"\n資料：{results['dataset']}，每個 endpoint {results['requests']} 次請求")
+        self.stdout.write(f"{'endpoint':<24} {'p50':>9} {'p95':>9} {'p99':>9} {'mean':>9} {'queries':>8}")
+        for name, stats in results['endpoints'].items():
+            self.stdout.write(
+                f"{name:<24} {stats['p50_ms']:>7.2f}ms {stats['p95_ms']:>7.2f}ms "
+                f"{stats['p99_ms']:>7.2f}ms {stats['mean_ms']:>7.2f}ms {stats['queries']:>8}"
+            )
+
+    def _compare(self, results, baseline_path, tolerance):
+        """
+        p95 延遲超過基準值 (1 + tolerance) 倍或查詢次數增加時視為退化，回傳退化的 endpoint 名稱
+        """
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+        regressions = []
+        self.stdout.write(f"\n與基準值比較（{baseline_path}，建立於 {baseline.get('created_at', '?')}）：")
+        for name, stats in results['endpoints'].items():
+            base = baseline.get('endpoints', {}).get(name)
+            if base is None:
+                self.stdout.write(f"{name:<24} 基準值中沒有此 endpoint")
+                continue
+
+            problems = []
+            if stats['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+                problems.append(f"p95 {base['p95_ms']:.2f} → {stats['p95_ms']:.2f} ms")
+            if stats['queries'] > base['queries']:
+                problems.append(f"查詢 {base['queries']} → {stats['queries']} 次")
+
+            if problems:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(f"{name:<24} 退化：{'；'.join(problems)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{name:<24} 正常（p95 {base['p95_ms']:.2f} → {stats['p95_ms']:.2f} ms，"
+                    f"查詢 {base['queries']} → {stats['queries']} 次）"
+                ))
+        return regressions
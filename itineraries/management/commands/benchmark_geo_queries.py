@@ -0,0 +1,90 @@
+import random
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from itineraries.geo import location_geohash, locations_in_bbox, nearest_locations
+from itineraries.models import Itinerary, Location
+from itineraries.synthetic import CITY_CENTERS
+from journeys.models import Country, Journey
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _percentile(values, ratio):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * ratio))]
+
+
+class Command(BaseCommand):
+    help = '測試鄰近地點與範圍查詢在不同資料量下的效能（所有資料會在結束後回滾）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+                            help='依序測試的地點總數')
+        parser.add_argument('--queries', type=int, default=50, help='每種查詢執行的次數')
+        parser.add_argument('--seed', type=int, default=42, help='亂數種子')
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        try:
+            with transaction.atomic():
+                self._run(sorted(options['sizes']), options['queries'])
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def _random_point(self, spread=0.2):
+        lat, lng = random.choice(CITY_CENTERS)
+        return lat + random.uniform(-spread, spread), lng + random.uniform(-spread, spread)
+
+    def _run(self, sizes, query_count):
+        user = User.objects.create(username=f'benchmark-{time.time_ns()}')
+        country = Country.objects.create(name='效能測試國', english_name='Benchmarkland', country_code='ZZ-BENCH')
+        journey = Journey.objects.create(
+            country=country, title='效能測試旅程', description='效能測試',
+            start_date=date(2025, 1, 1), end_date=date(2025, 1, 1), author=user
+        )
+        itinerary = Itinerary.objects.create(
+            journey=journey, title='Day-01', description='效能測試', start_date=date(2025, 1, 1)
+        )
+
+        inserted = Location.objects.count()
+        for size in sizes:
+            while inserted < size:
+                batch = []
+                for _ in range(min(10000, size - inserted)):
+                    lat, lng = self._random_point()
+                    batch.append(Location(
+                        itinerary=itinerary, name=f'地點 {inserted + len(batch)}',
+                        latitude=lat, longitude=lng, geohash=location_geohash(lat, lng)
+                    ))
+                Location.objects.bulk_create(batch, batch_size=5000)
+                inserted += len(batch)
+
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {Location._meta.db_table}')
+
+            nearest_ms = []
+            bbox_ms = []
+            for _ in range(query_count):
+                lat, lng = self._random_point()
+
+                started = time.perf_counter()
+                nearest_locations(lat, lng, k=10)
+                nearest_ms.append((time.perf_counter() - started) * 1000)
+
+                started = time.perf_counter()
+                locations_in_bbox(lat - 0.01, lng - 0.01, lat + 0.01, lng + 0.01, limit=500)
+                bbox_ms.append((time.perf_counter() - started) * 1000)
+
+            self.stdout.write(
+                f"{inserted:>9,} 個地點 | "
+                f"k-nearest p50 {_percentile(nearest_ms, 0.5):.1f} ms / p95 {_percentile(nearest_ms, 0.95):.1f} ms | "
+                f"bbox p50 {_percentile(bbox_ms, 0.5):.1f} ms / p95 {_percentile(bbox_ms, 0.95):.1f} ms"
+            )
@@ -0,0 +1,80 @@
+import json
+import random
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from itineraries.models import Itinerary, Location, TimeSlotChoices
+from journeys.models import Country, Journey
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = '測試重新排序地點 API 的效能（所有資料會在結束後回滾）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--locations', type=int, default=500, help='地點數量')
+        parser.add_argument('--rounds', type=int, default=10, help='重新排序次數')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options['locations'], options['rounds'])
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def _run(self, location_count, rounds):
+        user = User.objects.create(username=f'benchmark-{time.time_ns()}')
+        country = Country.objects.create(name='效能測試國', english_name='Benchmarkland', country_code='ZZ-BENCH')
+        journey = Journey.objects.create(
+            country=country, title='效能測試旅程', description='效能測試',
+            start_date=date(2025, 1, 1), end_date=date(2025, 1, 1), author=user
+        )
+        itinerary = Itinerary.objects.create(
+            journey=journey, title='Day-01', description='效能測試', start_date=date(2025, 1, 1)
+        )
+        Location.objects.bulk_create([
+            Location(itinerary=itinerary, name=f'地點 {i}', order=i + 1)
+            for i in range(location_count)
+        ])
+        location_ids = list(Location.objects.filter(itinerary=itinerary).values_list('id', flat=True))
+
+        client = Client()
+        url = reverse('itineraries:reorder_locations', args=[itinerary.id])
+        time_slots = [choice.value for choice in TimeSlotChoices]
+        elapsed_ms = []
+        query_counts = []
+
+        for _ in range(rounds):
+            random.shuffle(location_ids)
+            payload = json.dumps({'locations': [
+                {'id': location_id, 'order': order, 'time_slot': random.choice(time_slots)}
+                for order, location_id in enumerate(location_ids, 1)
+            ]})
+
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.post(url, payload, content_type='application/json')
+                elapsed_ms.append((time.perf_counter() - started) * 1000)
+            query_counts.append(len(queries))
+
+            if response.status_code != 200:
+                self.stderr.write(f"重新排序失敗: {response.status_code} {response.content.decode()}")
+                return
+
+        elapsed_ms.sort()
+        self.stdout.write(
+            f"{location_count} 個地點，{rounds} 次重新排序："
+            f"中位數 {elapsed_ms[len(elapsed_ms) // 2]:.1f} ms，最大 {elapsed_ms[-1]:.1f} ms，"
+            f"每次 {max(query_counts)} 個查詢"
+        )
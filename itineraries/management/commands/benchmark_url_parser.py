@@ -0,0 +1,127 @@
+import re
+import time
+import urllib.parse
+from urllib.parse import urlparse, parse_qs
+
+from django.core.management.base import BaseCommand, CommandError
+
+from itineraries.utils import classify_google_maps_url
+
+
+# 常見的 Google Maps 網址格式
+URL_CORPUS = [
+    'https://www.google.com/maps/place/%E5%8F%B0%E5%8C%97101/@25.0339639,121.5644722,17z/data=!3m1!4b1!4m6!3m5!1s0x3442abb6da9c9e1f:0x1206bcf082fd10a6!8m2!3d25.0339639!4d121.5644722!16zL20vMDFnbXc3?entry=ttu',
+    'https://www.google.com/maps/place/Tokyo+Tower/@35.6585805,139.7454329,17z/data=!4m6!3m5!1s0x60188bbd9009ec09:0x481a93f0d2a409dd!8m2!3d35.6585805!4d139.7454329!16zL20vMDdnZ2Q',
+    'https://www.google.com/maps/search/?api=1&query=%E4%B9%9D%E4%BB%BD%E8%80%81%E8%A1%97',
+    'https://www.google.com/maps/search/?api=1&query=Senso-ji&query_place_id=ChIJ8T1GpMGOGGARDYGSgpooDWw',
+    'https://www.google.com/maps/search/%E4%B8%80%E8%98%AD%E6%8B%89%E9%BA%B5/@35.6938,139.7034,15z',
+    'https://www.google.com/maps/@35.6812362,139.7671248,15z?entry=ttu',
+    'https://maps.google.com/?q=25.047924,121.517081',
+    'https://maps.google.com/maps?ll=24.1477,120.6736&z=14&t=m&hl=zh-TW',
+    'https://www.google.com/maps/place/?q=place_id:ChIJN1t_tDeuEmsRUsoyG83frY4',
+    'https://www.google.com/maps?ftid=0x3442a9e2d6a4f7f7:0x9b2f5e0c5a7c7e1a&hl=zh-TW',
+    'https://www.google.com/maps/dir/?api=1&destination=Kiyomizu-dera&travelmode=transit',
+    'https://www.google.com/maps/d/viewer?mid=1AbCdEfGhIjKlMnOpQrStUvWxYz&ll=34.9948,135.7850&z=12',
+    'https://maps.app.goo.gl/Wk3Ue9hTgHYdXc9L6',
+    'https://goo.gl/maps/AbCdEf123456',
+    'https://www.google.com/maps/embed/v1/view?key=API_KEY&center=-33.8569,151.2152&zoom=18',
+]
+
+
+# 改寫前 LocationHandler 的解析方式（每種資訊各自以多組正規表達式逐一搜尋），作為比較基準
+_LEGACY_COORDINATE_PATTERNS = [
+    r'/@(-?\d+\.?\d*),(-?\d+\.?\d*),\d+\.?\d*z',
+    r'/@(-?\d+\.?\d*),(-?\d+\.?\d*)',
+    r'!3d(-?\d+\.?\d*)!4d(-?\d+\.?\d*)',
+    r'q=(-?\d+\.?\d*),(-?\d+\.?\d*)',
+    r'center=(-?\d+\.?\d*),(-?\d+\.?\d*)',
+    r'll=(-?\d+\.?\d*),(-?\d+\.?\d*)',
+]
+_LEGACY_PLACE_ID_PATTERNS = [r'place_id=([A-Za-z0-9_-]+)', r'ftid=([A-Za-z0-9_-]+)', r'!1s([A-Za-z0-9_-]+)']
+
+
+def legacy_classify(url):
+    url = url.strip()
+    coordinates = None
+    for pattern in _LEGACY_COORDINATE_PATTERNS:
+        match = re.search(pattern, url)
+        if match:
+            lat, lng = float(match.group(1)), float(match.group(2))
+            if -90 <= lat <= 90 and -180 <= lng <= 180:
+                coordinates = (lat, lng)
+                break
+
+    place_id = None
+    for pattern in _LEGACY_PLACE_ID_PATTERNS:
+        match = re.search(pattern, url)
+        if match and not match.group(1).startswith('0x'):
+            place_id = match.group(1)
+            break
+
+    query = None
+    params = parse_qs(urlparse(url).query)
+    for param in ['q', 'query', 'search']:
+        if params.get(param):
+            query = params[param][0]
+            break
+    if query is None:
+        for pattern in [r'/search/([^/]+)', r'/place/([^/]+)']:
+            match = re.search(pattern, url)
+            if match:
+                query = urllib.parse.unquote(match.group(1))
+                break
+
+    return {
+        'coordinates': coordinates,
+        'place_id': place_id,
+        'query': query,
+        'is_short_link': 'maps.app.goo.gl' in url or 'goo.gl' in url,
+    }
+
+
+def _throughput(parser, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for url in URL_CORPUS:
+            parser(url)
+    elapsed = time.perf_counter() - started
+    return iterations * len(URL_CORPUS) / elapsed if elapsed else float('inf')
+
+
+class Command(BaseCommand):
+    help = '以同一組網址比較改寫前後 Google Maps 網址解析器的結果與處理速度'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000, help='語料重複次數')
+        parser.add_argument('--rounds', type=int, default=5, help='交替量測的輪數，取各自的最佳值')
+        parser.add_argument('--min-speedup', type=float, default=1.5,
+                            help='新解析器相對改寫前的最低加速倍數，低於此值時回傳錯誤')
+
+    def handle(self, *args, **options):
+        mismatches = []
+        for url in URL_CORPUS:
+            expected = legacy_classify(url)
+            actual = classify_google_maps_url(url)
+            mismatches += [(url, key) for key, value in expected.items() if actual[key] != value]
+        for url, key in mismatches:
+            self.stdout.write(self.style.WARNING(f"{key} 與改寫前不同：{url}"))
+
+        # 兩種實作交替執行多輪，降低機器負載變化造成的誤差
+        legacy_best = new_best = 0.0
+        for _ in range(options['rounds']):
+            legacy_best = max(legacy_best, _throughput(legacy_classify, options['iterations']))
+            new_best = max(new_best, _throughput(classify_google_maps_url, options['iterations']))
+
+        speedup = new_best / legacy_best
+        total = options['iterations'] * len(URL_CORPUS)
+        self.stdout.write(f"每輪解析 {total} 個網址，共 {options['rounds']} 輪")
+        self.stdout.write(f"改寫前：每秒 {legacy_best:,.0f} 個，平均 {1e6 / legacy_best:.2f} µs/網址")
+        self.stdout.write(f"改寫後：每秒 {new_best:,.0f} 個，平均 {1e6 / new_best:.2f} µs/網址")
+        self.stdout.write(f"加速 {speedup:.2f} 倍")
+
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} 項解析結果與改寫前不同")
+        if speedup < options['min_speedup']:
+            raise CommandError(f"加速倍數低於目標 {options['min_speedup']:.2f} 倍")
+
+        self.stdout.write(self.style.SUCCESS('解析結果一致，速度符合目標'))
@@ -0,0 +1,125 @@
+import re
+import time
+from contextlib import nullcontext
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Max
+
+from itineraries.models import Itinerary, Location, TimeSlotChoices
+from itineraries.synthetic import SEARCH_QUERY, analyze_tables, generate_dataset, sample_ids
+from journeys.models import Journey
+from search.embeddings import get_embedder
+from search.fulltext import build_search_query, fulltext_search_queryset
+from search.indexing import ef_search_for, hnsw_ef_search, semantic_search_queryset
+from search.models import SearchObjectTypeChoices
+
+_EXECUTION_TIME_RE = re.compile(r'Execution Time: ([\d.]+) ms')
+_SEQ_SCAN_RE = re.compile(r'Seq Scan on (\S+)')
+
+
+class _Rollback(Exception):
+    pass
+
+
+def hot_queries(ids):
+    """
+    各頁面與 API 實際執行的查詢（與 views 中的寫法一致）
+    """
+    journeys = Journey.objects.select_related('country', 'city', 'journeyphoto')
+    locations = Location.objects.filter(itinerary_id=ids['itinerary'])
+    return [
+        ('首頁：精選旅程', journeys.filter(is_highlighted=True).order_by('-updated_at')[:3]),
+        ('首頁：最新旅程', journeys.order_by('-updated_at')[:6]),
+        ('journey_list', Journey.objects.filter(country_id=ids['country'])
+            .select_related('city', 'journeyphoto')
+            .annotate(itinerary_count=Count('itinerary'))
+            .order_by('-start_date')),
+        ('itinerary_list', Itinerary.objects.filter(journey_id=ids['journey']).order_by('start_date')),
+        ('location_list', locations.order_by('order')),
+        ('location_list：時段', locations.filter(time_slot=TimeSlotChoices.AFTERNOON).order_by('order')),
+        ('location_map_data：版本', locations.values('itinerary_id').annotate(count=Count('id'), last_updated=Max('updated_at'))),
+        ('create_location：最大順序', locations.values('itinerary_id').annotate(max_order=Max('order'))),
+        ('delete_location：重新編號', locations.filter(order__gt=1).annotate(new_order=F('order') - 1).values('id', 'new_order')),
+    ]
+
+
+def search_queries(ids, limit=20):
+    """
+    搜尋 API 實際執行的查詢，語意搜尋需在對應的 hnsw.ef_search 下分析
+    回傳 (名稱, 查詢, ef_search)，全文檢索的 ef_search 為 None
+    """
+    vector = get_embedder().embed(SEARCH_QUERY)
+    location_types = [SearchObjectTypeChoices.LOCATION]
+    return [
+        ('semantic_search', semantic_search_queryset(vector)[:limit], ef_search_for(limit, False)),
+        ('semantic_search：類型', semantic_search_queryset(vector, location_types)[:limit], ef_search_for(limit, True)),
+        ('fulltext_search：作者',
+            fulltext_search_queryset(build_search_query(SEARCH_QUERY), author_id=ids['author'])[:limit], None),
+    ]
+
+
+class Command(BaseCommand):
+    help = '在產生的大量資料上擷取各頁面與搜尋查詢的 EXPLAIN (ANALYZE, BUFFERS)，用來發現索引退化（資料會在結束後回滾）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--countries', type=int, default=20, help='國家數量')
+        parser.add_argument('--journeys-per-country', type=int, default=100, help='每個國家的旅程數量')
+        parser.add_argument('--days', type=int, default=7, help='每個旅程的天數（行程數）')
+        parser.add_argument('--locations-per-day', type=int, default=20, help='每個行程的地點數量')
+        parser.add_argument('--with-search-index', action='store_true', help='暫時資料一併建立搜尋索引，分析搜尋查詢時需要')
+        parser.add_argument('--seed', type=int, default=42, help='亂數種子')
+        parser.add_argument('--output', help='將完整查詢計畫寫入檔案')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def _run(self, options):
+        label = f'explain{time.time_ns() % 100000}'
+        user = User.objects.create(username=f'explain-{time.time_ns()}')
+        counts = generate_dataset(
+            user,
+            countries=options['countries'],
+            journeys_per_country=options['journeys_per_country'],
+            days_per_journey=options['days'],
+            locations_per_day=options['locations_per_day'],
+            seed=options['seed'],
+            label=label,
+            search_index=options['with_search_index'],
+            stdout=self.stdout,
+        )
+        analyze_tables()
+        ids = sample_ids(label)
+
+        report = [f"資料量：{counts}\n"]
+        summary = []
+        queries = [(name, queryset, None) for name, queryset in hot_queries(ids)] + search_queries(ids)
+        for name, queryset, ef_search in queries:
+            with hnsw_ef_search(ef_search) if ef_search else nullcontext():
+                plan = queryset.explain(analyze=True, buffers=True)
+            match = _EXECUTION_TIME_RE.search(plan)
+            seq_scans = sorted(set(_SEQ_SCAN_RE.findall(plan)))
+            summary.append((name, float(match.group(1)) if match else None, seq_scans))
+            report.append(f"=== {name} ===\n{queryset.query}\n\n{plan}\n")
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write('\n'.join(report))
+            self.stdout.write(f"完整查詢計畫已寫入 {options['output']}")
+        else:
+            self.stdout.write('\n'.join(report))
+
+        self.stdout.write('\n查詢摘要：')
+        for name, execution_ms, seq_scans in summary:
+            elapsed = f"{execution_ms:8.2f} ms" if execution_ms is not None else '       ? ms'
+            line = f"{elapsed} | {name}"
+            if seq_scans:
+                self.stdout.write(self.style.WARNING(f"{line} | 循序掃描：{', '.join(seq_scans)}"))
+            else:
+                self.stdout.write(line)
@@ -0,0 +1,63 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from itineraries.synthetic import analyze_tables, delete_dataset, generate_dataset
+from journeys.models import Country
+
+
+class Command(BaseCommand):
+    help = '產生指定規模的合成資料（國家、城市、旅程、行程、地點與照片），供壓力測試與效能測試使用'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--label', default='synthetic', help='資料批次名稱，用於國家代碼（ZZ-<LABEL>-n）與後續清除')
+        parser.add_argument('--countries', type=int, default=10, help='國家數量')
+        parser.add_argument('--cities-per-country', type=int, default=5, help='每個國家的城市數量')
+        parser.add_argument('--journeys-per-country', type=int, default=50, help='每個國家的旅程數量')
+        parser.add_argument('--days', type=int, default=5, help='每個旅程的天數（行程數）')
+        parser.add_argument('--locations-per-day', type=int, default=10, help='每個行程的地點數量')
+        parser.add_argument('--highlighted-ratio', type=float, default=0.1, help='精選旅程比例')
+        parser.add_argument('--photo-ratio', type=float, default=0.5, help='旅程、行程與地點附上照片的比例')
+        parser.add_argument('--author', default='synthetic-author', help='旅程作者的帳號（不存在時自動建立）')
+        parser.add_argument('--seed', type=int, default=42, help='亂數種子')
+        parser.add_argument('--with-search-index', action='store_true',
+                            help='一併建立全文檢索文件與語意搜尋向量，供搜尋的效能測試使用')
+        parser.add_argument('--delete', action='store_true', help='刪除指定批次的資料而不產生新資料')
+
+    def handle(self, *args, **options):
+        label = options['label']
+        existing = Country.objects.filter(country_code__startswith=f'ZZ-{label}-'.upper())
+
+        if options['delete']:
+            # 以 SQL 批次刪除國家及其城市、旅程、行程、地點與照片，不逐筆觸發 post_delete
+            with transaction.atomic():
+                counts = delete_dataset(label)
+            self.stdout.write(self.style.SUCCESS(
+                f"已刪除批次「{label}」的 {sum(counts.values())} 筆資料：{counts}"
+            ))
+            return
+
+        if existing.exists():
+            raise CommandError(f"批次「{label}」已存在，請改用其他 --label 或先以 --delete 刪除")
+
+        with transaction.atomic():
+            author, _ = User.objects.get_or_create(username=options['author'])
+            counts = generate_dataset(
+                author,
+                countries=options['countries'],
+                cities_per_country=options['cities_per_country'],
+                journeys_per_country=options['journeys_per_country'],
+                days_per_journey=options['days'],
+                locations_per_day=options['locations_per_day'],
+                highlighted_ratio=options['highlighted_ratio'],
+                photo_ratio=options['photo_ratio'],
+                seed=options['seed'],
+                label=label,
+                search_index=options['with_search_index'],
+                stdout=self.stdout,
+            )
+        analyze_tables()
+
+        self.stdout.write(self.style.SUCCESS(f"批次「{label}」產生完成：{counts}"))
+        if not options['with_search_index']:
+            self.stdout.write('未建立搜尋索引，需要時請加上 --with-search-index 重新產生')
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from itineraries.enrichment import claim_jobs, process_jobs
+from itineraries.utils import LocationHandler
+
+
+class Command(BaseCommand):
+    help = '執行地點資訊補齊工作（經緯度、評分、地點類型）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20, help='每次領取的工作數量')
+        parser.add_argument('--sleep', type=float, default=2.0, help='沒有工作時的等待秒數')
+        parser.add_argument('--once', action='store_true', help='處理完目前的工作後結束')
+
+    def handle(self, *args, **options):
+        handler = LocationHandler()
+
+        while True:
+            jobs = claim_jobs(options['batch_size'])
+            if jobs:
+                succeeded = process_jobs(jobs, handler)
+                self.stdout.write(f"處理 {len(jobs)} 個工作，成功 {succeeded} 個")
+                continue
+
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
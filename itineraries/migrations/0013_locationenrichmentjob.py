@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('itineraries', '0012_location_time_slot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationEnrichmentJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('google_maps_url', models.CharField(help_text='Google Maps 地點網址', max_length=1000)),
+                ('status', models.CharField(choices=[('pending', '等待中'), ('running', '處理中'), ('done', '已完成'), ('failed', '失敗')], default='pending', help_text='工作狀態', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='已嘗試次數')),
+                ('next_run_at', models.DateTimeField(default=django.utils.timezone.now, help_text='下次執行時間')),
+                ('last_error', models.TextField(blank=True, default='', help_text='最後一次錯誤訊息')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='itineraries.location')),
+            ],
+            options={
+                'verbose_name': '地點資訊補齊工作',
+                'verbose_name_plural': '地點資訊補齊工作列表',
+                'indexes': [models.Index(fields=['status', 'next_run_at'], name='itin_enrich_status_next_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('itineraries', '0014_location_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='location',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='座標的 geohash，用於鄰近地點與範圍查詢', max_length=12, null=True),
+        ),
+    ]
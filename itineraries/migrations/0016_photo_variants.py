@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('itineraries', '0015_location_geohash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itineraryphoto',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='縮圖資訊（由背景工作產生）'),
+        ),
+        migrations.AddField(
+            model_name='locationphoto',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='縮圖資訊（由背景工作產生）'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:30
+
+import HinaTravelDiary.storage
+import itineraries.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('itineraries', '0016_photo_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='itineraryphoto',
+            name='image',
+            field=models.ImageField(help_text='行程圖片', storage=HinaTravelDiary.storage.get_photo_storage, upload_to=itineraries.models.itinerary_photo_upload_path),
+        ),
+        migrations.AlterField(
+            model_name='locationphoto',
+            name='image',
+            field=models.ImageField(help_text='地點圖片', storage=HinaTravelDiary.storage.get_photo_storage, upload_to=itineraries.models.location_photo_upload_path),
+        ),
+    ]
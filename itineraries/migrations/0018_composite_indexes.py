@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 14:30
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY 不能在交易中執行，建立索引時不會鎖住資料表寫入
+    atomic = False
+
+    dependencies = [
+        ('itineraries', '0017_alter_photo_image_storage'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='itinerary',
+            index=models.Index(fields=['journey', 'start_date'], name='itin_journey_start_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='location',
+            index=models.Index(fields=['itinerary', 'order'], name='itin_loc_itinerary_order_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='location',
+            index=models.Index(fields=['itinerary', 'time_slot'], name='itin_loc_itinerary_slot_idx'),
+        ),
+    ]
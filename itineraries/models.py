@@ -1,4 +1,6 @@
 from django.db import models
+from django.utils import timezone
+from HinaTravelDiary.storage import get_photo_storage
 from journeys.models import Journey
 import uuid
 
@@ -23,12 +25,17 @@ class Itinerary(models.Model):
     class Meta:
         verbose_name = "行程"
         verbose_name_plural = "行程列表"
+        indexes = [
+            # 行程列表：依旅程篩選並依日期排序
+            models.Index(fields=['journey', 'start_date'], name='itin_journey_start_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.journey.title} - {self.title}"
 
 
 def itinerary_photo_upload_path(instance, filename):
+    # 實際路徑由 ContentAddressedStorage 依內容雜湊決定，這裡只需保留副檔名
     ext = filename.split('.')[-1]
     filename = f"{instance.uuid}.{ext}"
     return f"itinerary_photos/{filename}"
@@ -37,13 +44,18 @@ def itinerary_photo_upload_path(instance, filename):
 class ItineraryPhoto(models.Model):
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     itinerary = models.OneToOneField(Itinerary, on_delete=models.CASCADE)
-    image = models.ImageField(upload_to=itinerary_photo_upload_path, help_text="行程圖片")
+    image = models.ImageField(upload_to=itinerary_photo_upload_path, storage=get_photo_storage, help_text="行程圖片")
     caption = models.CharField(max_length=255, blank=True, null=True, help_text="圖片說明")
+    variants = models.JSONField(default=dict, blank=True, editable=False, help_text="縮圖資訊（由背景工作產生）")
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         verbose_name = "行程照片"
         verbose_name_plural = "行程照片列表"
+        indexes = [
+            # 內容定址儲存下以檔名查詢共用同一個檔案的照片
+            models.Index(fields=['image'], name='itin_photo_image_idx'),
+        ]
 
     def __str__(self):
         return f"{self.itinerary.title} - 照片"
@@ -57,6 +69,8 @@ class Location(models.Model):
     address = models.CharField(max_length=500, blank=True, null=True, help_text="地址")
     latitude = models.FloatField(blank=True, null=True, help_text="緯度")
     longitude = models.FloatField(blank=True, null=True, help_text="經度")
+    geohash = models.CharField(max_length=12, blank=True, null=True, db_index=True, editable=False,
+                               help_text="座標的 geohash，用於鄰近地點與範圍查詢")
     rating = models.FloatField(blank=True, null=True, help_text="評分")
     place_types = models.CharField(max_length=200, blank=True, null=True, help_text="地點類型")
     arrived_hour = models.IntegerField(blank=True, null=True, help_text="到達小時 (0-23)")
@@ -68,33 +82,85 @@ class Location(models.Model):
                                  default=TimeSlotChoices.MORNING,
                                  choices=TimeSlotChoices.choices,
                                  help_text="時間段 (例如: '上午', '下午', '晚上')")
+    updated_at = models.DateTimeField(auto_now=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         verbose_name = "地點"
         verbose_name_plural = "地點列表"
         ordering = ['order']
+        indexes = [
+            # 地點列表與地圖資料：依行程篩選並依順序排序
+            models.Index(fields=['itinerary', 'order'], name='itin_loc_itinerary_order_idx'),
+            models.Index(fields=['itinerary', 'time_slot'], name='itin_loc_itinerary_slot_idx'),
+        ]
 
     def __str__(self):
         return f"{self.itinerary.title} - {self.name}"
 
+    def save(self, *args, **kwargs):
+        # 依座標更新 geohash
+        from .geo import location_geohash
+        self.geohash = location_geohash(self.latitude, self.longitude)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+
+        super().save(*args, **kwargs)
+
 
 def location_photo_upload_path(instance, filename):
+    # 實際路徑由 ContentAddressedStorage 依內容雜湊決定，這裡只需保留副檔名，不必查詢所屬城市
     ext = filename.split('.')[-1]
     filename = f"{instance.uuid}.{ext}"
-    return f"location_photos/{instance.location.itinerary.journey.city}/{filename}"
+    return f"location_photos/{filename}"
 
 
 class LocationPhoto(models.Model):
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     location = models.ForeignKey(Location, on_delete=models.CASCADE)
-    image = models.ImageField(upload_to=location_photo_upload_path, help_text="地點圖片")
+    image = models.ImageField(upload_to=location_photo_upload_path, storage=get_photo_storage, help_text="地點圖片")
     caption = models.CharField(max_length=255, blank=True, null=True, help_text="圖片說明")
+    variants = models.JSONField(default=dict, blank=True, editable=False, help_text="縮圖資訊（由背景工作產生）")
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         verbose_name = "地點照片"
         verbose_name_plural = "地點照片列表"
+        indexes = [
+            # 內容定址儲存下以檔名查詢共用同一個檔案的照片
+            models.Index(fields=['image'], name='itin_loc_photo_image_idx'),
+        ]
 
     def __str__(self):
         return f"{self.location.name} - 照片"
+
+
+class EnrichmentStatusChoices(models.TextChoices):
+    PENDING = 'pending', '等待中'
+    RUNNING = 'running', '處理中'
+    DONE = 'done', '已完成'
+    FAILED = 'failed', '失敗'
+
+
+class LocationEnrichmentJob(models.Model):
+    location = models.ForeignKey(Location, on_delete=models.CASCADE)
+    google_maps_url = models.CharField(max_length=1000, help_text="Google Maps 地點網址")
+    status = models.CharField(max_length=20, default=EnrichmentStatusChoices.PENDING,
+                              choices=EnrichmentStatusChoices.choices, help_text="工作狀態")
+    attempts = models.PositiveIntegerField(default=0, help_text="已嘗試次數")
+    next_run_at = models.DateTimeField(default=timezone.now, help_text="下次執行時間")
+    last_error = models.TextField(blank=True, default='', help_text="最後一次錯誤訊息")
+    updated_at = models.DateTimeField(auto_now=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "地點資訊補齊工作"
+        verbose_name_plural = "地點資訊補齊工作列表"
+        indexes = [
+            models.Index(fields=['status', 'next_run_at'], name='itin_enrich_status_next_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.location.name} - {self.get_status_display()}"
@@ -1,4 +1,42 @@
-# """
-# Django 信號處理器已停用
-# 避免與手動更新功能產生衝突
-# """
\ No newline at end of file
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from HinaTravelDiary.images import schedule_photo_variants
+from journeys.models import Journey
+from .clustering import schedule_cluster_invalidation
+from .models import Itinerary, ItineraryPhoto, Location, LocationPhoto
+
+
+@receiver([post_save, post_delete], sender=Location)
+def invalidate_location_clusters(sender, instance, **kwargs):
+    """
+    地點異動時使所屬旅程與國家的叢集地圖快取失效（交易完成後一次處理）
+    """
+    schedule_cluster_invalidation(itinerary_ids=[instance.itinerary_id])
+
+
+@receiver(post_delete, sender=Itinerary)
+def invalidate_itinerary_clusters(sender, instance, **kwargs):
+    """
+    刪除行程時記錄所屬旅程，交易完成時行程已不存在，無法再由地點查出
+    """
+    schedule_cluster_invalidation(journey_ids=[instance.journey_id])
+
+
+@receiver(post_delete, sender=Journey)
+def invalidate_journey_clusters(sender, instance, **kwargs):
+    """
+    刪除旅程時使所屬國家的叢集地圖快取失效
+    """
+    schedule_cluster_invalidation(country_ids=[instance.country_id])
+
+
+@receiver(post_save, sender=ItineraryPhoto)
+@receiver(post_save, sender=LocationPhoto)
+def generate_photo_variants(sender, instance, update_fields=None, **kwargs):
+    """
+    行程與地點照片上傳或替換後於背景產生縮圖
+    """
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    schedule_photo_variants(instance)
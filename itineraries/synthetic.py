@@ -0,0 +1,320 @@
+"""
+效能測試用的合成資料
+
+以 bulk_create 批次寫入國家、城市、旅程、行程、地點與照片，不會觸發 post_save 信號（搜尋索引、快取版本等），
+適合在交易中產生大量資料後回滾，或寫入獨立的測試資料庫；刪除時同樣以 SQL 批次刪除，不會逐筆觸發 post_delete。
+"""
+import random
+from io import BytesIO
+from datetime import date, timedelta
+from typing import Dict, Optional
+
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image
+
+from HinaTravelDiary.cache_versions import bump_version
+from HinaTravelDiary.context_processors import HIGHLIGHTED_COUNTRIES_CACHE
+from HinaTravelDiary.storage import photo_storage
+from homepage.views import HOMEPAGE_CACHE, HOMEPAGE_CARDS_CACHE
+from journeys.models import City, Country, Journey, JourneyPhoto
+from search.fulltext import source_rows, update_documents
+from search.indexing import document_text, update_embeddings
+from search.models import SearchDocument, SearchIndexJob, SearchObjectTypeChoices, SemanticEmbedding
+from .geo import location_geohash
+from .models import Itinerary, ItineraryPhoto, Location, LocationEnrichmentJob, LocationPhoto, TimeSlotChoices
+
+# 產生地點時使用的城市中心點
+CITY_CENTERS = [
+    (25.0330, 121.5654),   # 台北
+    (35.6812, 139.7671),   # 東京
+    (34.6937, 135.5023),   # 大阪
+    (37.5665, 126.9780),   # 首爾
+    (13.7563, 100.5018),   # 曼谷
+    (48.8566, 2.3522),     # 巴黎
+    (40.7128, -74.0060),   # 紐約
+    (-33.8688, 151.2093),  # 雪梨
+]
+
+PLACE_WORDS = ['咖啡廳', '神社', '市場', '美術館', '公園', '拉麵店', '車站', '夜市', '海灘', '老街', 'Cafe', 'Museum']
+
+# 效能測試與查詢計畫分析使用的搜尋字串（地點名稱中的詞彙）
+SEARCH_QUERY = '拉麵店'
+
+BATCH_SIZE = 5000
+
+
+def _bulk_create(model, objects):
+    return model.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+
+
+def _invalidate_caches():
+    """
+    批次寫入與刪除不會觸發信號，由此讓首頁與國家列表的快取失效
+    """
+    for name in (HIGHLIGHTED_COUNTRIES_CACHE, HOMEPAGE_CACHE, HOMEPAGE_CARDS_CACHE):
+        bump_version(name)
+
+
+def generate_dataset(
+    author,
+    countries: int = 5,
+    cities_per_country: int = 3,
+    journeys_per_country: int = 20,
+    days_per_journey: int = 5,
+    locations_per_day: int = 10,
+    highlighted_ratio: float = 0.1,
+    photo_ratio: float = 0.0,
+    seed: int = 42,
+    label: str = 'bench',
+    search_index: bool = False,
+    stdout=None,
+) -> Dict[str, int]:
+    """
+    產生指定規模的資料，回傳各資料類型的筆數
+    label 用來區分不同批次的國家代碼與名稱（國家欄位皆為唯一值）
+    search_index 為 True 時一併建立全文檢索文件與語意搜尋向量，供搜尋的效能測試使用
+    """
+    rng = random.Random(seed)
+
+    def log(message: str):
+        if stdout is not None:
+            stdout.write(message)
+
+    country_objs = _bulk_create(Country, [
+        Country(
+            name=f'{label}-國家-{i}',
+            english_name=f'{label}-country-{i}',
+            country_code=f'ZZ-{label}-{i}'.upper(),
+            is_highlighted=i == 0,
+        )
+        for i in range(countries)
+    ])
+    city_objs = _bulk_create(City, [
+        City(country=country, name=f'城市-{j}', english_name=f'city-{j}')
+        for country in country_objs
+        for j in range(cities_per_country)
+    ])
+    cities_by_country = {}
+    for city in city_objs:
+        cities_by_country.setdefault(city.country_id, []).append(city)
+    log(f"已建立 {len(country_objs)} 個國家、{len(city_objs)} 個城市")
+
+    journey_objs = []
+    for country in country_objs:
+        for _ in range(journeys_per_country):
+            start = date(2020, 1, 1) + timedelta(days=rng.randrange(2000))
+            journey_objs.append(Journey(
+                country=country,
+                city=rng.choice(cities_by_country[country.id]) if cities_per_country else None,
+                title=f'{country.name} 之旅 {len(journey_objs) + 1}',
+                description=f'在 {country.name} 的 {days_per_journey} 天旅程',
+                start_date=start,
+                end_date=start + timedelta(days=days_per_journey - 1),
+                is_highlighted=rng.random() < highlighted_ratio,
+                author=author,
+            ))
+    journey_objs = _bulk_create(Journey, journey_objs)
+    log(f"已建立 {len(journey_objs)} 個旅程")
+
+    itinerary_objs = _bulk_create(Itinerary, [
+        Itinerary(
+            journey=journey,
+            title=f"Day-{day + 1:02d}-{(journey.start_date + timedelta(days=day)).strftime('%Y.%m.%d')}",
+            description=f'第 {day + 1} 天行程',
+            start_date=journey.start_date + timedelta(days=day),
+        )
+        for journey in journey_objs
+        for day in range(days_per_journey)
+    ])
+    log(f"已建立 {len(itinerary_objs)} 個行程")
+
+    time_slots = list(TimeSlotChoices.values)
+    now = timezone.now()
+    location_count = 0
+    batch = []
+    for itinerary in itinerary_objs:
+        center_lat, center_lng = rng.choice(CITY_CENTERS)
+        for order in range(1, locations_per_day + 1):
+            lat = center_lat + rng.uniform(-0.2, 0.2)
+            lng = center_lng + rng.uniform(-0.2, 0.2)
+            batch.append(Location(
+                itinerary=itinerary,
+                name=f'{rng.choice(PLACE_WORDS)} {location_count + len(batch) + 1}',
+                description='合成測試資料',
+                address=f'測試路 {order} 號',
+                latitude=lat,
+                longitude=lng,
+                geohash=location_geohash(lat, lng),
+                rating=round(rng.uniform(3, 5), 1),
+                order=order,
+                time_slot=time_slots[min(len(time_slots) - 1, (order - 1) * len(time_slots) // locations_per_day)],
+                updated_at=now,
+            ))
+            if len(batch) >= BATCH_SIZE:
+                _bulk_create(Location, batch)
+                location_count += len(batch)
+                batch = []
+    if batch:
+        _bulk_create(Location, batch)
+        location_count += len(batch)
+    log(f"已建立 {location_count} 個地點")
+
+    photo_counts = _generate_photos(rng, journey_objs, itinerary_objs, photo_ratio) if photo_ratio else {}
+    if photo_counts:
+        log(f"已建立照片：{photo_counts}")
+
+    index_counts = index_dataset(label) if search_index else {}
+    if index_counts:
+        log(f"已建立搜尋索引：{index_counts}")
+
+    transaction.on_commit(_invalidate_caches)
+
+    return {
+        'countries': len(country_objs),
+        'cities': len(city_objs),
+        'journeys': len(journey_objs),
+        'itineraries': len(itinerary_objs),
+        'locations': location_count,
+        **photo_counts,
+        **index_counts,
+    }
+
+
+# 各資料類型篩選某批次資料的國家代碼路徑
+_LABEL_PATHS = {
+    SearchObjectTypeChoices.JOURNEY: 'country__country_code__startswith',
+    SearchObjectTypeChoices.ITINERARY: 'journey__country__country_code__startswith',
+    SearchObjectTypeChoices.LOCATION: 'itinerary__journey__country__country_code__startswith',
+}
+
+
+def index_dataset(label: str, batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+    """
+    以 id 分批為某批次的資料建立全文檢索文件與語意搜尋向量，回傳各資料類型建立的數量
+    bulk_create 不會排入搜尋索引工作，因此直接寫入索引，不經過 process_search_index
+    """
+    counts = {}
+    for object_type, label_path in _LABEL_PATHS.items():
+        rows_of_label = source_rows(object_type).filter(**{label_path: f'ZZ-{label}-'.upper()})
+        indexed = 0
+        last_id = 0
+        while True:
+            rows = list(rows_of_label.filter(id__gt=last_id).order_by('id')[:batch_size])
+            if not rows:
+                break
+            update_documents(object_type, rows)
+            update_embeddings(object_type, ((row['id'], document_text(object_type, row)) for row in rows))
+            indexed += len(rows)
+            last_id = rows[-1]['id']
+        counts[f'{object_type}_index'] = indexed
+    return counts
+
+
+def _placeholder_photo_name() -> str:
+    """
+    產生一張相機解析度的佔位照片並存入內容定址儲存，所有合成照片共用這個檔案
+    """
+    buffer = BytesIO()
+    Image.new('RGB', (4000, 3000), (120, 160, 200)).save(buffer, 'JPEG', quality=85)
+    return photo_storage.save('synthetic.jpg', ContentFile(buffer.getvalue()))
+
+
+def _generate_photos(rng, journeys, itineraries, ratio: float) -> Dict[str, int]:
+    name = _placeholder_photo_name()
+    journey_photos = _bulk_create(JourneyPhoto, [
+        JourneyPhoto(journey=journey, image=name) for journey in journeys if rng.random() < ratio
+    ])
+    itinerary_photos = _bulk_create(ItineraryPhoto, [
+        ItineraryPhoto(itinerary=itinerary, image=name) for itinerary in itineraries if rng.random() < ratio
+    ])
+    # 行程是同一批 bulk_create 寫入，id 連續；以範圍查詢取代龐大的 IN 清單，並以 iterator 逐批讀取地點 id
+    location_ids = (
+        Location.objects.filter(itinerary_id__gte=itineraries[0].id, itinerary_id__lte=itineraries[-1].id)
+        .values_list('id', flat=True)
+        .iterator()
+    ) if itineraries else []
+    location_photo_count = 0
+    batch = []
+    for location_id in location_ids:
+        if rng.random() < ratio:
+            batch.append(LocationPhoto(location_id=location_id, image=name))
+        if len(batch) >= BATCH_SIZE:
+            _bulk_create(LocationPhoto, batch)
+            location_photo_count += len(batch)
+            batch = []
+    if batch:
+        _bulk_create(LocationPhoto, batch)
+        location_photo_count += len(batch)
+    return {
+        'journey_photos': len(journey_photos),
+        'itinerary_photos': len(itinerary_photos),
+        'location_photos': location_photo_count,
+    }
+
+
+def analyze_tables():
+    """
+    更新資料表統計資訊，讓查詢計畫反映剛寫入的資料量
+    """
+    with connection.cursor() as cursor:
+        for model in (Country, City, Journey, Itinerary, Location):
+            cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+
+def sample_ids(label: str) -> Optional[Dict[str, int]]:
+    """
+    取得某批次資料中的第一個國家及其最新旅程、第一天行程與旅程作者，作為查詢計畫與效能測試的代表資料
+    """
+    country = Country.objects.filter(country_code__startswith=f'ZZ-{label}-'.upper()).order_by('id').first()
+    if country is None:
+        return None
+    journey = Journey.objects.filter(country=country).order_by('-start_date').first()
+    itinerary = Itinerary.objects.filter(journey=journey).order_by('start_date').first()
+    return {'country': country.id, 'journey': journey.id, 'itinerary': itinerary.id, 'author': journey.author_id}
+
+
+def _delete_rows(queryset) -> int:
+    table = connection.ops.quote_name(queryset.model._meta.db_table)
+    ids_sql, ids_params = queryset.values('id').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE id IN ({ids_sql})', ids_params)
+        return cursor.rowcount
+
+
+def delete_dataset(label: str) -> Dict[str, int]:
+    """
+    刪除某批次的所有資料，回傳各資料類型刪除的筆數
+    Django 的連帶刪除會逐筆載入資料並觸發 post_delete（搜尋索引、叢集快取、首頁快取），
+    這裡改為由下而上逐表以一個 DELETE 刪除，查詢次數與資料量無關，
+    信號負責的搜尋索引與快取失效則在此一次處理
+    """
+    countries = Country.objects.filter(country_code__startswith=f'ZZ-{label}-'.upper())
+    journeys = Journey.objects.filter(country__in=countries)
+    itineraries = Itinerary.objects.filter(journey__in=journeys)
+    locations = Location.objects.filter(itinerary__in=itineraries)
+
+    for object_type, queryset in (
+        (SearchObjectTypeChoices.JOURNEY, journeys),
+        (SearchObjectTypeChoices.ITINERARY, itineraries),
+        (SearchObjectTypeChoices.LOCATION, locations),
+    ):
+        for model in (SearchDocument, SemanticEmbedding, SearchIndexJob):
+            _delete_rows(model.objects.filter(object_type=object_type, object_id__in=queryset.values('id')))
+
+    # 子資料先刪除，外鍵條件的子查詢在各自的 DELETE 執行時才計算
+    counts = {
+        'location_photos': _delete_rows(LocationPhoto.objects.filter(location__in=locations)),
+        'enrichment_jobs': _delete_rows(LocationEnrichmentJob.objects.filter(location__in=locations)),
+        'locations': _delete_rows(locations),
+        'itinerary_photos': _delete_rows(ItineraryPhoto.objects.filter(itinerary__in=itineraries)),
+        'itineraries': _delete_rows(itineraries),
+        'journey_photos': _delete_rows(JourneyPhoto.objects.filter(journey__in=journeys)),
+        'journeys': _delete_rows(journeys),
+        'cities': _delete_rows(City.objects.filter(country__in=countries)),
+        'countries': _delete_rows(countries),
+    }
+
+    transaction.on_commit(_invalidate_caches)
+    return counts
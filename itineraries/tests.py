@@ -1,3 +1,530 @@
-from django.test import TestCase
+import json
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import parse_http_date
+from requests.adapters import HTTPAdapter
+
+from HinaTravelDiary import profiling
+from HinaTravelDiary.cache_versions import get_version
+from HinaTravelDiary.context_processors import HIGHLIGHTED_COUNTRIES_CACHE
+from homepage.views import HOMEPAGE_CACHE, HOMEPAGE_CARDS_CACHE
+from journeys.models import Country, Journey
+from search.fulltext import fulltext_search
+from search.models import SearchDocument, SemanticEmbedding
+from .clustering import get_clusters
+from .enrichment import MAX_ATTEMPTS, STALE_AFTER, claim_jobs
+from .models import EnrichmentStatusChoices, Itinerary, ItineraryPhoto, Location, LocationEnrichmentJob, TimeSlotChoices
+from .synthetic import SEARCH_QUERY, delete_dataset, generate_dataset
+from .utils import ApiResponseCache, BatchImporter, HostRateLimiter, LocationHandler, google_maps_rate_limiter
+
+
+def create_itinerary():
+    """
+    建立測試用的使用者、國家、旅程與行程
+    """
+    user = User.objects.create(username=f'tester-{User.objects.count()}')
+    country = Country.objects.create(
+        name=f'測試國-{user.username}', english_name=f'Testland-{user.username}', country_code=f'ZZ-{user.username}'
+    )
+    journey = Journey.objects.create(
+        country=country, title='測試旅程', description='測試', author=user,
+        start_date=date(2025, 1, 1), end_date=date(2025, 1, 1)
+    )
+    return Itinerary.objects.create(journey=journey, title='Day-01', description='測試', start_date=journey.start_date)
+
+
+class StubMapsServer:
+    """
+    模擬 Google Maps 的本機 HTTP 伺服器，記錄收到的請求與最大同時處理數
+    """
+
+    # 短網址代碼對應的回應：轉址目標路徑或錯誤狀態碼
+    SHORT_LINKS = {
+        'tower': '/maps/place/Tokyo+Tower/@35.6585805,139.7454329,17z',
+        'temple': '/maps/place/Senso-ji/@35.7147651,139.7966553,17z',
+        'missing': 404,
+        'busy': 429,
+        'broken': 503,
+    }
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                stub.handle(self, body=False)
+
+            def do_GET(self):
+                stub.handle(self, body=True)
+
+        return Handler
+
+    def handle(self, request, body: bool):
+        with self._lock:
+            self.requests.append(request.path)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            status, headers, payload = self.respond(urlsplit(request.path))
+        finally:
+            with self._lock:
+                self.active -= 1
+
+        request.send_response(status)
+        for name, value in headers.items():
+            request.send_header(name, value)
+        data = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        request.send_header('Content-Length', str(len(data)))
+        request.end_headers()
+        if body:
+            request.wfile.write(data)
+
+    def respond(self, url):
+        if url.path.startswith('/short/'):
+            target = self.SHORT_LINKS.get(url.path[len('/short/'):], 404)
+            if isinstance(target, int):
+                return target, {}, None
+            return 302, {'Location': target}, None
+        if url.path.startswith('/maps/place/'):
+            return 200, {}, None
+        if url.path == '/maps/api/place/textsearch/json':
+            query = parse_qs(url.query)['query'][0]
+            return 200, {'Content-Type': 'application/json'}, {'status': 'OK', 'results': [{
+                'place_id': f'id-{query}',
+                'name': query,
+                'formatted_address': f'{query} 地址',
+                'geometry': {'location': {'lat': 25.0, 'lng': 121.5}},
+                'types': ['point_of_interest'],
+            }]}
+        return 404, {}, None
+
+
+class StubServerAdapter(HTTPAdapter):
+    """
+    將發往 Google Maps API 的請求轉送到本機的 StubMapsServer
+    """
+
+    def __init__(self, base_url: str):
+        super().__init__()
+        self.base_url = base_url
+
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url)
+        request.url = f"{self.base_url}{url.path}?{url.query}"
+        return super().send(request, **kwargs)
+
+
+class ApiResponseCacheKeyTests(SimpleTestCase):
+    """
+    Google Maps API 回應快取鍵
+    """
+    details_url = 'https://maps.googleapis.com/maps/api/place/details/json'
+    textsearch_url = 'https://maps.googleapis.com/maps/api/place/textsearch/json'
+
+    def test_place_ids_differing_only_in_case_get_different_keys(self):
+        lower = ApiResponseCache.make_key(self.details_url, {'place_id': 'ChIJabc', 'language': 'zh-TW'})
+        upper = ApiResponseCache.make_key(self.details_url, {'place_id': 'ChIJABC', 'language': 'zh-TW'})
+        self.assertNotEqual(lower, upper)
+
+    def test_free_text_query_ignores_case_and_whitespace(self):
+        first = ApiResponseCache.make_key(self.textsearch_url, {'query': 'Tokyo  Tower', 'language': 'zh-TW'})
+        second = ApiResponseCache.make_key(self.textsearch_url, {'query': ' tokyo tower ', 'language': 'zh-TW'})
+        self.assertEqual(first, second)
+
+    def test_api_key_is_not_part_of_the_key(self):
+        without_key = ApiResponseCache.make_key(self.details_url, {'place_id': 'ChIJabc'})
+        with_key = ApiResponseCache.make_key(self.details_url, {'place_id': 'ChIJabc', 'key': 'secret'})
+        self.assertEqual(without_key, with_key)
+
+
+@override_settings(GOOGLE_MAPS_API_KEY='test-key')
+class BatchImporterTests(TestCase):
+    """
+    以本機模擬伺服器測試並行批次匯入
+    """
+
+    def _importer(self, server, rate_limiter, max_workers=4, cache=None):
+        handler = LocationHandler(cache=cache, rate_limiter=rate_limiter)
+        handler.session.mount('https://maps.googleapis.com/', StubServerAdapter(server.base_url))
+        return BatchImporter(max_workers=max_workers, handler=handler)
+
+    def _urls(self, count, prefix='place'):
+        return [f'https://www.google.com/maps/search/?api=1&query={prefix}{i}' for i in range(count)]
+
+    def test_results_keep_input_order(self):
+        with StubMapsServer(delay=0.01) as server:
+            importer = self._importer(server, HostRateLimiter(0, max_concurrent=4))
+            locations = importer.import_urls(self._urls(12))
+
+        self.assertEqual([location['name'] for location in locations], [f'place{i}' for i in range(12)])
+        self.assertEqual([location['order'] for location in locations], list(range(1, 13)))
+        self.assertEqual(len(server.requests), 12)
+
+    def test_importers_share_the_module_rate_limiter(self):
+        first = BatchImporter()
+        second = BatchImporter()
+        self.assertIs(first.handler.rate_limiter, google_maps_rate_limiter)
+        self.assertIs(second.handler.rate_limiter, google_maps_rate_limiter)
+
+    def test_concurrent_importers_respect_one_concurrency_cap(self):
+        limiter = HostRateLimiter(0, max_concurrent=2)
+        with StubMapsServer(delay=0.05) as server:
+            importers = [self._importer(server, limiter, max_workers=4) for _ in range(2)]
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                results = list(executor.map(
+                    lambda args: args[0].import_urls(self._urls(6, prefix=args[1])),
+                    zip(importers, ('a', 'b')),
+                ))
+
+        self.assertEqual([len(locations) for locations in results], [6, 6])
+        self.assertEqual(len(server.requests), 12)
+        self.assertLessEqual(server.max_active, 2)
+
+    def test_worker_closes_its_database_connection(self):
+        with StubMapsServer() as server:
+            # 使用資料庫快取，讓背景執行緒實際開啟資料庫連線
+            importer = self._importer(server, HostRateLimiter(0), cache=ApiResponseCache(max_entries=0))
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                locations, timing = executor.submit(importer._import_one, 0, self._urls(1)[0], 1).result()
+                connection_open = executor.submit(
+                    lambda: connections['default'].connection is not None
+                ).result()
+
+        self.assertEqual(timing['status'], 'ok')
+        self.assertFalse(connection_open)
+
+
+class ShortUrlResolutionTests(SimpleTestCase):
+    """
+    以本機模擬伺服器的轉址測試短網址解析與快取
+    """
+
+    def setUp(self):
+        self.server = StubMapsServer().__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        self.handler = LocationHandler(cache=ApiResponseCache(alias='default'))
+
+    def short_url(self, code):
+        return f'{self.server.base_url}/short/{code}'
+
+    def test_redirect_is_resolved_and_cached(self):
+        expected = f'{self.server.base_url}/maps/place/Tokyo+Tower/@35.6585805,139.7454329,17z'
+        self.assertEqual(self.handler.resolve_short_url(self.short_url('tower')), expected)
+        self.assertEqual(self.handler.resolve_short_url(self.short_url('tower')), expected)
+        self.assertEqual(self.server.requests.count('/short/tower'), 1)
+
+    def test_error_responses_are_not_cached(self):
+        for code in ('missing', 'busy', 'broken'):
+            with self.subTest(code=code), self.assertLogs('itineraries.utils', 'ERROR'):
+                self.assertIsNone(self.handler.resolve_short_url(self.short_url(code)))
+                self.assertIsNone(self.handler.resolve_short_url(self.short_url(code)))
+                self.assertEqual(self.server.requests.count(f'/short/{code}'), 2)
+
+    def test_batch_resolution_deduplicates_and_is_profiled(self):
+        profile = profiling.RequestProfile()
+        token = profiling._current_profile.set(profile)
+        try:
+            with self.assertLogs('itineraries.utils', 'ERROR'):
+                resolved = self.handler.resolve_short_urls(
+                    [self.short_url('tower'), self.short_url('temple'), self.short_url('tower'), self.short_url('busy')]
+                )
+        finally:
+            profiling._current_profile.reset(token)
+
+        self.assertEqual(len(resolved), 3)
+        self.assertTrue(resolved[self.short_url('temple')].endswith('/maps/place/Senso-ji/@35.7147651,139.7966553,17z'))
+        self.assertIsNone(resolved[self.short_url('busy')])
+        self.assertEqual(profile.external['gmaps'][0], 3)
+
+
+class EnrichmentClaimTests(TestCase):
+    """
+    地點資訊補齊工作的領取與重試上限
+    """
+
+    def setUp(self):
+        location = Location.objects.create(itinerary=create_itinerary(), name='測試地點')
+        self.job = LocationEnrichmentJob.objects.create(location=location, google_maps_url='https://maps.app.goo.gl/x')
+
+    def _crash(self):
+        # 模擬 worker 領取後中斷：工作停在處理中且超過逾時時間
+        LocationEnrichmentJob.objects.filter(id=self.job.id).update(updated_at=timezone.now() - STALE_AFTER * 2)
+
+    def test_every_claim_counts_as_an_attempt(self):
+        jobs = claim_jobs()
+        self.assertEqual([job.id for job in jobs], [self.job.id])
+        self.assertEqual(jobs[0].attempts, 1)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.attempts, 1)
+        self.assertEqual(self.job.status, EnrichmentStatusChoices.RUNNING)
+
+    def test_job_that_keeps_crashing_the_worker_eventually_fails(self):
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            jobs = claim_jobs()
+            self.assertEqual(jobs[0].attempts, attempt)
+            self._crash()
+
+        with self.assertLogs('itineraries.enrichment', 'ERROR'):
+            self.assertEqual(claim_jobs(), [])
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, EnrichmentStatusChoices.FAILED)
+        self.assertEqual(self.job.attempts, MAX_ATTEMPTS)
+
+
+class LocationListQueryTests(TestCase):
+    """
+    地點列表的查詢次數不隨地點數量增加
+    """
+
+    def setUp(self):
+        self.itinerary = create_itinerary()
+        self.time_slots = list(TimeSlotChoices.values)
+
+    def _create_locations(self, count):
+        start = Location.objects.filter(itinerary=self.itinerary).count()
+        Location.objects.bulk_create([
+            Location(
+                itinerary=self.itinerary, name=f'地點 {i}', order=i + 1, latitude=25.0, longitude=121.5,
+                time_slot=self.time_slots[i % len(self.time_slots)],
+            )
+            for i in range(start, start + count)
+        ])
+
+    def test_query_count_is_constant(self):
+        url = reverse('itineraries:location_list', args=[self.itinerary.id])
+        self._create_locations(1)
+        self.client.get(url)  # 暖身，讓精選國家快取就緒
+        # 行程（含旅程）與地點各一次
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+        self._create_locations(29)
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['locations']), 30)
+        self.assertEqual(
+            [len(slot['locations']) for slot in response.context['locations_by_time_slot'].values()], [10, 10, 10]
+        )
+
+
+class LocationMapDataTests(TestCase):
+    """
+    地圖資料的 ETag 與 Last-Modified 隨地點異動更新
+    """
+
+    def setUp(self):
+        self.itinerary = create_itinerary()
+        Location.objects.bulk_create([
+            Location(itinerary=self.itinerary, name=f'地點 {order}', order=order, latitude=25.0, longitude=121.5)
+            for order in (1, 2)
+        ])
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        Itinerary.objects.filter(id=self.itinerary.id).update(updated_at=an_hour_ago)
+        Location.objects.filter(itinerary=self.itinerary).update(updated_at=an_hour_ago)
+        self.url = reverse('itineraries:location_map_data', args=[self.itinerary.id])
+
+    def test_deleting_last_location_advances_last_modified(self):
+        last_modified = self.client.get(self.url)['Last-Modified']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        last = Location.objects.get(itinerary=self.itinerary, order=2)
+        delete_url = reverse('itineraries:delete_location', args=[self.itinerary.id, last.id])
+        self.assertEqual(self.client.delete(delete_url).status_code, 200)
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(parse_http_date(response['Last-Modified']), parse_http_date(last_modified))
+        self.assertEqual(len(json.loads(response.content)['locations']), 1)
+
+
+class ClusterInvalidationTests(TestCase):
+    """
+    地點異動時叢集地圖快取的失效
+    """
+
+    def setUp(self):
+        self.itinerary = create_itinerary()
+        self.journey = self.itinerary.journey
+
+    def _add_itinerary(self, location_count):
+        itinerary = Itinerary.objects.create(
+            journey=self.journey, title='Day-02', description='測試', start_date=self.journey.start_date
+        )
+        Location.objects.bulk_create([
+            Location(itinerary=itinerary, name=f'地點 {i}', latitude=25.0 + i * 0.01, longitude=121.5)
+            for i in range(location_count)
+        ])
+        return itinerary
+
+    def _cluster_count(self, scope, scope_id):
+        return sum(cluster['count'] for cluster in get_clusters(scope, scope_id, 10))
+
+    def _delete_and_flush(self, itinerary):
+        """
+        刪除行程並回傳交易完成後處理叢集失效所用的查詢數
+        """
+        with self.captureOnCommitCallbacks() as callbacks:
+            itinerary.delete()
+        with CaptureQueriesContext(connection) as queries:
+            for callback in callbacks:
+                callback()
+        return len(queries.captured_queries)
+
+    def test_deleting_locations_invalidates_journey_and_country(self):
+        itinerary = self._add_itinerary(5)
+        self.assertEqual(self._cluster_count('journey', self.journey.id), 5)
+        self.assertEqual(self._cluster_count('country', self.journey.country_id), 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Location.objects.filter(itinerary=itinerary).first().delete()
+        self.assertEqual(self._cluster_count('journey', self.journey.id), 4)
+        self.assertEqual(self._cluster_count('country', self.journey.country_id), 4)
+
+        self._delete_and_flush(itinerary)
+        self.assertEqual(self._cluster_count('journey', self.journey.id), 0)
+        self.assertEqual(self._cluster_count('country', self.journey.country_id), 0)
+
+    def test_cascade_delete_invalidates_once_per_transaction(self):
+        small = self._delete_and_flush(self._add_itinerary(2))
+        large = self._delete_and_flush(self._add_itinerary(40))
+        self.assertEqual(small, large)
+
+
+class AdminChangelistQueryTests(TestCase):
+    """
+    後台行程與地點列表的查詢次數不隨資料筆數增加
+    """
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='admin'))
+
+    def _add_itineraries(self, count):
+        for _ in range(count):
+            itinerary = create_itinerary()
+            ItineraryPhoto.objects.create(itinerary=itinerary, image='photos/00/00/itinerary.jpg')
+            Location.objects.create(itinerary=itinerary, name='晴空塔', order=1)
+            Location.objects.create(itinerary=itinerary, name='淺草寺', order=2)
+
+    def _assert_constant_queries(self, url_name):
+        def get():
+            response = self.client.get(reverse(url_name))
+            self.assertEqual(response.status_code, 200)
+            return response
+
+        self._add_itineraries(1)
+        get()
+        with CaptureQueriesContext(connection) as queries:
+            get()
+        baseline = len(queries.captured_queries)
+
+        self._add_itineraries(9)
+        with self.assertNumQueries(baseline):
+            response = get()
+        self.assertGreaterEqual(response.context['cl'].result_count, 10)
+
+    def test_itinerary_changelist(self):
+        self._assert_constant_queries('admin:itineraries_itinerary_changelist')
+
+    def test_location_changelist(self):
+        self._assert_constant_queries('admin:itineraries_location_changelist')
+
+
+class DeleteDatasetTests(TestCase):
+    """
+    合成資料以 SQL 批次刪除，查詢次數與資料量無關；產生與刪除時一併處理搜尋索引與快取失效
+    """
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+
+    def _generate(self, label, journeys_per_country):
+        generate_dataset(
+            User.objects.create(username=f'author-{label}'), countries=2, cities_per_country=2,
+            journeys_per_country=journeys_per_country, days_per_journey=2, locations_per_day=3,
+            photo_ratio=0.5, label=label,
+        )
+
+    def _delete(self, label):
+        with CaptureQueriesContext(connection) as queries:
+            counts = delete_dataset(label)
+        return counts, len(queries.captured_queries)
+
+    def test_query_count_does_not_depend_on_dataset_size(self):
+        kept = create_itinerary()
+        self._generate('small', 1)
+        self._generate('large', 10)
+
+        small_counts, small_queries = self._delete('small')
+        large_counts, large_queries = self._delete('large')
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual(large_counts['journeys'], 20)
+        self.assertEqual(large_counts['locations'], 120)
+
+        self.assertEqual(list(Country.objects.values_list('id', flat=True)), [kept.journey.country_id])
+        self.assertEqual(list(Itinerary.objects.values_list('id', flat=True)), [kept.id])
+
+    def test_search_index_is_built_and_removed_with_dataset(self):
+        user = User.objects.create(username='author-indexed')
+        counts = generate_dataset(
+            user, countries=1, cities_per_country=1, journeys_per_country=2, days_per_journey=2,
+            locations_per_day=3, label='indexed', search_index=True,
+        )
+        self.assertEqual(counts['journey_index'], 2)
+        self.assertEqual(counts['itinerary_index'], 4)
+        self.assertEqual(counts['location_index'], 12)
+        self.assertEqual(SearchDocument.objects.count(), 18)
+        self.assertEqual(SemanticEmbedding.objects.count(), 18)
+        self.assertTrue(Location.objects.filter(name__startswith=SEARCH_QUERY).exists())
+        self.assertEqual(
+            {result['id'] for result in fulltext_search(SEARCH_QUERY, author_id=user.id)},
+            set(Location.objects.filter(name__startswith=SEARCH_QUERY).values_list('id', flat=True)),
+        )
+
+        delete_dataset('indexed')
+        self.assertFalse(SearchDocument.objects.exists())
+        self.assertFalse(SemanticEmbedding.objects.exists())
+
+    def test_generate_and_delete_invalidate_homepage_caches(self):
+        names = (HIGHLIGHTED_COUNTRIES_CACHE, HOMEPAGE_CACHE, HOMEPAGE_CARDS_CACHE)
+        for action in (lambda: self._generate('cached', 1), lambda: delete_dataset('cached')):
+            versions = [get_version(name) for name in names]
+            with self.captureOnCommitCallbacks(execute=True):
+                action()
+            for name, version in zip(names, versions):
+                self.assertGreater(get_version(name), version, name)
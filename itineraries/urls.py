@@ -7,6 +7,10 @@ urlpatterns = [
     path('journeys/<int:journey_id>/itineraries/', views.itinerary_list, name='itinerary_list'),
     path('itineraries/<int:itinerary_id>/locations/', views.location_list, name='location_list'),
     path('itineraries/<int:itinerary_id>/map-data/', views.location_map_data, name='location_map_data'),
+    path('journeys/<int:journey_id>/map-clusters/', views.journey_map_clusters, name='journey_map_clusters'),
+    path('countries/<int:country_id>/map-clusters/', views.country_map_clusters, name='country_map_clusters'),
+    path('locations/nearby/', views.nearby_locations, name='nearby_locations'),
+    path('locations/in-bbox/', views.locations_in_bbox_view, name='locations_in_bbox'),
     
     # 地點相關路由
     path('itineraries/<int:itinerary_id>/locations/create/', views.create_location, name='create_location'),
@@ -1,16 +1,359 @@
 import re
+import contextvars
 import requests
 import json
+import hashlib
 import logging
-from typing import List, Dict, Optional, Tuple
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Tuple, Any
 from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from HinaTravelDiary.profiling import track_external_call
+from requests.adapters import HTTPAdapter
 import urllib.parse
-from urllib.parse import urlparse, parse_qs
+from urllib.parse import urlparse, urlsplit
 import time
 
 # 設定日誌
 logger = logging.getLogger(__name__)
 
+# Google Maps API 快取設定
+GOOGLE_MAPS_CACHE_ALIAS = getattr(settings, 'GOOGLE_MAPS_CACHE_ALIAS', 'google_maps')
+
+# 各 endpoint 的快取存活時間（秒）
+GOOGLE_MAPS_CACHE_TTLS = {
+    'place/textsearch': 60 * 60 * 24 * 7,
+    'place/details': 60 * 60 * 24 * 30,
+    'geocode': 60 * 60 * 24 * 30,
+}
+GOOGLE_MAPS_CACHE_DEFAULT_TTL = 60 * 60 * 24
+
+# 自由輸入的文字參數，產生快取鍵時忽略大小寫與多餘空白；place_id 等識別碼區分大小寫，保持原樣
+GOOGLE_MAPS_FREE_TEXT_PARAMS = ('query', 'input', 'address')
+
+# 查無結果（負面結果）的快取存活時間（秒）
+GOOGLE_MAPS_NEGATIVE_CACHE_TTL = 60 * 60 * 6
+
+# 短網址對應的完整網址幾乎不會變動，快取較久
+GOOGLE_MAPS_SHORT_LINK_TTL = 60 * 60 * 24 * 30
+
+# 視為「確定查無結果」而可以快取的 API 狀態，其餘錯誤（配額、權限等）不快取
+GOOGLE_MAPS_NEGATIVE_STATUSES = ('ZERO_RESULTS', 'NOT_FOUND')
+
+_CACHE_MISS = object()
+
+# 對外請求的全域並行上限，以及同一主機兩次請求之間的最小間隔（秒）
+GOOGLE_MAPS_IMPORT_MAX_WORKERS = getattr(settings, 'GOOGLE_MAPS_IMPORT_MAX_WORKERS', 8)
+GOOGLE_MAPS_MIN_REQUEST_INTERVAL = getattr(settings, 'GOOGLE_MAPS_MIN_REQUEST_INTERVAL', 0.05)
+
+# 各呼叫端實際使用的地點欄位，Text Search 結果已包含時就不再呼叫 Details API
+# rating 不列入：Text Search 只有在地點沒有評分時才會省略，Details 也同樣不會有
+SEARCH_RESULT_FIELDS = ('name', 'formatted_address', 'geometry', 'types')
+LOCATION_INFO_FIELDS = ('formatted_address', 'geometry', 'types')
+
+# 地點解析統計（Details API 實際呼叫 / 省略次數）
+_resolution_stats = {'details_fetched': 0, 'details_skipped': 0}
+_resolution_stats_lock = threading.Lock()
+
+
+class ApiResponseCache:
+    """
+    Google Maps API 回應的兩層快取
+    第一層為行程內的 LRU，第二層為 Django cache（預設為資料庫快取，可跨 worker 共用）
+    """
+
+    def __init__(self, max_entries: int = 1024, alias: str = GOOGLE_MAPS_CACHE_ALIAS):
+        self.max_entries = max_entries
+        self.alias = alias
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            'local_hits': 0,
+            'shared_hits': 0,
+            'misses': 0,
+            'negative_hits': 0,
+            'stores': 0,
+        }
+
+    def _shared_cache(self):
+        """
+        取得共用快取，未設定指定 alias 時退回 default
+        """
+        try:
+            return caches[self.alias]
+        except Exception:
+            return caches['default']
+
+    @staticmethod
+    def make_key(url: str, params: Dict) -> str:
+        """
+        以 endpoint 與正規化後的請求參數產生快取鍵
+        只有自由輸入的文字參數會正規化，識別碼維持原樣
+        """
+        endpoint = urlparse(url).path.replace('/maps/api/', '').replace('/json', '')
+        normalized = {}
+        for name, value in params.items():
+            if name == 'key' or value is None:
+                continue
+            if name in GOOGLE_MAPS_FREE_TEXT_PARAMS and isinstance(value, str):
+                value = ' '.join(value.split()).lower()
+            normalized[name] = value
+
+        payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+        return f"gmaps:{endpoint}:{digest}"
+
+    @staticmethod
+    def ttl_for(url: str) -> int:
+        """
+        取得 endpoint 對應的快取存活時間
+        """
+        path = urlparse(url).path
+        for endpoint, ttl in GOOGLE_MAPS_CACHE_TTLS.items():
+            if f"/{endpoint}/" in path:
+                return ttl
+        return GOOGLE_MAPS_CACHE_DEFAULT_TTL
+
+    def get(self, key: str) -> Any:
+        """
+        依序查詢 LRU 與共用快取，查無資料時回傳 _CACHE_MISS
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._local.move_to_end(key)
+                    self._stats['local_hits'] += 1
+                    if value is None:
+                        self._stats['negative_hits'] += 1
+                    return value
+                del self._local[key]
+
+        try:
+            entry = self._shared_cache().get(key, _CACHE_MISS)
+        except Exception as e:
+            logger.warning(f"讀取 Google Maps 共用快取失敗: {e}")
+            entry = _CACHE_MISS
+
+        with self._lock:
+            if entry is _CACHE_MISS:
+                self._stats['misses'] += 1
+                return _CACHE_MISS
+
+            expires_at, value = entry
+            self._store_local(key, expires_at, value)
+            self._stats['shared_hits'] += 1
+            if value is None:
+                self._stats['negative_hits'] += 1
+            return value
+
+    def set(self, key: str, value: Optional[Dict], ttl: int):
+        """
+        寫入兩層快取，value 為 None 時代表查無結果
+        """
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._store_local(key, expires_at, value)
+            self._stats['stores'] += 1
+
+        try:
+            self._shared_cache().set(key, (expires_at, value), timeout=ttl)
+        except Exception as e:
+            logger.warning(f"寫入 Google Maps 共用快取失敗: {e}")
+
+    def _store_local(self, key: str, expires_at: float, value: Optional[Dict]):
+        self._local[key] = (expires_at, value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    def clear(self):
+        """
+        清除行程內快取與統計數據（共用快取不受影響）
+        """
+        with self._lock:
+            self._local.clear()
+            for name in self._stats:
+                self._stats[name] = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        回傳命中 / 未命中統計
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['local_entries'] = len(self._local)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = round((lookups - stats['misses']) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+# 所有 LocationHandler 共用同一份快取
+api_response_cache = ApiResponseCache()
+
+
+# Google Maps URL 解析：先以 str.find 找出各種標記的位置，再於該位置做錨定比對，
+# 避免對整個網址逐字元嘗試多組正規表達式
+_COORDINATE_MARKERS = (
+    ('/@', re.compile(r'/@(-?\d+\.?\d*),(-?\d+\.?\d*)')),
+    ('!3d', re.compile(r'!3d(-?\d+\.?\d*)!4d(-?\d+\.?\d*)')),
+)
+_COORDINATE_VALUE_RE = re.compile(r'(-?\d+\.?\d*),(-?\d+\.?\d*)')
+_MAPS_ID_RE = re.compile(r'[A-Za-z0-9_-]+')
+
+# 各資訊來源的優先順序
+_COORDINATE_PARAMS = ('q', 'center', 'll')
+_PLACE_ID_MARKERS = ('place_id=', 'ftid=', '!1s')
+_QUERY_PARAMS = ('q', 'query', 'search')
+_QUERY_PATH_MARKERS = ('/search/', '/place/')
+_URL_PARAMS = frozenset(_COORDINATE_PARAMS + _QUERY_PARAMS + ('mid',))
+_SHORT_LINK_HOSTS = ('maps.app.goo.gl', 'goo.gl')
+
+
+def _valid_coordinates(lat_str: str, lng_str: str) -> Optional[Tuple[float, float]]:
+    try:
+        lat, lng = float(lat_str), float(lng_str)
+    except ValueError:
+        return None
+    if -90 <= lat <= 90 and -180 <= lng <= 180:
+        return (lat, lng)
+    return None
+
+
+def _url_params(query_string: str) -> Dict[str, str]:
+    """
+    只解碼會用到的查詢參數（取第一個非空值），比 parse_qs 解碼全部參數快得多
+    """
+    params = {}
+    for pair in query_string.split('&'):
+        name, _, value = pair.partition('=')
+        if value and name in _URL_PARAMS and name not in params:
+            params[name] = urllib.parse.unquote_plus(value)
+    return params
+
+
+def _find_coordinates(url: str, params: Dict[str, str]) -> Optional[Tuple[float, float]]:
+    for marker, pattern in _COORDINATE_MARKERS:
+        pos = url.find(marker)
+        while pos != -1:
+            match = pattern.match(url, pos)
+            if match:
+                coords = _valid_coordinates(match.group(1), match.group(2))
+                if coords:
+                    return coords
+            pos = url.find(marker, pos + 1)
+
+    for name in _COORDINATE_PARAMS:
+        match = _COORDINATE_VALUE_RE.match(params.get(name, ''))
+        if match:
+            coords = _valid_coordinates(match.group(1), match.group(2))
+            if coords:
+                return coords
+    return None
+
+
+def _find_marked_id(url: str, marker: str) -> Optional[str]:
+    pos = url.find(marker)
+    while pos != -1:
+        match = _MAPS_ID_RE.match(url, pos + len(marker))
+        # 確保 place_id 格式正確（不包含 0x 格式）
+        if match and not match.group().startswith('0x'):
+            return match.group()
+        pos = url.find(marker, pos + 1)
+    return None
+
+
+def _find_query(url: str, params: Dict[str, str]) -> Optional[str]:
+    # 查詢參數優先於路徑中的地點名稱
+    for name in _QUERY_PARAMS:
+        if name in params:
+            return params[name]
+
+    for marker in _QUERY_PATH_MARKERS:
+        pos = url.find(marker)
+        if pos == -1:
+            continue
+        start = end = pos + len(marker)
+        while end < len(url) and url[end] not in '/?#':
+            end += 1
+        if end > start:
+            return urllib.parse.unquote(url[start:end])
+    return None
+
+
+def classify_google_maps_url(url: str) -> Dict:
+    """
+    解析 Google Maps URL，回傳結構化的解析結果：
+    coordinates、place_id、query、is_short_link、my_maps_id
+    """
+    url = url.strip()
+    parts = urlsplit(url)
+    params = _url_params(parts.query) if parts.query else {}
+    my_maps_id = _MAPS_ID_RE.match(params.get('mid', '')) if 'maps/d/' in url else None
+
+    return {
+        'coordinates': _find_coordinates(url, params),
+        'place_id': next(filter(None, (_find_marked_id(url, marker) for marker in _PLACE_ID_MARKERS)), None),
+        'query': _find_query(url, params),
+        'is_short_link': parts.netloc.endswith(_SHORT_LINK_HOSTS),
+        'my_maps_id': my_maps_id.group() if my_maps_id else None,
+    }
+
+
+class HostRateLimiter:
+    """
+    依主機限制請求速率，並可限制同時進行的請求數量
+    每個主機依序預約下一個可用時段，多執行緒同時呼叫時也能維持固定間隔
+    """
+
+    def __init__(self, min_interval: float = GOOGLE_MAPS_MIN_REQUEST_INTERVAL,
+                 max_concurrent: Optional[int] = None):
+        self.min_interval = min_interval
+        self._next_slot = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+
+    def wait(self, url: str):
+        """
+        等待直到可以對該 URL 的主機發出請求
+        """
+        if self.min_interval <= 0:
+            return
+
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self.min_interval
+
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+    @contextmanager
+    def request_slot(self, url: str):
+        """
+        取得並行名額並等待速率限制，請求完成後釋放名額
+        """
+        if self._slots is not None:
+            self._slots.acquire()
+        try:
+            self.wait(url)
+            yield
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+
+
+# 同一行程內的所有批次匯入共用速率限制與並行上限，同時處理多個請求時對外總速率不會倍增
+google_maps_rate_limiter = HostRateLimiter(GOOGLE_MAPS_MIN_REQUEST_INTERVAL, GOOGLE_MAPS_IMPORT_MAX_WORKERS)
+
 
 class LocationHandler:
     """
@@ -18,29 +361,63 @@ class LocationHandler:
     整合 Google Maps URL 解析、地點資訊搜尋和地址編碼功能
     """
     
-    def __init__(self):
+    def __init__(self, cache: Optional[ApiResponseCache] = api_response_cache,
+                 rate_limiter: Optional[HostRateLimiter] = None, pool_size: Optional[int] = None):
         self.api_key = getattr(settings, 'GOOGLE_MAPS_API_KEY', None)
         self.session = requests.Session()
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        
+        # 多執行緒共用 session 時，連線池大小需配合並行數量
+        if pool_size:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            self.session.mount('https://', adapter)
+            self.session.mount('http://', adapter)
+    
+    @contextmanager
+    def _request_slot(self, url: str):
+        """
+        依速率限制與並行上限取得請求名額
+        """
+        if self.rate_limiter is None:
+            yield
+            return
+        with self.rate_limiter.request_slot(url):
+            yield
         
     def _make_api_request(self, url: str, params: Dict) -> Optional[Dict]:
         """
         統一的 API 請求處理器
+        成功與查無結果的回應都會寫入快取，暫時性錯誤則不快取
         """
         if not self.api_key:
             logger.warning("Google Maps API Key 未設定")
             return None
+        
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(url, params)
+            cached = self.cache.get(cache_key)
+            if cached is not _CACHE_MISS:
+                return cached
             
         params['key'] = self.api_key
         
         try:
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            with self._request_slot(url), track_external_call('gmaps'):
+                response = self.session.get(url, params=params, timeout=10)
+                response.raise_for_status()
+                data = response.json()
             
-            if data.get('status') == 'OK':
+            status = data.get('status')
+            if status == 'OK':
+                if cache_key:
+                    self.cache.set(cache_key, data, self.cache.ttl_for(url))
                 return data
             else:
-                logger.error(f"Google API 錯誤: {data.get('status')} - {data.get('error_message', '')}")
+                if cache_key and status in GOOGLE_MAPS_NEGATIVE_STATUSES:
+                    self.cache.set(cache_key, None, GOOGLE_MAPS_NEGATIVE_CACHE_TTL)
+                logger.error(f"Google API 錯誤: {status} - {data.get('error_message', '')}")
                 return None
                 
         except requests.exceptions.RequestException as e:
@@ -50,60 +427,32 @@ class LocationHandler:
             logger.error(f"JSON 解析失敗: {e}")
             return None
     
+    def cache_stats(self) -> Dict[str, int]:
+        """
+        取得 API 快取命中統計
+        """
+        if self.cache is None:
+            return {}
+        return self.cache.stats()
+    
     def extract_coordinates_from_url(self, url: str) -> Optional[Tuple[float, float]]:
         """
         從各種 Google Maps URL 格式中提取座標
-        支援更多格式的 URL
-        """
-        # 清理 URL
-        url = url.strip()
-        
-        # 模式 1: /@lat,lng,zoom 格式
-        coord_patterns = [
-            r'/@(-?\d+\.?\d*),(-?\d+\.?\d*),\d+\.?\d*z',
-            r'/@(-?\d+\.?\d*),(-?\d+\.?\d*)',
-            r'!3d(-?\d+\.?\d*)!4d(-?\d+\.?\d*)',
-            r'q=(-?\d+\.?\d*),(-?\d+\.?\d*)',
-            r'center=(-?\d+\.?\d*),(-?\d+\.?\d*)',
-            r'll=(-?\d+\.?\d*),(-?\d+\.?\d*)',
-        ]
-        
-        for pattern in coord_patterns:
-            match = re.search(pattern, url)
-            if match:
-                try:
-                    lat = float(match.group(1))
-                    lng = float(match.group(2))
-                    if -90 <= lat <= 90 and -180 <= lng <= 180:
-                        return (lat, lng)
-                except (ValueError, IndexError):
-                    continue
-        
-        return None
+        """
+        return classify_google_maps_url(url)['coordinates']
     
     def extract_place_id_from_url(self, url: str) -> Optional[str]:
         """
         從 Google Maps URL 中提取 place_id
         """
-        place_id_patterns = [
-            r'place_id=([A-Za-z0-9_-]+)',
-            r'ftid=([A-Za-z0-9_-]+)',
-            r'!1s([A-Za-z0-9_-]+)',
-        ]
-        
-        for pattern in place_id_patterns:
-            match = re.search(pattern, url)
-            if match:
-                place_id = match.group(1)
-                # 確保 place_id 格式正確（不包含 0x 格式）
-                if not place_id.startswith('0x'):
-                    return place_id
-        
-        return None
+        return classify_google_maps_url(url)['place_id']
     
-    def search_place_by_query(self, query: str) -> Optional[Dict]:
+    def search_place_by_query(self, query: str,
+                              required_fields: Optional[Tuple[str, ...]] = SEARCH_RESULT_FIELDS) -> Optional[Dict]:
         """
         使用 Google Places Text Search API 搜尋地點
+        只有在搜尋結果缺少 required_fields 中的欄位時才呼叫 Details API，
+        required_fields 為 None 時一律取得詳細資訊
         """
         url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
         params = {
@@ -116,15 +465,50 @@ class LocationHandler:
         data = self._make_api_request(url, params)
         if data and data.get('results'):
             result = data['results'][0]
-            # 如果有 place_id，獲取詳細資訊
-            if result.get('place_id'):
-                detailed_result = self.get_place_details(result['place_id'])
-                if detailed_result:
-                    return detailed_result
+            if not result.get('place_id'):
+                return result
+            
+            missing_fields = self._missing_place_fields(result, required_fields)
+            if missing_fields is not None and not missing_fields:
+                self._record_resolution('details_skipped')
+                return result
+            
+            # 搜尋結果欄位不足，獲取詳細資訊
+            self._record_resolution('details_fetched')
+            detailed_result = self.get_place_details(result['place_id'])
+            if detailed_result:
+                return detailed_result
             return result
         
         return None
     
+    @staticmethod
+    def _missing_place_fields(result: Dict, required_fields: Optional[Tuple[str, ...]]) -> Optional[List[str]]:
+        """
+        計算搜尋結果缺少的欄位，required_fields 為 None 時回傳 None
+        """
+        if required_fields is None:
+            return None
+        
+        missing = [field for field in required_fields if not result.get(field)]
+        if 'geometry' in required_fields and 'geometry' not in missing:
+            if not result['geometry'].get('location'):
+                missing.append('geometry')
+        return missing
+    
+    @staticmethod
+    def _record_resolution(name: str):
+        with _resolution_stats_lock:
+            _resolution_stats[name] += 1
+    
+    @staticmethod
+    def resolution_stats() -> Dict[str, int]:
+        """
+        取得 Details API 呼叫與省略的次數統計
+        """
+        with _resolution_stats_lock:
+            return dict(_resolution_stats)
+    
     def get_place_details(self, place_id: str) -> Optional[Dict]:
         """
         使用 Google Places Details API 獲取地點詳細資訊
@@ -172,7 +556,8 @@ class LocationHandler:
         """
         url = "https://maps.googleapis.com/maps/api/geocode/json"
         params = {
-            'latlng': f"{lat},{lng}",
+            # 座標取到小數點後 6 位（約 0.1 公尺），讓相同地點能命中快取
+            'latlng': f"{lat:.6f},{lng:.6f}",
             'language': 'zh-TW'
         }
         
@@ -185,40 +570,65 @@ class LocationHandler:
     def resolve_short_url(self, short_url: str) -> Optional[str]:
         """
         解析短網址獲取完整 URL
+        只有成功轉址（2xx 且網址有變化）的結果會寫入快取，相同的短網址不會重複請求
         """
+        short_url = short_url.strip()
+        cache_key = None
+        if self.cache is not None:
+            # 短網址區分大小寫，不能使用 make_key 的正規化
+            cache_key = f"gmaps:shortlink:{hashlib.sha1(short_url.encode('utf-8')).hexdigest()}"
+            cached = self.cache.get(cache_key)
+            if cached is not _CACHE_MISS:
+                return cached
+        
         try:
-            response = self.session.head(short_url, allow_redirects=True, timeout=10)
-            return response.url
+            with self._request_slot(short_url), track_external_call('gmaps'):
+                response = self.session.head(short_url, allow_redirects=True, timeout=10)
+                response.raise_for_status()
         except requests.exceptions.RequestException as e:
             logger.error(f"短網址解析失敗: {e}")
             return None
+        
+        if response.url == short_url:
+            logger.warning(f"短網址沒有轉址: {short_url}")
+            return None
+        
+        if cache_key:
+            self.cache.set(cache_key, response.url, GOOGLE_MAPS_SHORT_LINK_TTL)
+        return response.url
     
-    def extract_search_query_from_url(self, url: str) -> Optional[str]:
+    def resolve_short_urls(self, short_urls: List[str],
+                           max_workers: int = GOOGLE_MAPS_IMPORT_MAX_WORKERS) -> Dict[str, Optional[str]]:
         """
-        從 Google Maps URL 中提取搜尋查詢字串
+        並行解析多個短網址（重複的網址只會解析一次），回傳 {短網址: 完整 URL}
         """
-        # 解析 URL 參數
-        parsed = urlparse(url)
-        params = parse_qs(parsed.query)
+        unique_urls = list(dict.fromkeys(url.strip() for url in short_urls if url and url.strip()))
+        if not unique_urls:
+            return {}
         
-        # 檢查各種可能的查詢參數
-        query_params = ['q', 'query', 'search']
-        for param in query_params:
-            if param in params and params[param]:
-                return params[param][0]
+        workers = max(1, min(max_workers, len(unique_urls)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='gmaps-shortlink') as executor:
+            # 與批次匯入相同，複製 context 讓呼叫計入目前請求的效能量測
+            futures = [
+                executor.submit(contextvars.copy_context().run, self._resolve_short_url_in_worker, url)
+                for url in unique_urls
+            ]
+            resolved = [future.result() for future in futures]
         
-        # 從路徑中提取
-        path_patterns = [
-            r'/search/([^/]+)',
-            r'/place/([^/]+)',
-        ]
-        
-        for pattern in path_patterns:
-            match = re.search(pattern, url)
-            if match:
-                return urllib.parse.unquote(match.group(1))
-        
-        return None
+        return dict(zip(unique_urls, resolved))
+    
+    def _resolve_short_url_in_worker(self, short_url: str) -> Optional[str]:
+        try:
+            return self.resolve_short_url(short_url)
+        finally:
+            # 背景執行緒讀寫資料庫快取時會各自開啟連線，處理完立即關閉以免連線外洩
+            connections.close_all()
+    
+    def extract_search_query_from_url(self, url: str) -> Optional[str]:
+        """
+        從 Google Maps URL 中提取搜尋查詢字串
+        """
+        return classify_google_maps_url(url)['query']
     
     def parse_my_maps_url(self, url: str) -> List[Dict]:
         """
@@ -272,15 +682,17 @@ class LocationHandler:
         """
         locations = []
         original_url = url
+        parsed = classify_google_maps_url(url)
         
         # 首先解析短網址
-        if 'maps.app.goo.gl' in url or 'goo.gl' in url:
+        if parsed['is_short_link']:
             resolved_url = self.resolve_short_url(url)
             if resolved_url:
                 url = resolved_url
+                parsed = classify_google_maps_url(url)
         
         # 方法 1: 優先嘗試提取搜尋查詢（最準確）
-        search_query = self.extract_search_query_from_url(url)
+        search_query = parsed['query']
         if search_query:
             # 清理搜尋查詢中的 + 符號
             clean_query = search_query.replace('+', ' ')
@@ -294,7 +706,7 @@ class LocationHandler:
                     return locations
         
         # 方法 2: 嘗試提取 place_id
-        place_id = self.extract_place_id_from_url(url)
+        place_id = parsed['place_id']
         if place_id:
             logger.info(f"使用 place_id: {place_id}")
             place_details = self.get_place_details(place_id)
@@ -305,7 +717,7 @@ class LocationHandler:
                     return locations
         
         # 方法 3: 嘗試提取座標（最後手段）
-        coordinates = self.extract_coordinates_from_url(url)
+        coordinates = parsed['coordinates']
         if coordinates:
             lat, lng = coordinates
             address = self.reverse_geocode(lat, lng)
@@ -323,7 +735,7 @@ class LocationHandler:
             return locations
         
         # 方法 4: 如果是 My Maps，使用特殊處理
-        if 'maps/d/' in url:
+        if parsed['my_maps_id']:
             return self.parse_my_maps_url(url)
         
         return locations
@@ -461,7 +873,7 @@ class LocationHandler:
             return None
         
         try:
-            place_result = self.search_place_by_query(location_name)
+            place_result = self.search_place_by_query(location_name, required_fields=LOCATION_INFO_FIELDS)
             if place_result:
                 return {
                     'rating': place_result.get('rating'),
@@ -584,51 +996,141 @@ def import_locations_from_google_maps(url: str) -> List[Dict]:
         }]
 
 
-def import_locations_from_multiple_urls(urls_text: str) -> List[Dict]:
+class BatchImporter:
     """
-    從多個 Google Maps URL 批次匯入地點
+    並行批次匯入引擎
+    以執行緒池共用同一個 LocationHandler（與其 requests.Session），
+    並以行程內共用的並行上限與主機速率限制保護 Google API 配額
     """
-    if not urls_text:
-        return []
-    
-    # 分割 URLs，過濾空行
-    urls = [url.strip() for url in urls_text.strip().split('\n') if url.strip()]
-    
-    all_locations = []
-    handler = LocationHandler()
-    
-    for i, url in enumerate(urls):
+
+    def __init__(self, max_workers: int = GOOGLE_MAPS_IMPORT_MAX_WORKERS,
+                 rate_limiter: HostRateLimiter = google_maps_rate_limiter,
+                 handler: Optional[LocationHandler] = None):
+        self.max_workers = max(1, max_workers)
+        self.handler = handler or LocationHandler(
+            rate_limiter=rate_limiter,
+            pool_size=self.max_workers,
+        )
+        self.timings = []
+
+    def _import_one(self, index: int, url: str, total: int) -> Tuple[List[Dict], Dict]:
+        """
+        解析單一網址，回傳 (地點列表, 計時資訊)
+        """
+        started = time.perf_counter()
+        status = 'ok'
+
         try:
-            logger.info(f"正在處理第 {i+1}/{len(urls)} 個網址: {url}")
-            locations = handler.parse_google_maps_url(url)
-            
+            logger.info(f"正在處理第 {index + 1}/{total} 個網址: {url}")
+            locations = self.handler.parse_google_maps_url(url)
+
             if locations:
                 for location in locations:
-                    location['order'] = i + 1
+                    location['order'] = index + 1
                     location['google_maps_url'] = url
-                all_locations.extend(locations)
             else:
                 # 如果無法解析，仍然創建一個地點記錄
-                all_locations.append({
-                    'name': f'待解析地點 {i+1}',
+                status = 'unresolved'
+                locations = [{
+                    'name': f'待解析地點 {index + 1}',
                     'description': f'無法自動解析的 Google Maps 連結\n\nURL: {url}',
-                    'order': i + 1,
+                    'order': index + 1,
                     'google_maps_url': url
-                })
-                
+                }]
+
         except Exception as e:
             logger.error(f"處理 URL {url} 時發生錯誤: {e}")
-            all_locations.append({
-                'name': f'錯誤地點 {i+1}',
+            status = 'error'
+            locations = [{
+                'name': f'錯誤地點 {index + 1}',
                 'description': f'處理時發生錯誤: {str(e)}\n\nURL: {url}',
-                'order': i + 1,
+                'order': index + 1,
                 'google_maps_url': url
-            })
+            }]
+        finally:
+            # 背景執行緒讀寫資料庫快取時會各自開啟連線，處理完立即關閉以免連線外洩
+            connections.close_all()
+
+        timing = {
+            'order': index + 1,
+            'url': url,
+            'status': status,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+        }
+        return locations, timing
+
+    def import_urls(self, urls: List[str]) -> List[Dict]:
+        """
+        並行解析所有網址，結果依輸入順序排列
+        每個網址的耗時會記錄在 self.timings
+        """
+        self.timings = []
+        if not urls:
+            return []
+
+        total = len(urls)
+        workers = min(self.max_workers, total)
+        
+        # 先批次解析（並去除重複的）短網址，之後各網址的解析可直接命中快取
+        if self.handler.cache is not None:
+            short_urls = [url for url in urls if classify_google_maps_url(url)['is_short_link']]
+            if len(short_urls) > 1:
+                self.handler.resolve_short_urls(short_urls, max_workers=self.max_workers)
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='gmaps-import') as executor:
+            # 複製 context 讓背景執行緒的 API 呼叫也計入目前請求的效能量測
+            futures = [
+                executor.submit(contextvars.copy_context().run, self._import_one, i, url, total)
+                for i, url in enumerate(urls)
+            ]
+            results = [future.result() for future in futures]
+
+        all_locations = []
+        for locations, timing in results:
+            all_locations.extend(locations)
+            self.timings.append(timing)
+
+        return all_locations
+
+
+def import_locations_from_multiple_urls(urls_text: str, max_workers: int = GOOGLE_MAPS_IMPORT_MAX_WORKERS) -> List[Dict]:
+    """
+    從多個 Google Maps URL 批次匯入地點
+    網址會並行解析，但回傳結果的 order 依照輸入順序
+    """
+    if not urls_text:
+        return []
+    
+    # 分割 URLs，過濾空行
+    urls = [url.strip() for url in urls_text.strip().split('\n') if url.strip()]
+    
+    started = time.perf_counter()
+    importer = BatchImporter(max_workers=max_workers)
+    all_locations = importer.import_urls(urls)
+    
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(f"批次處理完成，共創建 {len(all_locations)} 個地點，耗時 {elapsed_ms:.0f} ms")
+    for timing in importer.timings:
+        logger.debug(f"第 {timing['order']} 個網址 ({timing['status']}) 耗時 {timing['elapsed_ms']} ms: {timing['url']}")
     
-    logger.info(f"批次處理完成，共創建 {len(all_locations)} 個地點")
     return all_locations
 
 
+def apply_google_maps_data(location, location_data: Dict, url: str):
+    """
+    將 Google Maps 解析結果寫入地點（只更新有值的欄位）
+    """
+    update_fields = ['google_maps_url', 'updated_at']
+    for field in ('address', 'latitude', 'longitude', 'rating', 'place_types'):
+        if location_data.get(field):
+            setattr(location, field, location_data[field])
+            update_fields.append(field)
+    
+    # 總是更新 URL
+    location.google_maps_url = url
+    location.save(update_fields=update_fields)
+
+
 def update_location_from_google_maps(location, url: str) -> bool:
     """
     使用 Google Maps URL 更新地點資訊
@@ -642,34 +1144,12 @@ def update_location_from_google_maps(location, url: str) -> bool:
         locations = handler.parse_google_maps_url(url)
         
         if locations:
-            location_data = locations[0]  # 取第一個結果
-            
-            # 更新地點資訊（只更新有值的欄位）
-            if location_data.get('address'):
-                location.address = location_data['address']
-            
-            if location_data.get('latitude'):
-                location.latitude = location_data['latitude']
-            
-            if location_data.get('longitude'):
-                location.longitude = location_data['longitude']
-            
-            if location_data.get('rating'):
-                location.rating = location_data['rating']
-            
-            if location_data.get('place_types'):
-                location.place_types = location_data['place_types']
-            
-            # 總是更新 URL
-            location.google_maps_url = url
-            
-            # 儲存變更
-            location.save()
-            
+            # 取第一個結果
+            apply_google_maps_data(location, locations[0], url)
             logger.info(f"成功更新地點資訊: {location.name}")
             return True
         
     except Exception as e:
         logger.error(f"更新地點資訊時發生錯誤: {e}")
     
-    return False
\ No newline at end of file
+    return False
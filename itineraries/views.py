@@ -1,18 +1,34 @@
+import hashlib
+import json
 from django.shortcuts import render, get_object_or_404
 from django.conf import settings
-from django.http import JsonResponse
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django.views.decorators.http import require_GET, require_http_methods
 from django.views.decorators.csrf import csrf_exempt
-from django.db import models
-from django.db.models import F
-from journeys.models import Journey
+from django.db import models, transaction
+from django.db.models import F, Count, Max
+from journeys.models import Journey, Country
 from .models import Itinerary, Location
 from .utils import LocationHandler
+from .enrichment import enqueue_location_enrichment
+from .clustering import get_clusters, filter_by_bbox
+from .geo import nearest_locations, locations_in_bbox
 
 
 def itinerary_list(request, journey_id):
     journey = get_object_or_404(Journey, id=journey_id)
-    itineraries = Itinerary.objects.filter(journey=journey).order_by('start_date')
+    # 地點數量以 annotate 計算，照片一併 JOIN，避免每個行程各查詢一次
+    itineraries = (
+        Itinerary.objects.filter(journey=journey)
+        .select_related('itineraryphoto')
+        .annotate(location_count=Count('location'))
+        .order_by('start_date')
+    )
     
     context = {
         'journey': journey,
@@ -21,66 +37,183 @@ def itinerary_list(request, journey_id):
     return render(request, 'itineraries.html', context)
 
 
+# 地圖資料需要的欄位
+MAP_DATA_FIELDS = ('name', 'description', 'address', 'rating', 'order', 'latitude', 'longitude', 'google_maps_url')
+MAP_DATA_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def build_location_map_data(rows):
+    """將地點欄位（values() 格式的 dict）轉換為地圖資料（只包含有座標的地點）"""
+    location_data = []
+    for row in rows:
+        if row['latitude'] and row['longitude']:
+            location_data.append({
+                'name': row['name'],
+                'description': row['description'] or '',
+                'address': row['address'] or '',
+                'rating': row['rating'],
+                'order': row['order'],
+                'lat': float(row['latitude']),
+                'lng': float(row['longitude']),
+                'url': row['google_maps_url'] or ''
+            })
+    return location_data
+
+
 def location_list(request, itinerary_id):
-    itinerary = get_object_or_404(Itinerary, id=itinerary_id)
-    locations = Location.objects.filter(itinerary=itinerary).order_by('order')
+    itinerary = get_object_or_404(Itinerary.objects.select_related('journey'), id=itinerary_id)
+    # 只查詢一次，之後在 Python 中依時段分組
+    locations = list(Location.objects.filter(itinerary=itinerary).order_by('order'))
     
     # 按時段分組地點
-    from .models import TimeSlotChoices
     locations_by_time_slot = {
         'morning': {
             'title': '上午',
             'icon': 'fa-sun',
-            'locations': locations.filter(time_slot=TimeSlotChoices.MORNING)
+            'locations': []
         },
         'afternoon': {
             'title': '下午', 
             'icon': 'fa-cloud-sun',
-            'locations': locations.filter(time_slot=TimeSlotChoices.AFTERNOON)
+            'locations': []
         },
         'evening': {
             'title': '晚上',
             'icon': 'fa-moon',
-            'locations': locations.filter(time_slot=TimeSlotChoices.EVENING)
+            'locations': []
         }
     }
+    for location in locations:
+        time_slot_data = locations_by_time_slot.get(location.time_slot)
+        if time_slot_data is not None:
+            time_slot_data['locations'].append(location)
     
     context = {
         'itinerary': itinerary,
         'locations': locations,
         'locations_by_time_slot': locations_by_time_slot,
+        # 地圖資料直接嵌入頁面，不需再另外請求 map-data
+        'map_data': {
+            'locations': build_location_map_data(
+                {field: getattr(location, field) for field in MAP_DATA_FIELDS} for location in locations
+            ),
+            'api_key': getattr(settings, 'GOOGLE_MAPS_API_KEY', ''),
+            'itinerary_title': itinerary.title
+        },
     }
     return render(request, 'locations.html', context)
 
 
 @require_GET
 def location_map_data(request, itinerary_id):
-    """提供地圖資料的 API endpoint"""
-    itinerary = get_object_or_404(Itinerary, id=itinerary_id)
-    locations = Location.objects.filter(itinerary=itinerary).order_by('order')
+    """
+    提供地圖資料的 API endpoint
+    以行程與地點的最後更新時間產生 ETag，支援 304 回應並快取序列化後的內容
+    """
+    itinerary = get_object_or_404(Itinerary.objects.only('id', 'title', 'updated_at'), id=itinerary_id)
+    locations = Location.objects.filter(itinerary=itinerary)
+    api_key = getattr(settings, 'GOOGLE_MAPS_API_KEY', '') or ''
     
-    # 只返回有座標的地點
-    location_data = []
-    for location in locations:
-        if location.latitude and location.longitude:
-            location_data.append({
-                'name': location.name,
-                'description': location.description or '',
-                'address': location.address or '',
-                'rating': location.rating,
-                'order': location.order,
-                'lat': float(location.latitude),
-                'lng': float(location.longitude),
-                'url': location.google_maps_url or ''
-            })
+    stats = locations.aggregate(count=Count('id'), last_updated=Max('updated_at'))
+    last_modified = max(filter(None, [itinerary.updated_at, stats['last_updated']]))
+    version = hashlib.sha1(
+        f"{itinerary.id}:{itinerary.updated_at.isoformat()}:{stats['count']}:"
+        f"{stats['last_updated'].isoformat() if stats['last_updated'] else ''}:{api_key}".encode('utf-8')
+    ).hexdigest()
+    etag = f'"{version}"'
+    
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+    if not_modified is not None:
+        return not_modified
+    
+    cache_key = f"location-map-data:{itinerary.id}:{version}"
+    content = cache.get(cache_key)
+    if content is None:
+        rows = locations.order_by('order').values(*MAP_DATA_FIELDS)
+        content = json.dumps({
+            'locations': build_location_map_data(rows),
+            'api_key': api_key,
+            'itinerary_title': itinerary.title
+        }, cls=DjangoJSONEncoder).encode('utf-8')
+        cache.set(cache_key, content, MAP_DATA_CACHE_TIMEOUT)
+    
+    response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(int(last_modified.timestamp()))
+    patch_cache_control(response, private=True, max_age=0, must_revalidate=True)
+    return response
+
+
+def _map_clusters_response(request, scope, scope_id):
+    """叢集地圖資料，參數：zoom（縮放層級）、bbox（south,west,north,east，可省略）"""
+    try:
+        zoom = int(request.GET.get('zoom', 10))
+    except ValueError:
+        return JsonResponse({'error': '無效的縮放層級'}, status=400)
+    
+    clusters = get_clusters(scope, scope_id, zoom)
+    total = sum(cluster['count'] for cluster in clusters)
+    
+    bbox = request.GET.get('bbox')
+    if bbox:
+        try:
+            south, west, north, east = (float(value) for value in bbox.split(','))
+        except ValueError:
+            return JsonResponse({'error': '無效的 bbox 格式'}, status=400)
+        clusters = filter_by_bbox(clusters, (south, west, north, east))
     
     return JsonResponse({
-        'locations': location_data,
-        'api_key': getattr(settings, 'GOOGLE_MAPS_API_KEY', ''),
-        'itinerary_title': itinerary.title
+        'zoom': zoom,
+        'total': total,
+        'clusters': clusters,
     })
 
 
+@require_GET
+def journey_map_clusters(request, journey_id):
+    """提供整個旅程的叢集地圖資料"""
+    journey = get_object_or_404(Journey.objects.only('id'), id=journey_id)
+    return _map_clusters_response(request, 'journey', journey.id)
+
+
+@require_GET
+def country_map_clusters(request, country_id):
+    """提供整個國家的叢集地圖資料"""
+    country = get_object_or_404(Country.objects.only('id'), id=country_id)
+    return _map_clusters_response(request, 'country', country.id)
+
+
+@require_GET
+def nearby_locations(request):
+    """查詢距離指定座標最近的地點，參數：lat、lng、k（預設 10，最多 100）"""
+    try:
+        lat = float(request.GET['lat'])
+        lng = float(request.GET['lng'])
+        k = min(max(int(request.GET.get('k', 10)), 1), 100)
+    except (KeyError, ValueError):
+        return JsonResponse({'error': '請提供有效的 lat、lng 與 k'}, status=400)
+    
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return JsonResponse({'error': '座標超出範圍'}, status=400)
+    
+    return JsonResponse({'locations': nearest_locations(lat, lng, k)})
+
+
+@require_GET
+def locations_in_bbox_view(request):
+    """查詢 bbox（south,west,north,east）範圍內的地點，參數：bbox、limit（預設 500，最多 2000）"""
+    try:
+        south, west, north, east = (float(value) for value in request.GET['bbox'].split(','))
+        limit = min(max(int(request.GET.get('limit', 500)), 1), 2000)
+    except (KeyError, ValueError):
+        return JsonResponse({'error': '請提供有效的 bbox 與 limit'}, status=400)
+    
+    if south > north:
+        return JsonResponse({'error': 'bbox 的 south 不可大於 north'}, status=400)
+    
+    return JsonResponse({'locations': locations_in_bbox(south, west, north, east, limit)})
+
+
 @require_http_methods(["POST"])
 def create_location(request, itinerary_id):
     """建立新地點"""
@@ -115,36 +248,35 @@ def create_location(request, itinerary_id):
             'evening': TimeSlotChoices.EVENING
         }
         
-        # 建立地點
-        location = Location.objects.create(
-            itinerary=itinerary,
-            name=name,
-            address=address,
-            google_maps_url=google_maps_url,
-            description=description,
-            order=max_order + 1,
-            time_slot=time_slot_map.get(time_slot, TimeSlotChoices.MORNING)
-        )
-        
         # 設定時間（如果有提供）
+        time_fields = {}
         if arrived_hour and arrived_minute:
             try:
-                location.arrived_hour = int(arrived_hour)
-                location.arrived_minute = int(arrived_minute)
+                time_fields['arrived_hour'] = int(arrived_hour)
+                time_fields['arrived_minute'] = int(arrived_minute)
             except (ValueError, TypeError):
                 pass
         if departure_hour and departure_minute:
             try:
-                location.departure_hour = int(departure_hour)
-                location.departure_minute = int(departure_minute)
+                time_fields['departure_hour'] = int(departure_hour)
+                time_fields['departure_minute'] = int(departure_minute)
             except (ValueError, TypeError):
                 pass
         
-        location.save()
+        # 建立地點
+        location = Location.objects.create(
+            itinerary=itinerary,
+            name=name,
+            address=address,
+            google_maps_url=google_maps_url,
+            description=description,
+            order=max_order + 1,
+            time_slot=time_slot_map.get(time_slot, TimeSlotChoices.MORNING),
+            **time_fields
+        )
         
-        # 使用 update_location_from_google_maps 自動填入經緯度、評分等資訊
-        from .utils import update_location_from_google_maps
-        update_location_from_google_maps(location, google_maps_url)
+        # 經緯度、評分等資訊交由背景 worker 從 Google Maps 補齊
+        enqueue_location_enrichment(location, google_maps_url)
         
         return JsonResponse({
             'success': True,
@@ -218,10 +350,14 @@ def delete_location(request, itinerary_id, location_id):
         location.delete()
         
         # 重新排序剩餘地點
+        now = timezone.now()
         Location.objects.filter(
             itinerary=itinerary,
             order__gt=deleted_order
-        ).update(order=F('order') - 1)
+        ).update(order=F('order') - 1, updated_at=now)
+        
+        # 刪除最後一個地點時沒有其他地點被更新，同時更新行程時間讓地圖資料的 Last-Modified 前進
+        Itinerary.objects.filter(id=itinerary.id).update(updated_at=now)
         
         return JsonResponse({
             'success': True,
@@ -239,21 +375,20 @@ def reorder_locations(request, itinerary_id):
         itinerary = get_object_or_404(Itinerary, id=itinerary_id)
         
         # 獲取新的地點資料
-        import json
         data = json.loads(request.body)
         locations_data = data.get('locations', [])
         
         if not locations_data:
             return JsonResponse({'error': '請提供地點資料'}, status=400)
         
-        # 驗證所有地點都屬於這個行程
+        # 驗證所有地點都屬於這個行程（單一查詢）
         location_ids = [loc['id'] for loc in locations_data]
-        existing_locations = Location.objects.filter(
+        existing_ids = set(Location.objects.filter(
             itinerary=itinerary,
             id__in=location_ids
-        )
+        ).values_list('id', flat=True))
         
-        if existing_locations.count() != len(location_ids):
+        if len(existing_ids) != len(location_ids):
             return JsonResponse({'error': '無效的地點列表'}, status=400)
         
         # 批量更新順序和時段
@@ -264,15 +399,20 @@ def reorder_locations(request, itinerary_id):
             'evening': TimeSlotChoices.EVENING
         }
         
-        for loc_data in locations_data:
-            location = existing_locations.get(id=loc_data['id'])
-            location.order = loc_data['order']
-            
-            # 更新時段
-            time_slot_key = loc_data.get('time_slot', 'morning')
-            location.time_slot = time_slot_map.get(time_slot_key, TimeSlotChoices.MORNING)
-            
-            location.save()
+        now = timezone.now()
+        locations = [
+            Location(
+                id=loc_data['id'],
+                order=loc_data['order'],
+                time_slot=time_slot_map.get(loc_data.get('time_slot', 'morning'), TimeSlotChoices.MORNING),
+                updated_at=now
+            )
+            for loc_data in locations_data
+        ]
+        
+        # 以單一 UPDATE ... CASE WHEN 更新所有地點，只寫入 order、time_slot 與 updated_at
+        with transaction.atomic():
+            Location.objects.bulk_update(locations, ['order', 'time_slot', 'updated_at'], batch_size=1000)
         
         return JsonResponse({
             'success': True,
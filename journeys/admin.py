@@ -1,8 +1,10 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.contrib import messages
-from datetime import timedelta
+from django.db.models import Exists, OuterRef
+from HinaTravelDiary.images import variant_url
 from .models import Country, City, Journey, JourneyPhoto
+from .utils import sync_itineraries_for_journey
 
 
 class JourneyPhotoInline(admin.StackedInline):
@@ -13,7 +15,7 @@ class JourneyPhotoInline(admin.StackedInline):
     
     def image_preview(self, obj):
         if obj.image:
-            return format_html('<img src="{}" style="width: 200px; height: 200px; object-fit: cover; border-radius: 8px;" />', obj.image.url)
+            return format_html('<img src="{}" style="width: 200px; height: 200px; object-fit: cover; border-radius: 8px;" />', variant_url(obj, 200))
         return '尚未上傳圖片'
     image_preview.short_description = '圖片預覽'
 
@@ -31,6 +33,7 @@ class CityAdmin(admin.ModelAdmin):
     list_display = ['name', 'english_name', 'country']
     list_filter = ['country']
     search_fields = ['name', 'english_name', 'country__name']
+    list_select_related = ['country']
 
 
 @admin.register(Journey)
@@ -55,49 +58,39 @@ class JourneyAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        # 是否有照片以 EXISTS 子查詢計算，國家一併 JOIN
+        return super().get_queryset(request).select_related('country').annotate(
+            photo_exists=Exists(JourneyPhoto.objects.filter(journey=OuterRef('pk'))),
+        )
+    
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'city':
+            kwargs['queryset'] = City.objects.select_related('country')
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+    
     def has_photo(self, obj):
-        return hasattr(obj, 'journeyphoto') and obj.journeyphoto is not None
+        return obj.photo_exists
     has_photo.boolean = True
     has_photo.short_description = '有照片'
+    has_photo.admin_order_field = 'photo_exists'
     
     def save_model(self, request, obj, form, change):
         """儲存旅程並自動建立行程"""
         # 先儲存旅程
         super().save_model(request, obj, form, change)
         
-        # 只有在新建旅程時才自動建立行程
-        if not change:
+        # 新建旅程或日期範圍變更時同步行程
+        if not change or {'start_date', 'end_date'} & set(form.changed_data):
             self.create_itineraries_for_journey(request, obj)
     
     def create_itineraries_for_journey(self, request, journey):
         """為旅程自動建立每日行程"""
-        from itineraries.models import Itinerary
-        
-        current_date = journey.start_date
-        day_count = 1
-        created_count = 0
-        
-        while current_date <= journey.end_date:
-            # 格式化日期為 YYYY.MM.DD
-            date_str = current_date.strftime('%Y.%m.%d')
-            title = f"Day-{day_count:02d}-{date_str}"
-            
-            # 建立行程
-            itinerary = Itinerary.objects.create(
-                journey=journey,
-                title=title,
-                description=f"第 {day_count} 天行程",
-                start_date=current_date
-            )
-            
-            created_count += 1
-            current_date += timedelta(days=1)
-            day_count += 1
+        created_count, deleted_count = sync_itineraries_for_journey(journey)
         
         # 顯示成功訊息
-        messages.success(
-            request,
-            f"✅ 已成功為旅程「{journey.title}」自動建立 {created_count} 個行程！"
-        )
-
-
+        if created_count or deleted_count:
+            messages.success(
+                request,
+                f"✅ 已為旅程「{journey.title}」新增 {created_count} 個行程，移除 {deleted_count} 個行程！"
+            )
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class JourneysConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'journeys'
+
+    def ready(self):
+        """
+        應用程式啟動時載入信號處理器
+        """
+        import journeys.signals
@@ -0,0 +1,59 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from HinaTravelDiary.storage import BLOB_PREFIX, photo_reference_counts, photo_storage
+
+
+class Command(BaseCommand):
+    help = '清除內容定址儲存中沒有任何照片參照的檔案（只處理 photos/ 目錄，舊檔案不受影響）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help='最近修改時間在此時數內的檔案不會被清除，避免刪除剛上傳、尚未寫入資料庫的檔案')
+        parser.add_argument('--dry-run', action='store_true', help='只列出將被清除的檔案，不實際刪除')
+
+    def _walk(self, directory):
+        directories, files = photo_storage.listdir(directory)
+        for name in files:
+            yield f"{directory}/{name}"
+        for sub in directories:
+            if not sub.startswith('.'):
+                yield from self._walk(f"{directory}/{sub}")
+
+    def handle(self, *args, **options):
+        if not photo_storage.exists(BLOB_PREFIX):
+            self.stdout.write('尚無任何內容定址檔案')
+            return
+
+        # 先取得參照數再掃描檔案，掃描期間新寫入的檔案會受保留期限保護
+        counts = photo_reference_counts()
+        cutoff = time.time() - options['grace_hours'] * 3600
+
+        scanned = 0
+        orphaned = 0
+        freed_bytes = 0
+        for name in self._walk(BLOB_PREFIX):
+            scanned += 1
+            if counts[name]:
+                continue
+            path = photo_storage.path(name)
+            stat = os.stat(path)
+            if stat.st_mtime > cutoff:
+                continue
+
+            orphaned += 1
+            freed_bytes += stat.st_size
+            if options['dry_run']:
+                self.stdout.write(f"將清除：{name}")
+            else:
+                photo_storage.delete(name)
+
+        shared = sum(1 for count in counts.values() if count > 1)
+        action = '可清除' if options['dry_run'] else '已清除'
+        self.stdout.write(
+            f"共掃描 {scanned} 個檔案，{shared} 個檔案被多張照片共用，"
+            f"{action} {orphaned} 個未參照的檔案（{freed_bytes / (1024 * 1024):.1f} MB）"
+        )
+        self.stdout.write(self.style.SUCCESS('媒體檔案清理完成'))
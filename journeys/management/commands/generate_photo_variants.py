@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from HinaTravelDiary.cache_versions import bump_version
+from HinaTravelDiary.images import PHOTO_VARIANT_MAX_WORKERS, update_photo_variants
+from homepage.views import HOMEPAGE_CACHE, HOMEPAGE_CARDS_CACHE
+from itineraries.models import ItineraryPhoto, LocationPhoto
+from journeys.models import JourneyPhoto
+
+
+def _generate(photo, force):
+    try:
+        return update_photo_variants(photo, force=force)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = '為既有的旅程、行程與地點照片產生縮圖（預設略過已有縮圖的照片）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='重新產生所有照片的縮圖')
+        parser.add_argument('--workers', type=int, default=PHOTO_VARIANT_MAX_WORKERS, help='同時處理的照片數量')
+
+    def handle(self, *args, **options):
+        force = options['force']
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            for model in (JourneyPhoto, ItineraryPhoto, LocationPhoto):
+                photos = model.objects.exclude(image='').only('id', 'image', 'variants').order_by('id')
+                generated = 0
+                failed = 0
+                futures = [executor.submit(_generate, photo, force) for photo in photos.iterator()]
+                for future in futures:
+                    try:
+                        generated += future.result()
+                    except Exception as e:
+                        failed += 1
+                        self.stderr.write(f"產生縮圖失敗：{e}")
+
+                self.stdout.write(
+                    f"{model._meta.verbose_name}：共 {len(futures)} 張，產生 {generated} 張，失敗 {failed} 張"
+                )
+
+        bump_version(HOMEPAGE_CACHE)
+        bump_version(HOMEPAGE_CARDS_CACHE)
+        self.stdout.write(self.style.SUCCESS('照片縮圖產生完成'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journeys', '0005_journey_author'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journeyphoto',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='縮圖資訊（由背景工作產生）'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journeys', '0006_journeyphoto_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journeyphoto',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='移除中繼資料後的內容 SHA-256，相同內容共用同一個檔案', max_length=64),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:30
+
+import HinaTravelDiary.storage
+import journeys.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journeys', '0007_journeyphoto_content_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='journeyphoto',
+            name='image',
+            field=models.ImageField(storage=HinaTravelDiary.storage.get_photo_storage, upload_to=journeys.models.journey_photo_upload_path),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journeys', '0008_alter_journeyphoto_image'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='journey',
+            name='title',
+            field=models.CharField(db_index=True, max_length=200),
+        ),
+    ]
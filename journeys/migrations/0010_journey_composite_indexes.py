@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 14:30
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY 不能在交易中執行，建立索引時不會鎖住資料表寫入
+    atomic = False
+
+    dependencies = [
+        ('journeys', '0009_alter_journey_title'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='journey',
+            index=models.Index(fields=['country', '-start_date'], name='journey_country_start_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='journey',
+            index=models.Index(fields=['is_highlighted', '-updated_at'], name='journey_highlight_updated_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='journey',
+            index=models.Index(fields=['-updated_at'], name='journey_updated_idx'),
+        ),
+    ]
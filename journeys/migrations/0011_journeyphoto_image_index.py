@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-18 21:30
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY 不能在交易中執行，建立索引時不會鎖住資料表寫入
+    atomic = False
+
+    dependencies = [
+        ('journeys', '0010_journey_composite_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='journeyphoto',
+            index=models.Index(fields=['image'], name='journey_photo_image_idx'),
+        ),
+    ]
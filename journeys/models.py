@@ -1,6 +1,7 @@
 from django.db import models
 import uuid
 from django.contrib.auth.models import User
+from HinaTravelDiary.storage import get_photo_storage
 
 
 class Country(models.Model):
@@ -36,7 +37,7 @@ class Journey(models.Model):
     country = models.ForeignKey(Country, on_delete=models.CASCADE)
     city = models.ForeignKey(City, on_delete=models.CASCADE, blank=True, null=True)
 
-    title = models.CharField(max_length=200)
+    title = models.CharField(max_length=200, db_index=True)
     description = models.TextField()
     start_date = models.DateField()
     end_date = models.DateField()
@@ -50,12 +51,20 @@ class Journey(models.Model):
     class Meta:
         verbose_name = "旅程"
         verbose_name_plural = "旅程列表"
+        indexes = [
+            # 國家旅程列表
+            models.Index(fields=['country', '-start_date'], name='journey_country_start_idx'),
+            # 首頁精選與最新旅程
+            models.Index(fields=['is_highlighted', '-updated_at'], name='journey_highlight_updated_idx'),
+            models.Index(fields=['-updated_at'], name='journey_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.country.name} - {self.title}"
 
 
 def journey_photo_upload_path(instance, filename):
+    # 實際路徑由 ContentAddressedStorage 依內容雜湊決定，這裡只需保留副檔名
     ext = filename.split('.')[-1]
     filename = f"{instance.uuid}.{ext}"
     return f"journey_photos/{filename}"
@@ -64,13 +73,20 @@ def journey_photo_upload_path(instance, filename):
 class JourneyPhoto(models.Model):
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     journey = models.OneToOneField(Journey, on_delete=models.CASCADE)
-    image = models.ImageField(upload_to=journey_photo_upload_path)
+    image = models.ImageField(upload_to=journey_photo_upload_path, storage=get_photo_storage)
     caption = models.CharField(max_length=255, blank=True, null=True, help_text="説明圖片內容")
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True, editable=False,
+                                    help_text="移除中繼資料後的內容 SHA-256，相同內容共用同一個檔案")
+    variants = models.JSONField(default=dict, blank=True, editable=False, help_text="縮圖資訊（由背景工作產生）")
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         verbose_name = "旅程照片"
         verbose_name_plural = "旅程照片列表"
+        indexes = [
+            # 內容定址儲存下以檔名查詢共用同一個檔案的照片
+            models.Index(fields=['image'], name='journey_photo_image_idx'),
+        ]
     
     def __str__(self):
         return f"{self.journey.title} - 照片"
\ No newline at end of file
@@ -0,0 +1,50 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from HinaTravelDiary.cache_versions import bump_version
+from HinaTravelDiary.context_processors import HIGHLIGHTED_COUNTRIES_CACHE
+from HinaTravelDiary.images import schedule_photo_variants
+from homepage.views import HOMEPAGE_CACHE, HOMEPAGE_CARDS_CACHE
+from .models import Country, City, Journey, JourneyPhoto
+
+
+@receiver([post_save, post_delete], sender=Country)
+def invalidate_highlighted_countries(sender, **kwargs):
+    """
+    國家異動時使精選國家快取失效
+    """
+    bump_version(HIGHLIGHTED_COUNTRIES_CACHE)
+
+
+@receiver([post_save, post_delete], sender=Journey)
+def invalidate_homepage(sender, **kwargs):
+    """
+    旅程異動時使首頁整頁快取失效（卡片片段以 updated_at 區分，不需失效）
+    """
+    bump_version(HOMEPAGE_CACHE)
+
+
+@receiver([post_save, post_delete], sender=Country)
+@receiver([post_save, post_delete], sender=City)
+@receiver([post_save, post_delete], sender=JourneyPhoto)
+def invalidate_homepage_cards(sender, **kwargs):
+    """
+    旅程卡片上顯示的國家、城市或照片異動時，使首頁與所有卡片片段快取失效
+    """
+    bump_version(HOMEPAGE_CACHE)
+    bump_version(HOMEPAGE_CARDS_CACHE)
+
+
+def _invalidate_homepage_photo(photo):
+    bump_version(HOMEPAGE_CACHE)
+    bump_version(HOMEPAGE_CARDS_CACHE)
+
+
+@receiver(post_save, sender=JourneyPhoto)
+def generate_journey_photo_variants(sender, instance, update_fields=None, **kwargs):
+    """
+    旅程照片上傳或替換後於背景產生縮圖，完成後使首頁快取失效以改用縮圖
+    """
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    schedule_photo_variants(instance, on_complete=_invalidate_homepage_photo)
@@ -0,0 +1,55 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from HinaTravelDiary.images import VARIANT_FORMATS, supported_formats, variant_srcset, variant_url as _variant_url
+
+register = template.Library()
+
+
+@register.filter
+def srcset(photo, fmt='webp'):
+    """
+    照片指定格式的 srcset 字串，例如 {{ photo|srcset:"webp" }}
+    """
+    if not photo:
+        return ''
+    return variant_srcset(photo, fmt)
+
+
+@register.filter
+def variant_url(photo, min_width):
+    """
+    寬度至少為 min_width 的縮圖網址，例如 {{ photo|variant_url:640 }}
+    """
+    return _variant_url(photo, int(min_width))
+
+
+@register.simple_tag
+def responsive_photo(photo, alt='', css_class='', sizes='100vw', loading='lazy'):
+    """
+    輸出包含 AVIF / WebP / JPEG 縮圖的 <picture>，尚無縮圖時輸出原圖
+    例如 {% responsive_photo journey.journeyphoto alt=journey.title css_class="w-full" sizes="96px" %}
+    """
+    if not photo or not photo.image:
+        return ''
+
+    sources = [
+        (VARIANT_FORMATS[fmt][2], variant_srcset(photo, fmt), sizes)
+        for fmt in supported_formats()
+        if fmt != 'jpeg'
+    ]
+    sources = [source for source in sources if source[1]]
+    jpeg_srcset = variant_srcset(photo, 'jpeg')
+    if not sources and not jpeg_srcset:
+        return format_html('<img src="{}" alt="{}" class="{}" loading="{}">', photo.image.url, alt, css_class, loading)
+
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="{}" decoding="async"></picture>',
+        format_html_join('', '<source type="{}" srcset="{}" sizes="{}">', sources),
+        _variant_url(photo, 640, 'jpeg'),
+        jpeg_srcset,
+        sizes,
+        alt,
+        css_class,
+        loading,
+    )
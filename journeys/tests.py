@@ -1,3 +1,184 @@
-from django.test import TestCase
+import io
+import tempfile
+from datetime import date
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from HinaTravelDiary.tests import SECRET, gps_exif
+
+from itineraries.models import Itinerary, Location
+from search.models import SearchDocument, SearchObjectTypeChoices, SemanticEmbedding
+from search.tasks import claim_index_jobs, process_index_jobs
+from .models import City, Country, Journey, JourneyPhoto
+from .utils import sync_itineraries_for_journey
+
+
+class JourneyListQueryTests(TestCase):
+    """
+    旅程列表的查詢次數不隨旅程數量增加
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='tester')
+        cls.country = Country.objects.create(name='日本', english_name='Japan', country_code='JP')
+        cls.city = City.objects.create(country=cls.country, name='東京', english_name='Tokyo')
+
+    def _create_journeys(self, count):
+        for i in range(count):
+            journey = Journey.objects.create(
+                country=self.country, city=self.city, title=f'旅程 {i}', description='測試', author=self.user,
+                start_date=date(2025, 1, 1), end_date=date(2025, 1, 2),
+            )
+            Itinerary.objects.create(journey=journey, title='Day-01', description='測試', start_date=journey.start_date)
+            JourneyPhoto.objects.create(journey=journey, image=f'photos/00/00/{i:064d}.jpg')
+
+    def _get(self):
+        response = self.client.get(reverse('journeys:journey_list', args=[self.country.id]))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_query_count_is_constant(self):
+        self._create_journeys(1)
+        self._get()  # 暖身，讓共用快取的版本號與精選國家快取就緒
+        with CaptureQueriesContext(connection) as queries:
+            self._get()
+        baseline = len(queries.captured_queries)
+
+        self._create_journeys(9)
+        self._get()
+        with self.assertNumQueries(baseline):
+            response = self._get()
+        self.assertEqual(len(response.context['journeys']), 10)
+
+
+class JourneyAdminQueryTests(TestCase):
+    """
+    後台旅程列表的查詢次數不隨旅程數量增加
+    """
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='admin'))
+        self.country = Country.objects.create(name='日本', english_name='Japan', country_code='JP')
+
+    def _create_journeys(self, count):
+        for i in range(count):
+            journey = Journey.objects.create(
+                country=self.country, title=f'旅程 {i}', description='測試', author_id=self.client.session['_auth_user_id'],
+                start_date=date(2025, 1, 1), end_date=date(2025, 1, 2),
+            )
+            JourneyPhoto.objects.create(journey=journey, image=f'photos/00/00/{i:064d}.jpg')
+
+    def _get(self):
+        response = self.client.get(reverse('admin:journeys_journey_changelist'))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_query_count_is_constant(self):
+        self._create_journeys(1)
+        self._get()
+        with CaptureQueriesContext(connection) as queries:
+            self._get()
+        baseline = len(queries.captured_queries)
+
+        self._create_journeys(9)
+        with self.assertNumQueries(baseline):
+            response = self._get()
+        self.assertEqual(response.context['cl'].result_count, 10)
+
+
+class SyncItinerariesTests(TestCase):
+    """
+    旅程起訖日變更時同步每日行程
+    """
+
+    def setUp(self):
+        user = User.objects.create(username='tester')
+        country = Country.objects.create(name='日本', english_name='Japan', country_code='JP')
+        self.journey = Journey.objects.create(
+            country=country, title='東京之旅', description='測試', author=user,
+            start_date=date(2025, 1, 1), end_date=date(2025, 1, 3),
+        )
+        sync_itineraries_for_journey(self.journey)
+
+    def _resync(self, start_date, end_date):
+        self.journey.start_date, self.journey.end_date = start_date, end_date
+        self.journey.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            return sync_itineraries_for_journey(self.journey)
+
+    def _titles(self):
+        return list(Itinerary.objects.filter(journey=self.journey).order_by('start_date').values_list('title', flat=True))
+
+    def test_moving_start_earlier_renumbers_kept_days(self):
+        self.assertEqual(self._resync(date(2024, 12, 31), date(2025, 1, 3)), (1, 0))
+        self.assertEqual(self._titles(), [
+            'Day-01-2024.12.31', 'Day-02-2025.01.01', 'Day-03-2025.01.02', 'Day-04-2025.01.03',
+        ])
+        self.assertEqual(
+            Itinerary.objects.get(journey=self.journey, start_date=date(2025, 1, 1)).description, '第 2 天行程'
+        )
+
+    def test_moving_start_later_drops_empty_days_and_renumbers(self):
+        self.assertEqual(self._resync(date(2025, 1, 2), date(2025, 1, 4)), (1, 1))
+        self.assertEqual(self._titles(), ['Day-01-2025.01.02', 'Day-02-2025.01.03', 'Day-03-2025.01.04'])
+
+    def test_shortening_keeps_days_with_content_and_custom_titles(self):
+        Itinerary.objects.filter(journey=self.journey, start_date=date(2025, 1, 2)).update(title='淺草一日遊')
+        last_day = Itinerary.objects.get(journey=self.journey, start_date=date(2025, 1, 3))
+        Location.objects.create(itinerary=last_day, name='晴空塔')
+
+        self.assertEqual(self._resync(date(2025, 1, 1), date(2025, 1, 2)), (0, 0))
+        self.assertEqual(self._titles(), ['Day-01-2025.01.01', '淺草一日遊', 'Day-03-2025.01.03'])
+
+    def test_new_and_renumbered_itineraries_are_indexed(self):
+        self._resync(date(2024, 12, 31), date(2025, 1, 3))
+        process_index_jobs(claim_index_jobs())
+        itinerary_ids = set(Itinerary.objects.filter(journey=self.journey).values_list('id', flat=True))
+        for model in (SearchDocument, SemanticEmbedding):
+            indexed = set(
+                model.objects.filter(object_type=SearchObjectTypeChoices.ITINERARY).values_list('object_id', flat=True)
+            )
+            self.assertEqual(indexed, itinerary_ids)
+
+
+class JourneyPhotoUploadTests(TestCase):
+    """
+    建立旅程時上傳的照片會移除中繼資料，且照片上傳的 view 仍檢查 CSRF
+    """
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+        User.objects.create(id=1, username='tester')  # 建立旅程的 view 使用預設作者
+        self.country = Country.objects.create(name='日本', english_name='Japan', country_code='JP')
+        self.client = Client(enforce_csrf_checks=True)
+
+    def _post(self, **extra):
+        buffer = io.BytesIO()
+        Image.new('RGB', (32, 24), 'red').save(buffer, 'WEBP', exif=gps_exif())
+        data = {
+            'title': '東京之旅', 'description': '測試', 'start_date': '2025-01-01', 'end_date': '2025-01-02',
+            'image': SimpleUploadedFile('IMG_0001.webp', buffer.getvalue()),
+        }
+        return self.client.post(reverse('journeys:create_journey', args=[self.country.id]), data, **extra)
+
+    def test_gps_is_removed_from_uploaded_webp(self):
+        self.client.get(reverse('journeys:journey_list', args=[self.country.id]))
+        response = self._post(HTTP_X_CSRFTOKEN=self.client.cookies['csrftoken'].value)
+        self.assertEqual(response.status_code, 200)
+
+        photo = JourneyPhoto.objects.get(journey__country=self.country)
+        with photo.image.open('rb') as image_file:
+            self.assertNotIn(SECRET, image_file.read())
+
+    def test_csrf_is_still_checked(self):
+        self.assertEqual(self._post().status_code, 403)
+        self.assertFalse(Journey.objects.exists())
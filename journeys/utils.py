@@ -0,0 +1,105 @@
+import re
+from datetime import datetime, timedelta
+from typing import Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from itineraries.models import Itinerary
+from search.tasks import enqueue_instances
+from .models import JourneyPhoto
+
+
+# 系統產生的行程標題與描述，使用者自訂的內容不會被重新編號
+AUTO_TITLE_RE = re.compile(r'^Day-\d+-\d{4}\.\d{2}\.\d{2}$')
+AUTO_DESCRIPTION_RE = re.compile(r'^第 \d+ 天行程$')
+
+
+def _to_date(value):
+    # 確保日期是 datetime.date 物件
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    return value
+
+
+def _day_title(day_count: int, current_date) -> str:
+    # 格式化日期為 YYYY.MM.DD
+    return f"Day-{day_count:02d}-{current_date.strftime('%Y.%m.%d')}"
+
+
+def _day_description(day_count: int) -> str:
+    return f"第 {day_count} 天行程"
+
+
+def sync_itineraries_for_journey(journey) -> Tuple[int, int]:
+    """
+    依旅程起訖日同步每日行程
+    只新增缺少的日期，並刪除超出日期範圍的空行程（已有地點或照片的行程會保留）；
+    保留的行程若仍使用系統產生的標題或描述，依新的起始日重新編號
+    回傳 (新增數量, 刪除數量)
+    """
+    start_date = _to_date(journey.start_date)
+    end_date = _to_date(journey.end_date)
+
+    with transaction.atomic():
+        existing = {
+            itinerary.start_date: itinerary
+            for itinerary in Itinerary.objects.filter(journey=journey).only('id', 'start_date', 'title', 'description')
+        }
+
+        new_itineraries = []
+        renumbered = []
+        current_date = start_date
+        day_count = 1
+        while current_date <= end_date:
+            title, description = _day_title(day_count, current_date), _day_description(day_count)
+            itinerary = existing.get(current_date)
+            if itinerary is None:
+                new_itineraries.append(Itinerary(
+                    journey=journey,
+                    title=title,
+                    description=description,
+                    start_date=current_date
+                ))
+            else:
+                changed = False
+                if AUTO_TITLE_RE.match(itinerary.title) and itinerary.title != title:
+                    itinerary.title = title
+                    changed = True
+                if AUTO_DESCRIPTION_RE.match(itinerary.description) and itinerary.description != description:
+                    itinerary.description = description
+                    changed = True
+                if changed:
+                    renumbered.append(itinerary)
+            current_date += timedelta(days=1)
+            day_count += 1
+
+        Itinerary.objects.bulk_create(new_itineraries)
+        if renumbered:
+            now = timezone.now()
+            for itinerary in renumbered:
+                itinerary.updated_at = now
+            Itinerary.objects.bulk_update(renumbered, ['title', 'description', 'updated_at'])
+
+        # 批次寫入不會觸發 post_save，明確將新行程與重新編號行程排入搜尋索引工作
+        enqueue_instances(Itinerary, [itinerary.id for itinerary in new_itineraries + renumbered])
+
+        _, deleted_per_model = (
+            Itinerary.objects.filter(journey=journey)
+            .exclude(start_date__range=(start_date, end_date))
+            .filter(location__isnull=True, itineraryphoto__isnull=True)
+            .delete()
+        )
+
+    return len(new_itineraries), deleted_per_model.get(Itinerary._meta.label, 0)
+
+
+def save_journey_photo(journey, photo_file, content_hash: str) -> JourneyPhoto:
+    """
+    以 prepare_photo_upload 處理過的暫存檔建立旅程照片
+    相同內容的照片由內容定址儲存共用同一個檔案
+    """
+    try:
+        return JourneyPhoto.objects.create(journey=journey, image=photo_file, content_hash=content_hash)
+    finally:
+        photo_file.close()
@@ -2,20 +2,35 @@ from django.shortcuts import render, get_object_or_404
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-from django.db.models import Q
-from datetime import timedelta
-from .models import Country, City, Journey, JourneyPhoto
-from itineraries.models import Itinerary
+from django.db.models import Q, Count
+from HinaTravelDiary.uploads import PhotoUploadError, prepare_photo_upload, photo_upload_view, PHOTO_UPLOAD_MAX_SIZE
+from .models import Country, City, Journey
+from .utils import save_journey_photo, sync_itineraries_for_journey
+
+
+def _prepare_uploaded_photo(request):
+    """
+    取得並處理上傳的旅程照片，回傳 (暫存檔, 內容雜湊) 或 None
+    照片不符合限制時拋出 PhotoUploadError
+    """
+    if 'image' in getattr(request, 'rejected_uploads', ()):
+        raise PhotoUploadError(f'照片大小不可超過 {PHOTO_UPLOAD_MAX_SIZE // (1024 * 1024)} MB')
+    image = request.FILES.get('image')
+    if not image:
+        return None
+    return prepare_photo_upload(image)
 
 
 def journey_list(request, country_id):
     """顯示特定國家的旅程列表"""
     country = get_object_or_404(Country, id=country_id)
-    journeys = Journey.objects.filter(country=country).order_by('-start_date')
-    
-    # 為每個旅程計算行程數量
-    for journey in journeys:
-        journey.itinerary_count = Itinerary.objects.filter(journey=journey).count()
+    # 行程數量以 annotate 計算，城市與照片一併 JOIN，避免逐筆查詢
+    journeys = (
+        Journey.objects.filter(country=country)
+        .select_related('city', 'journeyphoto')
+        .annotate(itinerary_count=Count('itinerary'))
+        .order_by('-start_date')
+    )
     
     context = {
         'country': country,
@@ -24,6 +39,7 @@ def journey_list(request, country_id):
     return render(request, 'journeys.html', context)
 
 
+@photo_upload_view
 @require_http_methods(["POST"])
 def create_journey(request, country_id):
     """建立新旅程"""
@@ -37,12 +53,17 @@ def create_journey(request, country_id):
         end_date = request.POST.get('end_date')
         city_name = request.POST.get('city_name')
         city_english_name = request.POST.get('city_english_name')
-        image = request.FILES.get('image')
         
         # 驗證必填字段
         if not all([title, description, start_date, end_date]):
             return JsonResponse({'error': '請填寫所有必填字段'}, status=400)
         
+        # 先檢查照片，避免照片不合格時已建立旅程
+        try:
+            photo = _prepare_uploaded_photo(request)
+        except PhotoUploadError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        
         # 處理城市（如果有提供城市名稱）
         city = None
         if city_name and city_name.strip():
@@ -79,15 +100,12 @@ def create_journey(request, country_id):
         )
         
         # 如果有上傳圖片，建立 JourneyPhoto
-        if image:
-            JourneyPhoto.objects.create(
-                journey=journey,
-                image=image
-            )
+        if photo:
+            save_journey_photo(journey, *photo)
         
         # 自動建立行程
         try:
-            itinerary_count = create_itineraries_for_journey(journey)
+            itinerary_count, _ = sync_itineraries_for_journey(journey)
             message = f'旅程「{journey.title}」建立成功！已自動建立 {itinerary_count} 天行程。'
         except Exception as e:
             message = f'旅程「{journey.title}」建立成功！但建立行程時發生錯誤：{str(e)}'
@@ -101,6 +119,7 @@ def create_journey(request, country_id):
         return JsonResponse({'error': f'建立旅程時發生錯誤：{str(e)}'}, status=500)
 
 
+@photo_upload_view
 @require_http_methods(["POST"])
 def edit_journey(request, country_id, journey_id):
     """編輯旅程"""
@@ -115,12 +134,17 @@ def edit_journey(request, country_id, journey_id):
         end_date = request.POST.get('end_date')
         city_name = request.POST.get('city_name')
         city_english_name = request.POST.get('city_english_name')
-        image = request.FILES.get('image')
         
         # 驗證必填字段
         if not all([title, description, start_date, end_date]):
             return JsonResponse({'error': '請填寫所有必填字段'}, status=400)
         
+        # 先檢查照片，避免照片不合格時已建立旅程
+        try:
+            photo = _prepare_uploaded_photo(request)
+        except PhotoUploadError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        
         # 處理城市（如果有提供城市名稱）
         city = None
         if city_name and city_name.strip():
@@ -147,6 +171,7 @@ def edit_journey(request, country_id, journey_id):
                 )
         
         # 更新旅程
+        dates_changed = (str(journey.start_date) != start_date or str(journey.end_date) != end_date)
         journey.title = title
         journey.description = description
         journey.start_date = start_date
@@ -154,17 +179,18 @@ def edit_journey(request, country_id, journey_id):
         journey.city = city
         journey.save()
         
+        # 日期範圍變更時，只新增 / 刪除差異的行程
+        if dates_changed:
+            sync_itineraries_for_journey(journey)
+        
         # 如果有上傳新圖片，更新 JourneyPhoto
-        if image:
+        if photo:
             # 刪除舊圖片（如果存在）
             if hasattr(journey, 'journeyphoto'):
                 journey.journeyphoto.delete()
             
             # 建立新圖片
-            JourneyPhoto.objects.create(
-                journey=journey,
-                image=image
-            )
+            save_journey_photo(journey, *photo)
         
         return JsonResponse({
             'success': True,
@@ -173,42 +199,3 @@ def edit_journey(request, country_id, journey_id):
         
     except Exception as e:
         return JsonResponse({'error': f'更新旅程時發生錯誤：{str(e)}'}, status=500)
-
-
-def create_itineraries_for_journey(journey):
-    """為旅程自動建立每日行程"""
-    from datetime import datetime
-    
-    # 確保日期是 datetime.date 物件
-    if isinstance(journey.start_date, str):
-        start_date = datetime.strptime(journey.start_date, '%Y-%m-%d').date()
-    else:
-        start_date = journey.start_date
-        
-    if isinstance(journey.end_date, str):
-        end_date = datetime.strptime(journey.end_date, '%Y-%m-%d').date()
-    else:
-        end_date = journey.end_date
-    
-    current_date = start_date
-    day_count = 1
-    created_count = 0
-    
-    while current_date <= end_date:
-        # 格式化日期為 YYYY.MM.DD
-        date_str = current_date.strftime('%Y.%m.%d')
-        title = f"Day-{day_count:02d}-{date_str}"
-        
-        # 建立行程
-        Itinerary.objects.create(
-            journey=journey,
-            title=title,
-            description=f"第 {day_count} 天行程",
-            start_date=current_date
-        )
-        
-        created_count += 1
-        current_date += timedelta(days=1)
-        day_count += 1
-    
-    return created_count
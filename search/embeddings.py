@@ -0,0 +1,71 @@
+"""
+語意搜尋使用的文字向量化工具
+
+預設使用 HashingEmbedder：以特徵雜湊將中英文詞元映射到固定維度，不需外部模型且結果固定。
+注意這是詞彙層級（lexical）的相似度：只有共用相同單字或雙字的文字才會相近，
+無法辨識同義詞或跨語言的語意（例如「富士山」與 Mt. Fuji），效果接近加權的詞袋比對。
+需要真正的語意搜尋時，透過 SEMANTIC_SEARCH_EMBEDDER 設定替換為語言模型實作
+（需提供 dimensions 屬性與 embed 方法），並以 backfill_semantic_embeddings 重建向量。
+"""
+import hashlib
+import math
+import re
+from functools import lru_cache
+from typing import List
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+EMBEDDING_DIMENSIONS = getattr(settings, 'SEMANTIC_SEARCH_DIMENSIONS', 256)
+
+_LATIN_WORD_RE = re.compile(r'[a-z0-9]+')
+_CJK_RUN_RE = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    英數字以單字切分，中日韓文字以單字與雙字（bigram）切分
+    """
+    text = text.lower()
+    tokens = _LATIN_WORD_RE.findall(text)
+    for run in _CJK_RUN_RE.findall(text):
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class HashingEmbedder:
+    """
+    特徵雜湊向量化（詞彙層級），相同文字永遠得到相同向量
+    """
+    dimensions = EMBEDDING_DIMENSIONS
+
+    def embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for token in tokenize(text or ''):
+            digest = hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest()
+            value = int.from_bytes(digest, 'big')
+            index = value % self.dimensions
+            sign = 1.0 if (value >> 63) & 1 else -1.0
+            # 雙字詞元比單字更具辨識度
+            vector[index] += sign * (1.5 if len(token) == 2 and not token.isascii() else 1.0)
+
+        norm = math.sqrt(sum(v * v for v in vector))
+        if not norm:
+            return vector
+        return [v / norm for v in vector]
+
+
+@lru_cache(maxsize=1)
+def get_embedder():
+    """
+    取得設定中的向量化工具
+    """
+    embedder_path = getattr(settings, 'SEMANTIC_SEARCH_EMBEDDER', 'search.embeddings.HashingEmbedder')
+    embedder = import_string(embedder_path)()
+    if embedder.dimensions != EMBEDDING_DIMENSIONS:
+        raise ImproperlyConfigured(
+            f"{embedder_path} 的向量維度 ({embedder.dimensions}) 與資料庫欄位 ({EMBEDDING_DIMENSIONS}) 不一致"
+        )
+    return embedder
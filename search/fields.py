@@ -0,0 +1,55 @@
+from django.db import models
+
+
+class VectorField(models.Field):
+    """
+    pgvector 的 vector 欄位
+    資料庫端以 '[1,2,3]' 文字格式傳遞，Python 端為 float 列表
+    """
+    description = 'pgvector 向量'
+
+    def __init__(self, *args, dimensions=None, **kwargs):
+        self.dimensions = dimensions
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['dimensions'] = self.dimensions
+        return name, path, args, kwargs
+
+    def db_type(self, connection):
+        if self.dimensions:
+            return f'vector({self.dimensions})'
+        return 'vector'
+
+    def from_db_value(self, value, expression, connection):
+        return self.to_python(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, list):
+            return value
+        return [float(v) for v in value.strip('[]').split(',') if v]
+
+    def get_prep_value(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return to_vector_literal(value)
+
+
+def to_vector_literal(values) -> str:
+    return '[' + ','.join(f'{float(v):.7g}' for v in values) + ']'
+
+
+class CosineDistance(models.Func):
+    """
+    pgvector 的餘弦距離運算（<=>），可使用 vector_cosine_ops 索引
+    """
+    output_field = models.FloatField()
+
+    def __init__(self, expression, vector, **extra):
+        super().__init__(expression, models.Value(to_vector_literal(vector)), **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        lhs, lhs_params = compiler.compile(self.source_expressions[0])
+        rhs, rhs_params = compiler.compile(self.source_expressions[1])
+        return f'({lhs} <=> {rhs}::vector)', (*lhs_params, *rhs_params)
@@ -0,0 +1,175 @@
+"""
+Postgres 全文檢索
+
+Postgres 內建的文字搜尋設定無法切分中日韓文字，因此寫入前先以 tokenize 將文字切為英數單字
+與中日韓單字、雙字（bigram），再以 simple 設定建立 tsvector；查詢時中日韓文字以雙字比對，
+效果近似 pg_bigm，但只需要 GIN 索引而不必安裝額外的擴充套件。
+"""
+from typing import Dict, Iterable, List, Optional
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import F, TextField, Value
+
+from itineraries.models import Itinerary, Location
+from .embeddings import _CJK_RUN_RE, _LATIN_WORD_RE, tokenize
+from .indexing import SEARCH_SOURCES, _content_hash, build_results
+from .models import SearchDocument, SearchObjectTypeChoices
+
+SEARCH_CONFIG = 'simple'
+
+# 各資料類型取得旅程作者的查詢路徑
+AUTHOR_PATHS = {
+    SearchObjectTypeChoices.JOURNEY: 'author_id',
+    SearchObjectTypeChoices.ITINERARY: 'journey__author_id',
+    SearchObjectTypeChoices.LOCATION: 'itinerary__journey__author_id',
+}
+
+
+def _search_vector(title: str, body: str):
+    """
+    標題權重 A、描述權重 B
+    """
+    return (
+        SearchVector(Value(' '.join(tokenize(title)), output_field=TextField()), config=SEARCH_CONFIG, weight='A')
+        + SearchVector(Value(' '.join(tokenize(body)), output_field=TextField()), config=SEARCH_CONFIG, weight='B')
+    )
+
+
+def update_documents(object_type: str, rows: Iterable[Dict]) -> int:
+    """
+    更新多筆資料的全文檢索文件，rows 需包含 id、author_id 與 SEARCH_SOURCES 中的文字欄位
+    內容與作者皆未變更的資料會略過，回傳實際寫入的數量
+    """
+    _, (title_field, body_field) = SEARCH_SOURCES[object_type]
+    documents = {}
+    for row in rows:
+        title, body = row.get(title_field) or '', row.get(body_field) or ''
+        documents[row['id']] = (row['author_id'], title, body, _content_hash(f"{title}\n{body}"))
+    if not documents:
+        return 0
+
+    existing = {
+        object_id: (author_id, content_hash)
+        for object_id, author_id, content_hash in SearchDocument.objects.filter(
+            object_type=object_type, object_id__in=documents.keys()
+        ).values_list('object_id', 'author_id', 'content_hash')
+    }
+
+    changed = [
+        SearchDocument(
+            object_type=object_type,
+            object_id=object_id,
+            author_id=author_id,
+            content_hash=content_hash,
+            search_vector=_search_vector(title, body),
+        )
+        for object_id, (author_id, title, body, content_hash) in documents.items()
+        if existing.get(object_id) != (author_id, content_hash)
+    ]
+    SearchDocument.objects.bulk_create(
+        changed,
+        update_conflicts=True,
+        unique_fields=['object_type', 'object_id'],
+        update_fields=['author_id', 'content_hash', 'search_vector', 'updated_at'],
+    )
+    return len(changed)
+
+
+def delete_documents(object_type: str, ids: Iterable[int]):
+    SearchDocument.objects.filter(object_type=object_type, object_id__in=list(ids)).delete()
+
+
+def sync_journey_author(journey_id: int, author_id: int):
+    """
+    旅程作者變更時同步其行程與地點文件的作者，作者未變更時不會寫入任何資料
+    """
+    children = (
+        (SearchObjectTypeChoices.ITINERARY, Itinerary.objects.filter(journey_id=journey_id)),
+        (SearchObjectTypeChoices.LOCATION, Location.objects.filter(itinerary__journey_id=journey_id)),
+    )
+    for object_type, queryset in children:
+        SearchDocument.objects.filter(
+            object_type=object_type, object_id__in=queryset.values('id')
+        ).exclude(author_id=author_id).update(author_id=author_id)
+
+
+def build_search_query(query: str) -> Optional[SearchQuery]:
+    """
+    將查詢字串轉為 tsquery：英數單字直接比對，中日韓文字拆成連續的雙字並全部需要命中
+    """
+    query = query.lower()
+    terms = _LATIN_WORD_RE.findall(query)
+    for run in _CJK_RUN_RE.findall(query):
+        if len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    if not terms:
+        return None
+    # 詞元只含英數字與中日韓文字，可安全組成 raw 查詢
+    return SearchQuery(' & '.join(dict.fromkeys(terms)), config=SEARCH_CONFIG, search_type='raw')
+
+
+def fulltext_search(
+    query: str,
+    object_types: Optional[List[str]] = None,
+    author_id: Optional[int] = None,
+    limit: int = 20,
+) -> List[Dict]:
+    """
+    以全文檢索搜尋旅程、行程與地點，依相關度排序
+    """
+    search_query = build_search_query(query)
+    if search_query is None:
+        return []
+
+    hits = [
+        {'object_type': hit['object_type'], 'object_id': hit['object_id'], 'score': round(hit['rank'], 4)}
+        for hit in fulltext_search_queryset(search_query, object_types, author_id)[:limit]
+    ]
+    return build_results(hits)
+
+
+def fulltext_search_queryset(
+    search_query: SearchQuery,
+    object_types: Optional[List[str]] = None,
+    author_id: Optional[int] = None,
+):
+    """
+    依相關度排序的全文檢索查詢（尚未限制筆數），供搜尋與查詢計畫分析共用
+    """
+    documents = SearchDocument.objects.filter(search_vector=search_query)
+    if object_types:
+        documents = documents.filter(object_type__in=object_types)
+    if author_id is not None:
+        documents = documents.filter(author_id=author_id)
+    return (
+        documents.annotate(rank=SearchRank(F('search_vector'), search_query))
+        .order_by('-rank', 'object_type', 'object_id')
+        .values('object_type', 'object_id', 'rank')
+    )
+
+
+def source_rows(object_type: str):
+    """
+    某資料類型的索引來源查詢（含作者），每筆為 id、author_id 與 SEARCH_SOURCES 中的文字欄位
+    """
+    model, fields = SEARCH_SOURCES[object_type]
+    author_path = AUTHOR_PATHS[object_type]
+    # 旅程本身即有 author_id 欄位，不能再以同名別名註記
+    author_values = {} if author_path == 'author_id' else {'author_id': F(author_path)}
+    fields = (*fields, 'author_id') if not author_values else fields
+    return model.objects.values('id', *fields, **author_values)
+
+
+def iter_source_rows(object_type: str, batch_size: int = 1000) -> Iterable[List[Dict]]:
+    """
+    以 id 分批讀取某資料類型的索引來源（含作者），供回填指令使用
+    """
+    last_id = 0
+    while True:
+        rows = list(source_rows(object_type).filter(id__gt=last_id).order_by('id')[:batch_size])
+        if not rows:
+            break
+        yield rows
+        last_id = rows[-1]['id']
@@ -0,0 +1,170 @@
+import hashlib
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import connection, transaction
+
+from journeys.models import Journey
+from itineraries.models import Itinerary, Location
+from .embeddings import get_embedder
+from .fields import CosineDistance
+from .models import SemanticEmbedding, SearchObjectTypeChoices
+
+# pgvector HNSW 查詢候選數：預設值、上限與依資料類型篩選時的放大倍數
+DEFAULT_EF_SEARCH = 40
+MAX_EF_SEARCH = 1000
+FILTERED_EF_SEARCH_FACTOR = 10
+
+# 各資料類型的模型與參與搜尋的文字欄位
+SEARCH_SOURCES = {
+    SearchObjectTypeChoices.JOURNEY: (Journey, ('title', 'description')),
+    SearchObjectTypeChoices.ITINERARY: (Itinerary, ('title', 'description')),
+    SearchObjectTypeChoices.LOCATION: (Location, ('name', 'description')),
+}
+
+
+def object_type_for(model) -> Optional[str]:
+    for object_type, (source_model, _) in SEARCH_SOURCES.items():
+        if model is source_model:
+            return object_type
+    return None
+
+
+def document_text(object_type: str, values: Dict) -> str:
+    _, fields = SEARCH_SOURCES[object_type]
+    return '\n'.join(values.get(field) or '' for field in fields).strip()
+
+
+def _content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def update_embeddings(object_type: str, documents: Iterable[Tuple[int, str]]) -> int:
+    """
+    更新多筆資料的向量，內容雜湊未變更的資料會略過
+    回傳實際重新計算的數量
+    """
+    documents = {object_id: (text, _content_hash(text)) for object_id, text in documents}
+    if not documents:
+        return 0
+
+    existing_hashes = dict(
+        SemanticEmbedding.objects.filter(object_type=object_type, object_id__in=documents.keys())
+        .values_list('object_id', 'content_hash')
+    )
+
+    embedder = get_embedder()
+    changed = [
+        SemanticEmbedding(
+            object_type=object_type,
+            object_id=object_id,
+            content_hash=content_hash,
+            embedding=embedder.embed(text),
+        )
+        for object_id, (text, content_hash) in documents.items()
+        if existing_hashes.get(object_id) != content_hash
+    ]
+    SemanticEmbedding.objects.bulk_create(
+        changed,
+        update_conflicts=True,
+        unique_fields=['object_type', 'object_id'],
+        update_fields=['content_hash', 'embedding', 'updated_at'],
+    )
+    return len(changed)
+
+
+def delete_embeddings(object_type: str, ids: Iterable[int]):
+    SemanticEmbedding.objects.filter(object_type=object_type, object_id__in=list(ids)).delete()
+
+
+def _result_url(object_type: str, obj) -> str:
+    if object_type == SearchObjectTypeChoices.JOURNEY:
+        return f"/journeys/{obj.id}/itineraries/"
+    if object_type == SearchObjectTypeChoices.ITINERARY:
+        return f"/itineraries/{obj.id}/locations/"
+    return f"/itineraries/{obj.itinerary_id}/locations/"
+
+
+def semantic_search(query: str, object_types: Optional[List[str]] = None, limit: int = 20) -> List[Dict]:
+    """
+    以向量相似度搜尋旅程、行程與地點
+    """
+    vector = get_embedder().embed(query)
+    if not any(vector):
+        return []
+
+    filtered = is_type_filtered(object_types)
+    with hnsw_ef_search(ef_search_for(limit, filtered)):
+        hits = [
+            {'object_type': hit['object_type'], 'object_id': hit['object_id'], 'score': round(1 - hit['distance'], 4)}
+            for hit in semantic_search_queryset(vector, object_types if filtered else None)[:limit]
+        ]
+    return build_results(hits)
+
+
+def is_type_filtered(object_types: Optional[List[str]]) -> bool:
+    return bool(object_types) and set(object_types) != set(SEARCH_SOURCES)
+
+
+def semantic_search_queryset(vector: List[float], object_types: Optional[List[str]] = None):
+    """
+    依餘弦距離排序的向量查詢（尚未限制筆數），供搜尋與查詢計畫分析共用
+    """
+    embeddings = SemanticEmbedding.objects.all()
+    if object_types:
+        embeddings = embeddings.filter(object_type__in=object_types)
+    return (
+        embeddings.annotate(distance=CosineDistance('embedding', vector))
+        .order_by('distance')
+        .values('object_type', 'object_id', 'distance')
+    )
+
+
+@contextmanager
+def hnsw_ef_search(ef_search: int):
+    """
+    在交易中設定本次查詢的 HNSW 候選數，交易結束後恢復
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'SET LOCAL hnsw.ef_search = {int(ef_search)}')
+        yield
+
+
+def ef_search_for(limit: int, filtered: bool) -> int:
+    """
+    HNSW 索引每次只取出 ef_search 筆候選，之後才套用資料類型條件，
+    候選數不足時回傳的結果會少於 limit，因此依 limit 放大，有類型條件時再多取數倍
+    """
+    candidates = limit * FILTERED_EF_SEARCH_FACTOR if filtered else limit
+    return min(max(candidates, DEFAULT_EF_SEARCH), MAX_EF_SEARCH)
+
+
+def build_results(hits: List[Dict]) -> List[Dict]:
+    """
+    將搜尋命中（object_type、object_id、score）轉為 API 回傳格式，依原順序排列
+    """
+    # 依資料類型一次取回所有命中的物件
+    ids_by_type = {}
+    for hit in hits:
+        ids_by_type.setdefault(hit['object_type'], []).append(hit['object_id'])
+    objects = {}
+    for object_type, ids in ids_by_type.items():
+        model, _ = SEARCH_SOURCES[object_type]
+        for obj in model.objects.filter(id__in=ids):
+            objects[(object_type, obj.id)] = obj
+
+    results = []
+    for hit in hits:
+        obj = objects.get((hit['object_type'], hit['object_id']))
+        if obj is None:
+            continue
+        _, fields = SEARCH_SOURCES[hit['object_type']]
+        results.append({
+            'type': hit['object_type'],
+            'id': obj.id,
+            'title': getattr(obj, fields[0]),
+            'description': (getattr(obj, fields[1]) or '')[:120],
+            'url': _result_url(hit['object_type'], obj),
+            'score': hit['score'],
+        })
+    return results
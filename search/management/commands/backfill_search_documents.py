@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from search.fulltext import iter_source_rows, update_documents
+from search.indexing import SEARCH_SOURCES
+
+
+class Command(BaseCommand):
+    help = '為既有的旅程、行程與地點建立全文檢索文件（內容與作者未變更的資料會略過）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批處理的資料數量')
+
+    def handle(self, *args, **options):
+        for object_type, (model, _) in SEARCH_SOURCES.items():
+            written = 0
+            processed = 0
+            for rows in iter_source_rows(object_type, options['batch_size']):
+                written += update_documents(object_type, rows)
+                processed += len(rows)
+
+            self.stdout.write(f"{model._meta.verbose_name}：共 {processed} 筆，更新 {written} 筆")
+
+        self.stdout.write(self.style.SUCCESS('全文檢索文件更新完成'))
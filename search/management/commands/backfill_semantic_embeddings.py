@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from search.indexing import SEARCH_SOURCES, document_text, update_embeddings
+
+
+class Command(BaseCommand):
+    help = '為既有的旅程、行程與地點計算語意搜尋向量（內容未變更的資料會略過）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批處理的資料數量')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        for object_type, (model, fields) in SEARCH_SOURCES.items():
+            computed = 0
+            processed = 0
+            last_id = 0
+            while True:
+                rows = list(
+                    model.objects.filter(id__gt=last_id).order_by('id').values('id', *fields)[:batch_size]
+                )
+                if not rows:
+                    break
+
+                computed += update_embeddings(object_type, ((row['id'], document_text(object_type, row)) for row in rows))
+                processed += len(rows)
+                last_id = rows[-1]['id']
+
+            self.stdout.write(f"{model._meta.verbose_name}：共 {processed} 筆，重新計算 {computed} 筆")
+
+        self.stdout.write(self.style.SUCCESS('語意搜尋向量更新完成'))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from search.tasks import claim_index_jobs, process_index_jobs
+
+
+class Command(BaseCommand):
+    help = '執行搜尋索引工作（全文檢索文件與語意搜尋向量）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='每次領取的工作數量')
+        parser.add_argument('--sleep', type=float, default=2.0, help='沒有工作或處理失敗時的等待秒數')
+        parser.add_argument('--once', action='store_true', help='處理完目前的工作後結束')
+
+    def handle(self, *args, **options):
+        while True:
+            ids_by_type = claim_index_jobs(options['batch_size'])
+            if ids_by_type:
+                try:
+                    processed = process_index_jobs(ids_by_type)
+                except Exception as e:
+                    # 工作已重新排入，稍後重試
+                    self.stderr.write(f"搜尋索引更新失敗: {e}")
+                    if options['once']:
+                        raise
+                    time.sleep(options['sleep'])
+                    continue
+                self.stdout.write(f"處理 {sum(map(len, ids_by_type.values()))} 個工作，更新 {processed} 筆資料")
+                continue
+
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
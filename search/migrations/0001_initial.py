@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:30
+
+import search.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE EXTENSION IF NOT EXISTS vector;',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.CreateModel(
+            name='SemanticEmbedding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_type', models.CharField(choices=[('journey', '旅程'), ('itinerary', '行程'), ('location', '地點')], help_text='資料類型', max_length=20)),
+                ('object_id', models.PositiveBigIntegerField(help_text='資料 ID')),
+                ('content_hash', models.CharField(help_text='向量化內容的雜湊值，內容未變更時不重新計算', max_length=64)),
+                ('embedding', search.fields.VectorField(dimensions=256, help_text='文字向量')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': '語意搜尋向量',
+                'verbose_name_plural': '語意搜尋向量列表',
+                'constraints': [models.UniqueConstraint(fields=('object_type', 'object_id'), name='search_embedding_object_uniq')],
+            },
+        ),
+        # HNSW 索引（餘弦距離），讓數十萬筆資料的相似度搜尋維持在毫秒等級
+        migrations.RunSQL(
+            'CREATE INDEX search_embedding_hnsw_idx ON search_semanticembedding '
+            'USING hnsw (embedding vector_cosine_ops);',
+            reverse_sql='DROP INDEX IF EXISTS search_embedding_hnsw_idx;',
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_type', models.CharField(choices=[('journey', '旅程'), ('itinerary', '行程'), ('location', '地點')], help_text='資料類型', max_length=20)),
+                ('object_id', models.PositiveBigIntegerField(help_text='資料 ID')),
+                ('author_id', models.BigIntegerField(blank=True, db_index=True, help_text='旅程作者 ID', null=True)),
+                ('content_hash', models.CharField(help_text='索引內容的雜湊值，內容未變更時不重新計算', max_length=64)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(help_text='全文檢索向量（中日韓文字已切為單字與雙字）', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': '全文檢索文件',
+                'verbose_name_plural': '全文檢索文件列表',
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='search_document_vector_gin')],
+                'constraints': [models.UniqueConstraint(fields=('object_type', 'object_id'), name='search_document_object_uniq')],
+            },
+        ),
+    ]
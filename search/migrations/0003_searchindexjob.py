@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_searchdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchIndexJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_type', models.CharField(choices=[('journey', '旅程'), ('itinerary', '行程'), ('location', '地點')], help_text='資料類型', max_length=20)),
+                ('object_id', models.PositiveBigIntegerField(help_text='資料 ID')),
+                ('enqueued_at', models.DateTimeField(auto_now=True, help_text='最後一次排入的時間')),
+            ],
+            options={
+                'verbose_name': '搜尋索引工作',
+                'verbose_name_plural': '搜尋索引工作列表',
+                'constraints': [models.UniqueConstraint(fields=('object_type', 'object_id'), name='search_index_job_object_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,72 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models
+
+from .embeddings import EMBEDDING_DIMENSIONS
+from .fields import VectorField
+
+
+class SearchObjectTypeChoices(models.TextChoices):
+    JOURNEY = 'journey', '旅程'
+    ITINERARY = 'itinerary', '行程'
+    LOCATION = 'location', '地點'
+
+
+class SemanticEmbedding(models.Model):
+    object_type = models.CharField(max_length=20, choices=SearchObjectTypeChoices.choices, help_text="資料類型")
+    object_id = models.PositiveBigIntegerField(help_text="資料 ID")
+    content_hash = models.CharField(max_length=64, help_text="向量化內容的雜湊值，內容未變更時不重新計算")
+    embedding = VectorField(dimensions=EMBEDDING_DIMENSIONS, help_text="文字向量")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "語意搜尋向量"
+        verbose_name_plural = "語意搜尋向量列表"
+        constraints = [
+            models.UniqueConstraint(fields=['object_type', 'object_id'], name='search_embedding_object_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_object_type_display()} #{self.object_id}"
+
+
+class SearchDocument(models.Model):
+    object_type = models.CharField(max_length=20, choices=SearchObjectTypeChoices.choices, help_text="資料類型")
+    object_id = models.PositiveBigIntegerField(help_text="資料 ID")
+    author_id = models.BigIntegerField(null=True, blank=True, db_index=True, help_text="旅程作者 ID")
+    content_hash = models.CharField(max_length=64, help_text="索引內容的雜湊值，內容未變更時不重新計算")
+    search_vector = SearchVectorField(null=True, help_text="全文檢索向量（中日韓文字已切為單字與雙字）")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "全文檢索文件"
+        verbose_name_plural = "全文檢索文件列表"
+        constraints = [
+            models.UniqueConstraint(fields=['object_type', 'object_id'], name='search_document_object_uniq'),
+        ]
+        indexes = [
+            GinIndex(fields=['search_vector'], name='search_document_vector_gin'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_object_type_display()} #{self.object_id}"
+
+
+class SearchIndexJob(models.Model):
+    """
+    待更新搜尋索引的資料，由 process_search_index 背景程式處理
+    同一筆資料只保留一筆工作，處理時重新讀取資料，已刪除的資料會一併移除其索引
+    """
+    object_type = models.CharField(max_length=20, choices=SearchObjectTypeChoices.choices, help_text="資料類型")
+    object_id = models.PositiveBigIntegerField(help_text="資料 ID")
+    enqueued_at = models.DateTimeField(auto_now=True, help_text="最後一次排入的時間")
+
+    class Meta:
+        verbose_name = "搜尋索引工作"
+        verbose_name_plural = "搜尋索引工作列表"
+        constraints = [
+            models.UniqueConstraint(fields=['object_type', 'object_id'], name='search_index_job_object_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_object_type_display()} #{self.object_id}"
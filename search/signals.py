@@ -0,0 +1,33 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from journeys.models import Journey
+from itineraries.models import Itinerary, Location
+from .indexing import SEARCH_SOURCES, object_type_for
+from .tasks import enqueue_index
+
+
+@receiver(post_save, sender=Journey)
+@receiver(post_save, sender=Itinerary)
+@receiver(post_save, sender=Location)
+def enqueue_search_index(sender, instance, update_fields=None, **kwargs):
+    """
+    文字欄位或作者異動時排入搜尋索引工作，全文檢索文件與向量由 process_search_index 更新
+    """
+    _, fields = SEARCH_SOURCES[object_type_for(sender)]
+    watched = set(fields)
+    if sender is Journey:
+        watched.add('author')
+    if update_fields is not None and not watched & set(update_fields):
+        return
+    enqueue_index(object_type_for(sender), [instance.pk])
+
+
+@receiver(post_delete, sender=Journey)
+@receiver(post_delete, sender=Itinerary)
+@receiver(post_delete, sender=Location)
+def enqueue_search_index_removal(sender, instance, **kwargs):
+    """
+    刪除的資料同樣排入工作，由 process_search_index 移除其全文檢索文件與向量
+    """
+    enqueue_index(object_type_for(sender), [instance.pk])
@@ -0,0 +1,98 @@
+"""
+搜尋索引工作佇列
+
+資料異動時只在同一個交易中寫入 SearchIndexJob，全文檢索文件與向量由 process_search_index
+背景程式更新，請求不必等待向量化。排入工作時會更新既有工作的時間並鎖定該列直到交易完成，
+背景程式以 SKIP LOCKED 領取，因此只會讀到已提交的資料，不會漏掉處理期間的新異動。
+"""
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+from django.db import transaction
+
+from .fulltext import delete_documents, source_rows, sync_journey_author, update_documents
+from .indexing import delete_embeddings, document_text, object_type_for, update_embeddings
+from .models import SearchIndexJob, SearchObjectTypeChoices
+
+# 設定日誌
+logger = logging.getLogger(__name__)
+
+
+def enqueue_index(object_type: str, ids: Iterable[int]):
+    """
+    將資料排入搜尋索引工作，已在佇列中的資料只更新排入時間
+    """
+    jobs = [SearchIndexJob(object_type=object_type, object_id=object_id) for object_id in dict.fromkeys(ids)]
+    if not jobs:
+        return
+    SearchIndexJob.objects.bulk_create(
+        jobs,
+        update_conflicts=True,
+        unique_fields=['object_type', 'object_id'],
+        update_fields=['enqueued_at'],
+    )
+
+
+def enqueue_instances(model, ids: Iterable[int]):
+    """
+    bulk_create / bulk_update 不會觸發 post_save，寫入後呼叫此函式排入搜尋索引工作
+    """
+    enqueue_index(object_type_for(model), ids)
+
+
+def claim_index_jobs(batch_size: int = 500) -> Dict[str, List[int]]:
+    """
+    領取並移除工作，回傳依資料類型分組的資料 ID
+    使用 SKIP LOCKED，多個 worker 同時執行時不會領到相同的工作，仍在請求交易中的工作也會略過
+    """
+    with transaction.atomic():
+        jobs = list(
+            SearchIndexJob.objects.select_for_update(skip_locked=True)
+            .order_by('enqueued_at')
+            .values_list('id', 'object_type', 'object_id')[:batch_size]
+        )
+        SearchIndexJob.objects.filter(id__in=[job_id for job_id, _, _ in jobs]).delete()
+
+    ids_by_type = defaultdict(list)
+    for _, object_type, object_id in jobs:
+        ids_by_type[object_type].append(object_id)
+    return dict(ids_by_type)
+
+
+def index_objects(object_type: str, ids: Iterable[int]) -> int:
+    """
+    更新多筆資料的全文檢索文件與向量，已刪除的資料移除其索引，回傳仍存在的資料數量
+    """
+    ids = list(ids)
+    rows = list(source_rows(object_type).filter(id__in=ids))
+    update_documents(object_type, rows)
+    update_embeddings(object_type, ((row['id'], document_text(object_type, row)) for row in rows))
+
+    deleted_ids = set(ids) - {row['id'] for row in rows}
+    if deleted_ids:
+        delete_documents(object_type, deleted_ids)
+        delete_embeddings(object_type, deleted_ids)
+
+    # 旅程作者變更時，其行程與地點文件的作者也需同步
+    if object_type == SearchObjectTypeChoices.JOURNEY:
+        for row in rows:
+            sync_journey_author(row['id'], row['author_id'])
+    return len(rows)
+
+
+def process_index_jobs(ids_by_type: Dict[str, List[int]]) -> int:
+    """
+    執行領取的工作，失敗時將工作重新排入佇列後拋出例外
+    回傳處理的資料數量
+    """
+    processed = 0
+    for object_type, ids in ids_by_type.items():
+        try:
+            processed += index_objects(object_type, ids)
+        except Exception:
+            for pending_type, pending_ids in ids_by_type.items():
+                enqueue_index(pending_type, pending_ids)
+            logger.exception(f"搜尋索引更新失敗，已重新排入 {sum(map(len, ids_by_type.values()))} 筆資料")
+            raise
+    return processed
@@ -0,0 +1,176 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from journeys.models import Country, Journey
+from itineraries.models import Itinerary, Location
+from .fulltext import build_search_query, fulltext_search
+from .indexing import DEFAULT_EF_SEARCH, MAX_EF_SEARCH, ef_search_for, semantic_search
+from .models import SearchDocument, SearchIndexJob, SearchObjectTypeChoices, SemanticEmbedding
+from .tasks import claim_index_jobs, process_index_jobs
+
+
+class SearchIndexQueueTests(TestCase):
+    """
+    資料異動只排入工作，由背景程式更新全文檢索文件與向量
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username='tester')
+        country = Country.objects.create(name='日本', english_name='Japan', country_code='JP')
+        self.journey = Journey.objects.create(
+            country=country, title='東京之旅', description='測試', author=self.user,
+            start_date=date(2025, 1, 1), end_date=date(2025, 1, 1),
+        )
+        self.itinerary = Itinerary.objects.create(
+            journey=self.journey, title='Day-01', description='測試', start_date=self.journey.start_date
+        )
+        self.location = Location.objects.create(itinerary=self.itinerary, name='晴空塔', description='展望台')
+
+    def _run_worker(self):
+        return process_index_jobs(claim_index_jobs())
+
+    def _indexed(self, model, object_type):
+        return set(model.objects.filter(object_type=object_type).values_list('object_id', flat=True))
+
+    def test_save_only_enqueues_until_worker_runs(self):
+        self.assertFalse(SearchDocument.objects.exists())
+        self.assertFalse(SemanticEmbedding.objects.exists())
+        self.assertEqual(SearchIndexJob.objects.count(), 3)
+
+        self.assertEqual(self._run_worker(), 3)
+        self.assertFalse(SearchIndexJob.objects.exists())
+        for model in (SearchDocument, SemanticEmbedding):
+            self.assertEqual(self._indexed(model, SearchObjectTypeChoices.LOCATION), {self.location.id})
+
+    def test_filtered_semantic_search_finds_indexed_location(self):
+        self._run_worker()
+        results = semantic_search('晴空塔', [SearchObjectTypeChoices.LOCATION], limit=5)
+        self.assertEqual([(result['type'], result['id']) for result in results], [('location', self.location.id)])
+
+    def test_repeated_saves_keep_one_job(self):
+        self._run_worker()
+        for name in ('晴空塔 展望台', '東京晴空塔'):
+            self.location.name = name
+            self.location.save()
+        self.assertEqual(SearchIndexJob.objects.count(), 1)
+
+        self._run_worker()
+        document = SemanticEmbedding.objects.get(object_type=SearchObjectTypeChoices.LOCATION)
+        self.assertEqual(document.object_id, self.location.id)
+
+    def test_delete_removes_index_through_worker(self):
+        self._run_worker()
+        self.journey.delete()
+        self.assertTrue(SearchDocument.objects.exists())
+
+        self.assertEqual(self._run_worker(), 0)
+        self.assertFalse(SearchDocument.objects.exists())
+        self.assertFalse(SemanticEmbedding.objects.exists())
+
+    def test_author_change_syncs_child_documents(self):
+        self._run_worker()
+        new_author = User.objects.create(username='editor')
+        self.journey.author = new_author
+        self.journey.save(update_fields=['author'])
+
+        self._run_worker()
+        self.assertEqual(set(SearchDocument.objects.values_list('author_id', flat=True)), {new_author.id})
+
+
+class EfSearchTests(SimpleTestCase):
+    """
+    HNSW 候選數依 limit 與資料類型條件放大
+    """
+
+    def test_candidates_cover_limit(self):
+        self.assertEqual(ef_search_for(20, filtered=False), DEFAULT_EF_SEARCH)
+        self.assertEqual(ef_search_for(100, filtered=False), 100)
+
+    def test_filtered_search_over_fetches(self):
+        self.assertEqual(ef_search_for(20, filtered=True), 200)
+        self.assertEqual(ef_search_for(100, filtered=True), MAX_EF_SEARCH)
+
+
+class BuildSearchQueryTests(SimpleTestCase):
+    """
+    查詢字串轉為 tsquery 的詞元
+    """
+
+    def _terms(self, query):
+        return build_search_query(query).get_source_expressions()[-1].value
+
+    def test_latin_words_and_cjk_bigrams_are_unique(self):
+        self.assertEqual(self._terms('Tokyo 淺草寺 tokyo'), 'tokyo & 淺草 & 草寺')
+
+    def test_single_cjk_character(self):
+        self.assertEqual(self._terms('寺'), '寺')
+
+    def test_punctuation_only_returns_none(self):
+        self.assertIsNone(build_search_query('!?、。'))
+
+
+class FulltextSearchTests(TestCase):
+    """
+    全文檢索的排序、篩選與 API 參數檢查
+    """
+
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.other = User.objects.create(username='other')
+        country = Country.objects.create(name='日本', english_name='Japan', country_code='JP')
+
+        def journey(author, title, description):
+            return Journey.objects.create(
+                country=country, title=title, description=description, author=author,
+                start_date=date(2025, 1, 1), end_date=date(2025, 1, 1),
+            )
+
+        self.title_hit = journey(self.author, '淺草寺參拜', '東京下町散步')
+        self.description_hit = journey(self.author, '東京下町', '早上到淺草寺參拜')
+        self.other_hit = journey(self.other, '淺草寺夜景', '晚上散步')
+        itinerary = Itinerary.objects.create(
+            journey=self.title_hit, title='Day-01', description='測試', start_date=self.title_hit.start_date
+        )
+        self.location = Location.objects.create(itinerary=itinerary, name='東京晴空塔', description='展望台')
+        process_index_jobs(claim_index_jobs())
+
+    def _ids(self, results, object_type='journey'):
+        return [result['id'] for result in results if result['type'] == object_type]
+
+    def test_cjk_substring_matches(self):
+        results = fulltext_search('晴空')
+        self.assertEqual([(result['type'], result['id']) for result in results], [('location', self.location.id)])
+
+    def test_title_hit_outranks_description_hit(self):
+        ids = self._ids(fulltext_search('淺草寺', author_id=self.author.id))
+        self.assertEqual(ids, [self.title_hit.id, self.description_hit.id])
+
+    def test_author_filter(self):
+        ids = self._ids(fulltext_search('淺草寺', author_id=self.other.id))
+        self.assertEqual(ids, [self.other_hit.id])
+
+    def test_author_filter_covers_child_documents(self):
+        self.assertEqual(fulltext_search('晴空', author_id=self.other.id), [])
+        self.assertEqual(len(fulltext_search('晴空', author_id=self.author.id)), 1)
+
+    def test_type_filter(self):
+        self.assertIn('journey', {result['type'] for result in fulltext_search('東京')})
+        results = fulltext_search('東京', [SearchObjectTypeChoices.LOCATION])
+        self.assertEqual([(result['type'], result['id']) for result in results], [('location', self.location.id)])
+
+    def test_view_filters(self):
+        response = self.client.get(
+            reverse('search:fulltext_search'), {'q': '淺草寺', 'type': 'journey', 'author': self.other.id}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['id'] for result in response.json()['results']], [self.other_hit.id])
+
+    def test_view_rejects_missing_query_and_non_numeric_author(self):
+        url = reverse('search:fulltext_search')
+        self.assertEqual(self.client.get(url, {'q': '  '}).status_code, 400)
+        response = self.client.get(url, {'q': '淺草寺', 'author': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': '作者 ID 格式錯誤'})
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = 'search'
+
+urlpatterns = [
+    path('search/', views.fulltext_search_view, name='fulltext_search'),
+    path('search/semantic/', views.semantic_search_view, name='semantic_search'),
+]
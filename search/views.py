@@ -0,0 +1,49 @@
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from .fulltext import fulltext_search
+from .indexing import semantic_search
+from .models import SearchObjectTypeChoices
+
+
+def _parse_search_params(request):
+    query = (request.GET.get('q') or '').strip()
+    object_types = [t for t in request.GET.getlist('type') if t in SearchObjectTypeChoices.values]
+    try:
+        limit = min(max(int(request.GET.get('limit', 20)), 1), 100)
+    except ValueError:
+        limit = 20
+    return query, object_types, limit
+
+
+@require_GET
+def semantic_search_view(request):
+    """
+    語意搜尋 API，參數：q（查詢字串）、type（可重複：journey / itinerary / location）、limit
+    相似度取決於 SEMANTIC_SEARCH_EMBEDDER，預設的 HashingEmbedder 為詞彙層級比對
+    """
+    query, object_types, limit = _parse_search_params(request)
+    if not query:
+        return JsonResponse({'error': '請提供搜尋字串'}, status=400)
+
+    return JsonResponse({
+        'query': query,
+        'results': semantic_search(query, object_types, limit),
+    })
+
+
+@require_GET
+def fulltext_search_view(request):
+    """全文檢索 API，參數：q（查詢字串）、type（可重複）、author（作者 ID）、limit"""
+    query, object_types, limit = _parse_search_params(request)
+    if not query:
+        return JsonResponse({'error': '請提供搜尋字串'}, status=400)
+
+    author_id = request.GET.get('author')
+    if author_id is not None and not author_id.isdigit():
+        return JsonResponse({'error': '作者 ID 格式錯誤'}, status=400)
+
+    return JsonResponse({
+        'query': query,
+        'results': fulltext_search(query, object_types, int(author_id) if author_id else None, limit),
+    })